@@ -0,0 +1,143 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Asymptotic complexity check of the parsers.
+
+Every parser parses synthetic logs (see benchmarks.synthetic) in two
+series:
+  'size': the log size and the number of errors double at every step
+      (constant error density)
+  'errors': the number of errors doubles at every step, with a fixed
+      log size
+and the growth exponent of the parsing time is fitted (least squares
+over log(time) = k * log(x) + c, where x is the log size or the number
+of errors). An exponent of about 1 means linear growth, and an exponent
+of about 2, quadratic growth. A series whose exponent is above the
+maximum (MAX_EXPONENT by default) is reported as superlinear.
+
+Usage (from the repository root):
+
+    python -m benchmarks.complexity [--kind KIND] [--max-exponent N]
+"""
+
+import argparse
+import math
+import sys
+import time
+
+import logspec
+from benchmarks.synthetic import KINDS, generate_log
+from logspec.main import load_parser, parse_log
+
+MAX_EXPONENT = 1.3
+DEFAULT_BASE_SIZE = 256 * 1024
+DEFAULT_BASE_ERRORS = 4
+DEFAULT_STEPS = 5
+
+
+def growth_exponent(xs, ys):
+    """Returns the slope of the least squares fit of log(ys) over
+    log(xs).
+    """
+    log_xs = [math.log(x) for x in xs]
+    log_ys = [math.log(y) for y in ys]
+    mean_x = sum(log_xs) / len(log_xs)
+    mean_y = sum(log_ys) / len(log_ys)
+    covariance = sum((x - mean_x) * (y - mean_y) for x, y in zip(log_xs, log_ys))
+    variance = sum((x - mean_x) ** 2 for x in log_xs)
+    return covariance / variance
+
+
+def _parse_time(parser, log, repeat):
+    """Returns the minimum time (seconds) to parse `log' in `repeat'
+    runs.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_log(log, parser)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure_series(kind, parser, series, base_size=DEFAULT_BASE_SIZE,
+                   base_errors=DEFAULT_BASE_ERRORS, steps=DEFAULT_STEPS, repeat=3):
+    """Measures the parsing time of a series (see the module
+    documentation) of synthetic logs of a `kind'.
+
+    Returns a list of (x, time) tuples, where x is the log size for a
+    'size' series and the number of errors for an 'errors' series.
+    """
+    points = []
+    for step in range(steps):
+        if series == 'size':
+            size, num_errors = base_size << step, base_errors << step
+        else:
+            size, num_errors = base_size, base_errors << step
+        log, _ = generate_log(kind, size, num_errors)
+        x = len(log) if series == 'size' else num_errors
+        points.append((x, _parse_time(parser, log, repeat)))
+    return points
+
+
+def check_complexity(kinds=None, parser_defs_file=logspec.default_parser_defs_file,
+                     max_exponent=MAX_EXPONENT, **kwargs):
+    """Measures the growth exponent of the parsing time of every series
+    of every kind of log (see KINDS), or only of the ones in `kinds'.
+    Extra arguments are passed to measure_series().
+
+    Returns a list of results, each one a dict containing:
+      'kind': kind of log
+      'parser': parser id
+      'series': 'size' or 'errors'
+      'points': list of (x, time) tuples measured
+      'exponent': growth exponent of the time
+      'superlinear': True if the exponent is above `max_exponent'
+    """
+    results = []
+    for kind, parser_id in KINDS.items():
+        if kinds and kind not in kinds:
+            continue
+        parser = load_parser(parser_id, parser_defs_file)
+        for series in ('size', 'errors'):
+            points = measure_series(kind, parser, series, **kwargs)
+            exponent = growth_exponent(*zip(*points))
+            results.append({
+                'kind': kind,
+                'parser': parser_id,
+                'series': series,
+                'points': points,
+                'exponent': exponent,
+                'superlinear': exponent > max_exponent,
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Asymptotic complexity check of the parsers")
+    parser.add_argument('-k', '--kind', action='append', dest='kinds', choices=list(KINDS),
+                        help="Kind of log to check (can be repeated, default: all)")
+    parser.add_argument('-m', '--max-exponent', type=float, default=MAX_EXPONENT,
+                        help=f"Maximum growth exponent allowed (default: {MAX_EXPONENT})")
+    parser.add_argument('-s', '--base-size', type=int, default=DEFAULT_BASE_SIZE,
+                        help=f"Size of the first log of a series (default: {DEFAULT_BASE_SIZE})")
+    parser.add_argument('-e', '--base-errors', type=int, default=DEFAULT_BASE_ERRORS,
+                        help="Number of errors of the first log of a series "
+                             f"(default: {DEFAULT_BASE_ERRORS})")
+    parser.add_argument('-n', '--steps', type=int, default=DEFAULT_STEPS,
+                        help=f"Number of doubling steps of a series (default: {DEFAULT_STEPS})")
+    args = parser.parse_args(argv)
+
+    results = check_complexity(args.kinds, max_exponent=args.max_exponent,
+                               base_size=args.base_size, base_errors=args.base_errors,
+                               steps=args.steps)
+    for r in results:
+        status = "SUPERLINEAR" if r['superlinear'] else "ok"
+        print(f"{r['kind']:<10} {r['series']:<7} exponent: {r['exponent']:.2f}  {status}")
+    return 1 if any(r['superlinear'] for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
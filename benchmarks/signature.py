@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Speed of the signature engine versions (see utils.signature).
+
+Every kind of log is generated with many errors (see
+benchmarks.synthetic) and parsed once. Then the signatures of all the
+errors found are generated again with every version of the signature
+engine, and the best time of several runs is reported, together with
+the speedup of the default version over version 1.
+
+Usage (from the repository root):
+
+    python -m benchmarks.signature [--kind KIND] [--size CHARS] [--errors N]
+"""
+
+import argparse
+import sys
+import time
+
+import logspec
+from benchmarks.synthetic import KINDS, generate_log
+from logspec.main import load_parser, parse_log
+from logspec.utils.signature import DEFAULT_SIGNATURE_VERSION, SIGNATURE_VERSIONS, signature_engine
+
+DEFAULT_SIZE = 4 * 1024 * 1024
+DEFAULT_ERRORS = 2000
+DEFAULT_REPEAT = 5
+
+
+def _signature_time(errors, version, repeat):
+    """Returns the minimum time (seconds) to generate the signatures of
+    all the `errors' with the signature engine `version' in `repeat'
+    runs.
+    """
+    times = []
+    with signature_engine(version):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for error in errors:
+                error._generate_signature()
+            times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def compare_signature_versions(kinds=None, parser_defs_file=logspec.default_parser_defs_file,
+                               size=DEFAULT_SIZE, num_errors=DEFAULT_ERRORS,
+                               repeat=DEFAULT_REPEAT):
+    """Measures the time to generate the signatures of the errors of a
+    synthetic log of every kind (see KINDS), or only of the ones in
+    `kinds', with every version of the signature engine.
+
+    Returns a list of results, each one a dict containing:
+      'kind': kind of log
+      'parser': parser id
+      'errors': number of errors found in the log
+      'times': dict with the time (seconds) of every engine version
+      'speedup': speedup of the default version over version 1
+    """
+    results = []
+    for kind, parser_id in KINDS.items():
+        if kinds and kind not in kinds:
+            continue
+        parser = load_parser(parser_id, parser_defs_file)
+        log, _ = generate_log(kind, size, num_errors)
+        errors = parse_log(log, parser)['errors']
+        times = {version: _signature_time(errors, version, repeat)
+                 for version in SIGNATURE_VERSIONS}
+        results.append({
+            'kind': kind,
+            'parser': parser_id,
+            'errors': len(errors),
+            'times': times,
+            'speedup': times[1] / times[DEFAULT_SIGNATURE_VERSION] if errors else None,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Speed of the signature engine versions")
+    parser.add_argument('-k', '--kind', action='append', dest='kinds', choices=list(KINDS),
+                        help="Kind of log to check (can be repeated, default: all)")
+    parser.add_argument('-s', '--size', type=int, default=DEFAULT_SIZE,
+                        help=f"Size of the synthetic logs (default: {DEFAULT_SIZE})")
+    parser.add_argument('-e', '--errors', type=int, default=DEFAULT_ERRORS,
+                        help=f"Number of errors of the synthetic logs (default: {DEFAULT_ERRORS})")
+    parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Number of runs per version (default: {DEFAULT_REPEAT})")
+    args = parser.parse_args(argv)
+
+    results = compare_signature_versions(args.kinds, size=args.size,
+                                         num_errors=args.errors, repeat=args.repeat)
+    for r in results:
+        times = "  ".join(f"v{version}: {t * 1000:.1f} ms" for version, t in r['times'].items())
+        speedup = f"{r['speedup']:.1f}x" if r['speedup'] else "-"
+        print(f"{r['kind']:<10} {r['errors']:>6} errors  {times}  speedup: {speedup}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Deterministic generator of synthetic logs for scaling tests.
+
+The logs are assembled from fragments of the test logs (see LOG_DIR):
+a bootloader and kernel start preamble, error-free filler lines and
+error reports, which are placed at random positions between the filler
+lines. The same kind, size, number of errors and seed always produce
+the same log.
+
+Supported kinds of logs (see KINDS for the parser of each one):
+  'boot': a Linux boot with kernel error reports, up to a prompt
+  'baseline': a Linux boot followed by a baseline test with dmesg
+      errors
+  'kselftest': a Linux boot followed by a kselftest run with failed
+      tests
+  'kbuild': a kernel build with compiler warnings that ends with a
+      build error. The kbuild parser reports only the first build
+      error, so the number of errors is the number of warnings in this
+      case, and only the final error is expected
+
+Together with the log, the generator returns the list of errors that
+the parser is expected to find, each one as returned by
+Error.fields_to_serialize(). They're obtained by parsing every error
+fragment in isolation.
+
+Usage (from the repository root):
+
+    python -m benchmarks.synthetic KIND SIZE ERRORS [--seed SEED]
+        [--output LOG_FILE] [--expected JSON_FILE]
+"""
+
+import argparse
+import functools
+import json
+import os
+import random
+import re
+import sys
+
+from logspec.errors.kbuild import find_kbuild_error
+from logspec.utils.defs import LINUX_TIMESTAMP
+from logspec.utils.linux_kernel_errors import find_kernel_error
+from logspec.utils.test_baseline_errors import find_test_baseline_dmesg_error
+from logspec.utils.test_kselftest_errors import find_test_kselftest_error
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       'tests', 'logs')
+
+# Parser used for each kind of log
+KINDS = {
+    'boot': 'generic_linux_boot',
+    'baseline': 'test_baseline',
+    'kselftest': 'test_kselftest',
+    'kbuild': 'kbuild',
+}
+
+# Lines that aren't used as filler, since they may contain a marker
+# searched by the parsers
+MARKERS_REGEX = re.compile(r'/ #|BUG|[Ee]rror|ERROR|[Pp]anic|cut here|UBSAN|end trace|'
+                           r'kern  :|selftests|kselftest|dmesg|\*\*\*|[Ww]arning|WARNING|'
+                           r'Oops|[Cc]all [Tt]race|=====|Booting Linux|Starting kernel|'
+                           r'jumping to kernel|Booting from ROM')
+MAX_FILLER_LINE_LENGTH = 200
+
+# Error fragments: log file, regex of the first line and regex of the
+# last line of the fragment
+KERNEL_ERROR_FRAGMENTS = [
+    ('linux_boot/linux_boot_002.log', r'Kernel panic - not syncing', r'---\[ end Kernel panic'),
+    ('linux_boot/linux_boot_005.log', r'-+\[ cut here \]', r'---\[ end trace'),
+    ('linux_boot/linux_boot_005.log', r'\] BUG: unable to handle', r'---\[ end trace'),
+    ('linux_boot/linux_boot_006.log', r'\] UBSAN:', r'=====|---\[ end trace'),
+]
+KBUILD_ERROR_FRAGMENT = ('kbuild/kbuild_001.log', r'r535\.c: In function',
+                         r'make\[5\]: \*\*\* \[scripts/Makefile.build:485')
+KBUILD_WARNING_REGEX = re.compile(r'^\S+:\d+:\d+: warning: ')
+
+
+def _read_lines(log_file):
+    with open(os.path.join(LOG_DIR, log_file), 'r') as f:
+        return f.read().split('\n')
+
+
+def _fragment(log_file, first_regex, last_regex):
+    """Returns the lines of `log_file' from the first one that matches
+    `first_regex' to the first one after it that matches `last_regex'.
+    """
+    lines = _read_lines(log_file)
+    first = next(i for i, line in enumerate(lines) if re.search(first_regex, line))
+    last = next(i for i, line in enumerate(lines[first:], first)
+                if re.search(last_regex, line))
+    return lines[first:last + 1]
+
+
+def _is_filler(line):
+    return (line and len(line) <= MAX_FILLER_LINE_LENGTH
+            and not MARKERS_REGEX.search(line))
+
+
+def _find_errors(find_error, text):
+    """Runs an error finder function over `text' and returns the list
+    of errors found, serialized (see Error.fields_to_serialize()).
+    """
+    errors = []
+    start = 0
+    while True:
+        error = find_error(text, start, len(text))
+        if not error:
+            break
+        start = error['_end']
+        if error['error']:
+            errors.append(error['error'].fields_to_serialize())
+    return errors
+
+
+@functools.cache
+def _fragments():
+    """Loads the fragments of the test logs used to build the synthetic
+    logs.
+    """
+    fragments = {}
+    boot_lines = _read_lines('linux_boot/linux_boot_002.log')
+    kernel_start = next(i for i, line in enumerate(boot_lines) if 'Linux version' in line)
+    fragments['preamble'] = boot_lines[:kernel_start + 1]
+    timestamp = re.compile(LINUX_TIMESTAMP)
+    fragments['kernel_filler'] = [
+        line
+        for n in range(1, 10)
+        for line in _read_lines(f'linux_boot/linux_boot_{n:03}.log')
+        if timestamp.match(line) and _is_filler(line)
+    ]
+    fragments['kernel_errors'] = [_fragment(*f) for f in KERNEL_ERROR_FRAGMENTS]
+    fragments['dmesg_errors'] = [
+        line
+        for n in (3, 4)
+        for line in _read_lines(f'test_baseline/test_baseline_{n:03}.log')
+        if line.startswith('kern  :')
+    ]
+    kselftest_lines = _read_lines('test_kselftest/test_kselftest_001.log')
+    fragments['kselftest_filler'] = [
+        line for line in kselftest_lines
+        if line.startswith('# ') and _is_filler(line)
+    ]
+    fragments['kselftest_names'] = sorted({
+        m.group(1) for line in kselftest_lines
+        if (m := re.match(r'# selftests: (\S+: \S+)$', line))
+    })
+    fragments['kbuild_filler'] = [
+        line
+        for n in range(1, 19)
+        for line in _read_lines(f'kbuild/kbuild_{n:03}.log')
+        if re.match(r'  [A-Z]{2,}', line) and _is_filler(line)
+    ]
+    kbuild_13 = _read_lines('kbuild/kbuild_013.log')
+    fragments['kbuild_warnings'] = [
+        kbuild_13[i:i + 3] for i, line in enumerate(kbuild_13)
+        if KBUILD_WARNING_REGEX.match(line) and not MARKERS_REGEX.search(
+            '\n'.join(kbuild_13[i + 1:i + 3]))
+    ]
+    fragments['kbuild_error'] = _fragment(*KBUILD_ERROR_FRAGMENT)
+    return fragments
+
+
+def _mix(rng, filler, blocks, size):
+    """Returns a list of lines made of random `filler' lines, up to
+    approximately `size' characters, with the `blocks' (lists of lines)
+    inserted at random positions between them, in order.
+    """
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(filler)
+        lines.append(line)
+        length += len(line) + 1
+    positions = sorted(rng.randrange(len(lines) + 1) for _ in blocks)
+    mixed = []
+    last = 0
+    for position, block in zip(positions, blocks):
+        mixed.extend(lines[last:position])
+        mixed.extend(block)
+        last = position
+    mixed.extend(lines[last:])
+    return mixed
+
+
+def _generate_boot(rng, fragments, size, num_errors):
+    blocks = [rng.choice(fragments['kernel_errors']) for _ in range(num_errors)]
+    lines = fragments['preamble'] + _mix(rng, fragments['kernel_filler'], blocks, size)
+    lines.append('/ #')
+    expected = _find_errors(find_kernel_error, '\n'.join(line for b in blocks for line in b))
+    return lines, expected
+
+
+def _generate_baseline(rng, fragments, size, num_errors):
+    lines = fragments['preamble'] + _mix(rng, fragments['kernel_filler'], [], size // 2)
+    lines.extend([
+        '/ # ',
+        '+ KERNELCI_LAVA=y /bin/sh /opt/kernelci/dmesg.sh',
+    ])
+    blocks = [[rng.choice(fragments['dmesg_errors'])] for _ in range(num_errors)]
+    lines.extend(_mix(rng, fragments['kernel_filler'], blocks, size // 2))
+    lines.append('/ # ')
+    expected = _find_errors(find_test_baseline_dmesg_error,
+                            '\n'.join(b[0] for b in blocks))
+    return lines, expected
+
+
+def _generate_kselftest(rng, fragments, size, num_errors):
+    lines = fragments['preamble'] + _mix(rng, fragments['kernel_filler'], [], size // 2)
+    lines.extend([
+        '/ # ',
+        '+ ./kselftest.sh -c exec -T  -t kselftest.tar.gz',
+    ])
+    # Every test has about the same amount of output, and `num_errors'
+    # of them fail. The last one always passes: its result line marks
+    # the end of the test run, which cuts the error summary
+    num_tests = max(num_errors + 1, size // 2 // 4096)
+    failed = set(rng.sample(range(num_tests - 1), num_errors))
+    test_size = size // 2 // num_tests
+    errors_text = []
+    for n in range(num_tests):
+        name = rng.choice(fragments['kselftest_names'])
+        lines.append(f'# selftests: {name}')
+        lines.extend(_mix(rng, fragments['kselftest_filler'], [], test_size))
+        if n in failed:
+            lines.append(f'not ok {n + 1} selftests: {name} # exit=1')
+            errors_text.append(lines[-1])
+        else:
+            lines.append(f'ok {n + 1} selftests: {name}')
+    lines.append('/ #')
+    expected = _find_errors(find_test_kselftest_error, '\n'.join(errors_text))
+    return lines, expected
+
+
+def _generate_kbuild(rng, fragments, size, num_errors):
+    blocks = [rng.choice(fragments['kbuild_warnings']) for _ in range(num_errors)]
+    lines = _mix(rng, fragments['kbuild_filler'], blocks, size)
+    lines.extend(fragments['kbuild_error'])
+    lines.extend(rng.choice(fragments['kbuild_filler']) for _ in range(16))
+    # The kbuild parser stops at the first build error
+    expected = _find_errors(find_kbuild_error, '\n'.join(fragments['kbuild_error']))[:1]
+    return lines, expected
+
+
+_GENERATORS = {
+    'boot': _generate_boot,
+    'baseline': _generate_baseline,
+    'kselftest': _generate_kselftest,
+    'kbuild': _generate_kbuild,
+}
+
+
+def generate_log(kind, size, num_errors, seed=0):
+    """Generates a synthetic log.
+
+    Parameters:
+      kind: kind of log (see KINDS)
+      size: approximate size of the log (characters). The log can be
+          larger if the errors don't fit in it
+      num_errors: number of errors in the log
+      seed: seed of the random generator
+
+    Returns:
+      A tuple containing the log (str) and the list of errors expected
+      to be found in it, as returned by Error.fields_to_serialize().
+    """
+    if kind not in _GENERATORS:
+        raise ValueError(f"Unknown kind of log: {kind}")
+    rng = random.Random(f'{kind}:{size}:{num_errors}:{seed}')
+    lines, expected = _GENERATORS[kind](rng, _fragments(), size, num_errors)
+    return '\n'.join(lines) + '\n', expected
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic log")
+    parser.add_argument('kind', choices=list(KINDS), help="Kind of log")
+    parser.add_argument('size', type=int, help="Approximate size of the log (characters)")
+    parser.add_argument('errors', type=int, help="Number of errors in the log")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('-o', '--output', help="Log file to write (default: stdout)")
+    parser.add_argument('-e', '--expected',
+                        help="Write the list of expected errors to this JSON file")
+    args = parser.parse_args(argv)
+
+    log, expected = generate_log(args.kind, args.size, args.errors, args.seed)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            output_file.write(log)
+    else:
+        sys.stdout.write(log)
+    if args.expected:
+        with open(args.expected, 'w') as expected_file:
+            json.dump(expected, expected_file, indent=4, sort_keys=True, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
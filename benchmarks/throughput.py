@@ -0,0 +1,246 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Throughput benchmark of the parsers over the test log corpus.
+
+Every parser defined in the parser definitions file that has a
+matching directory of logs in the corpus (see CORPUS) parses all the
+logs in it `repeat' times, in a separate process. For each parser, the
+benchmark reports:
+  'logs': number of logs parsed
+  'bytes': total size of the logs (bytes)
+  'mb_per_s': throughput, in MB (10^6 bytes) per second
+  'logs_per_s': number of logs parsed per second
+  'p50_latency': median time (seconds) to parse a log
+  'p99_latency': 99th percentile of the time (seconds) to parse a log
+  'peak_rss': peak resident set size (KB) of the process that ran the
+      parser
+
+The results are written as JSON and can be compared against a stored
+baseline (see compare_results()). A result worse than the baseline by
+more than the tolerance is reported as a regression.
+
+The results depend on the machine, so the baseline isn't part of the
+repository: it must be generated on the machine where the benchmark
+runs, with `--update-baseline', before comparing any results against
+it. The baseline records the machine where it was generated (see
+machine_info()) and a comparison on a different machine is refused.
+
+Usage (from the repository root):
+
+    python -m benchmarks.throughput [--output results.json]
+        [--baseline benchmarks/baseline.json] [--update-baseline]
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import yaml
+
+import logspec
+from logspec.main import load_parser, parse_log_file
+
+# Log directories of the corpus (under `LOG_DIR') used for each parser.
+# Key: parser id, value: log directory
+CORPUS = {
+    'kbuild': 'kbuild',
+    'generic_linux_boot': 'linux_boot',
+    'test_baseline': 'test_baseline',
+    'test_kselftest': 'test_kselftest',
+}
+LOG_DIR = 'tests/logs'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Metrics compared against the baseline.
+# Key: metric, value: True if higher is better, False otherwise
+METRICS = {
+    'mb_per_s': True,
+    'logs_per_s': True,
+    'p50_latency': False,
+    'p99_latency': False,
+    'peak_rss': False,
+}
+DEFAULT_TOLERANCE = 0.25
+
+
+def machine_info():
+    """Returns a dict that identifies the machine (and Python version)
+    where the benchmark runs.
+    """
+    return {
+        'node': platform.node(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+    }
+
+
+def percentile(values, pct):
+    """Returns the `pct' percentile (nearest rank) of a list of values."""
+    values = sorted(values)
+    rank = max(1, -(-len(values) * pct // 100))
+    return values[int(rank) - 1]
+
+
+def _run_parser_benchmark(parser_id, parser_defs_file, log_files, repeat):
+    """Parses the `log_files' with a parser `repeat' times (after a
+    warm-up run) and returns the benchmark results of the parser (see
+    the module documentation). Meant to be run in a separate process,
+    so that the peak RSS is the one of this parser only.
+    """
+    parser = load_parser(parser_id, parser_defs_file)
+    for log_file in log_files:
+        parse_log_file(log_file, parser)
+    latencies = []
+    for _ in range(repeat):
+        for log_file in log_files:
+            start = time.perf_counter()
+            parse_log_file(log_file, parser)
+            latencies.append(time.perf_counter() - start)
+    total_time = sum(latencies)
+    total_bytes = sum(os.path.getsize(log_file) for log_file in log_files)
+    return {
+        'logs': len(log_files),
+        'bytes': total_bytes,
+        'mb_per_s': total_bytes * repeat / total_time / 1e6,
+        'logs_per_s': len(latencies) / total_time,
+        'p50_latency': percentile(latencies, 50),
+        'p99_latency': percentile(latencies, 99),
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def run_benchmarks(parser_defs_file=logspec.default_parser_defs_file, repeat=5,
+                   parser_ids=None, log_dir=LOG_DIR):
+    """Runs the benchmark of every parser in `parser_defs_file' (or
+    only the ones in `parser_ids') that has a corpus of logs.
+
+    Returns:
+      A dict with the results of every parser (see the module
+      documentation), indexed by parser id.
+    """
+    with open(parser_defs_file, 'r') as parser_file:
+        parser_defs = yaml.safe_load(parser_file)
+    results = {}
+    context = multiprocessing.get_context('spawn')
+    for parser_id in parser_defs['parsers']:
+        if parser_ids and parser_id not in parser_ids:
+            continue
+        if parser_id not in CORPUS:
+            continue
+        log_files = sorted(glob.glob(os.path.join(log_dir, CORPUS[parser_id], '*.log')))
+        if not log_files:
+            continue
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[parser_id] = pool.submit(_run_parser_benchmark, parser_id,
+                                             parser_defs_file, log_files, repeat).result()
+    return results
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compares benchmark results against a baseline. A metric (see
+    METRICS) is a regression if it's worse than the baseline by more
+    than `tolerance' (fraction of the baseline value). Parsers or
+    metrics that aren't in both `results' and `baseline' are ignored.
+
+    Returns:
+      A list of regressions, each one a dict containing:
+        'parser': parser id
+        'metric': metric name
+        'baseline': value in the baseline
+        'value': value in the results
+    """
+    regressions = []
+    for parser_id, parser_results in results.items():
+        parser_baseline = baseline.get(parser_id, {})
+        for metric, higher_is_better in METRICS.items():
+            if metric not in parser_results or metric not in parser_baseline:
+                continue
+            value = parser_results[metric]
+            reference = parser_baseline[metric]
+            if higher_is_better:
+                regression = value < reference * (1 - tolerance)
+            else:
+                regression = value > reference * (1 + tolerance)
+            if regression:
+                regressions.append({
+                    'parser': parser_id,
+                    'metric': metric,
+                    'baseline': reference,
+                    'value': value,
+                })
+    return regressions
+
+
+def format_results(results):
+    """Returns a table (str) with the benchmark results."""
+    lines = [f"{'parser':<20} {'logs':>5} {'MB/s':>9} {'logs/s':>9} "
+             f"{'p50 (ms)':>9} {'p99 (ms)':>9} {'RSS (KB)':>10}"]
+    for parser_id, r in results.items():
+        lines.append(f"{parser_id:<20} {r['logs']:>5} {r['mb_per_s']:>9.2f} "
+                     f"{r['logs_per_s']:>9.2f} {r['p50_latency'] * 1000:>9.2f} "
+                     f"{r['p99_latency'] * 1000:>9.2f} {r['peak_rss']:>10}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmark of the logspec parsers")
+    parser.add_argument('-d', '--parser-defs',
+                        help="Parser definitions yaml file (default: logspec/parser_defs.yaml)",
+                        default=logspec.default_parser_defs_file)
+    parser.add_argument('-p', '--parser', action='append', dest='parsers',
+                        help="Parser to benchmark (can be repeated, default: all)")
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help="Number of times every log is parsed (default: 5)")
+    parser.add_argument('-o', '--output', help="Write the results to this JSON file")
+    parser.add_argument('-b', '--baseline', default=DEFAULT_BASELINE,
+                        help="Baseline JSON file to compare the results against "
+                             "(default: benchmarks/baseline.json)")
+    parser.add_argument('-t', '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Tolerated fraction of degradation from the baseline "
+                             f"(default: {DEFAULT_TOLERANCE})")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Write the results to the baseline file instead of "
+                             "comparing them (required once on every machine)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.parser_defs, args.repeat, args.parsers)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=4, sort_keys=True)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'machine': machine_info(), 'results': results}, baseline_file,
+                      indent=4, sort_keys=True)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline found at {args.baseline}, generate it on this machine "
+              "with --update-baseline")
+        return 2
+    with open(args.baseline, 'r') as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get('machine') != machine_info():
+        print(f"The baseline at {args.baseline} was generated on another machine, "
+              "generate it on this machine with --update-baseline")
+        return 2
+    regressions = compare_results(results, baseline['results'], args.tolerance)
+    for r in regressions:
+        print(f"REGRESSION: {r['parser']} {r['metric']}: {r['value']:.6g} "
+              f"(baseline: {r['baseline']:.6g})")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,8 +20,8 @@
 import argparse
 import asyncio
 from copy import deepcopy
-import gzip
 import hashlib
+import io
 import json
 import logging
 import sys
@@ -30,6 +30,7 @@ import psycopg2
 import aiohttp
 
 import logspec.main
+from logspec.utils.compression import open_log_stream
 
 
 # Configuration tables per object type
@@ -90,9 +91,9 @@ object_types = {
 
 
 async def get_log(session, log_url):
-    """Retrieves a raw test log from a url, unzipping it if it's
-    gzipped. Returns the log text, or None if the log couldn't be
-    downloaded or if it's empty.
+    """Retrieves a raw test log from a url. Returns a text stream that
+    reads the log, decompressing it incrementally if it's compressed, or
+    None if the log couldn't be downloaded or if it's empty.
     """
     # global https_sessions
     if not log_url:
@@ -102,12 +103,9 @@ async def get_log(session, log_url):
         if response.status != 200:
             return
         logbytes = await response.read()
-        try:
-            raw_bytes = gzip.decompress(logbytes)
-            log = raw_bytes.decode('utf-8')
-        except gzip.BadGzipFile:
-            log = logbytes.decode('utf-8')
-        return log
+        if not logbytes:
+            return None
+        return open_log_stream(io.BytesIO(logbytes), encoding='utf-8', newline='')
 
 
 def get_logspec_errors(parsed_data, parser):
@@ -126,8 +124,8 @@ def get_logspec_errors(parsed_data, parser):
     for error in errors:
         logspec_dict = {}
         logspec_dict.update(base_dict)
-        logspec_dict['error'] = {k: v for k, v in vars(error).items()
-                                 if v and not k.startswith('_')}
+        logspec_dict['error'] = {k: v for k, v in error.fields_to_serialize().items()
+                                 if v}
         logspec_dict['error']['signature'] = error._signature
         logspec_dict['error']['log_excerpt'] = error._report
         errors_list.append(logspec_dict)
@@ -223,7 +221,10 @@ async def process_log(session, log_url, parser, start_state, log_cache):
         log = await get_log(session, log_url)
         if not log:
             return
-        parsed_data = logspec.main.parse_log(log, start_state)
+        with log:
+            # The KCIDB issue ids are generated from the error
+            # signatures, keep them stable
+            parsed_data = logspec.main.parse_log_stream(log, start_state, signature_version=1)
         # Update the cached processing here
         log_cache[log_url] = get_logspec_errors(parsed_data, parser)
 
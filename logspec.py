@@ -6,12 +6,20 @@
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
 import argparse
+import contextlib
 import json
 import logging
 import sys
 import logspec.main
+from logspec.utils.cache import ResultCache
 from logspec.utils.defs import JsonSerialize
-from logspec.main import load_parser_and_parse_log, format_data_output
+from logspec.utils.jsonl import JsonLinesWriter
+from logspec.main import load_parser, parse_log_file, follow_log, format_data_output
+from logspec.utils.follow import load_checkpoint, save_checkpoint, load_errors, \
+    append_errors
+from logspec.utils.profile import chrome_trace
+from logspec.utils.regex_stats import collect_regex_stats, format_regex_stats
+from logspec.utils.signature import DEFAULT_SIGNATURE_VERSION, SIGNATURE_VERSIONS
 
 
 def debug_parse_log_file(log_file):
@@ -31,19 +39,79 @@ if __name__ == '__main__':
                         help="Parser definitions yaml file (default: logspec/parser_defs.yaml)",
                         default=logspec.default_parser_defs_file)
     parser.add_argument('-o', '--output',
-                        help="Output type: info (default), debug, json (json output only)",
+                        help=("Output type: info (default), debug, json (json output only), "
+                              "jsonl (compact json in a single line)"),
                         default='info')
     parser.add_argument('--json-full', action='store_true',
                         help=("Enable full JSON serialization, including debug fields "
                               "(disabled by default)"),
                         default=False)
-    parser.add_argument('log', help="Log file to analyze", nargs='?')
+    parser.add_argument('--window-size', type=int,
+                        help=("Parse the log in windows of WINDOW_SIZE characters instead "
+                              "of reading it completely in memory (disabled by default)"),
+                        default=None)
+    parser.add_argument('--profile', metavar='TRACE_FILE',
+                        help=("Profile the parsing: add the time spent in every state to "
+                              "the `_profile' field of the output (see --json-full) and "
+                              "write it to TRACE_FILE in Chrome trace format"),
+                        default=None)
+    parser.add_argument('--regex-stats', type=int, metavar='N',
+                        help=("Collect the usage statistics of the regex patterns and "
+                              "print the N patterns that took the longest time"),
+                        default=None)
+    parser.add_argument('--max-time', type=float, metavar='SECONDS',
+                        help=("Stop the parsing after SECONDS and return the results found "
+                              "so far (no limit by default)"),
+                        default=None)
+    parser.add_argument('--max-size', type=int, metavar='CHARS',
+                        help="Parse only the first CHARS characters of the log (no limit by default)",
+                        default=None)
+    parser.add_argument('--max-errors', type=int, metavar='N',
+                        help="Stop the parsing after N errors (no limit by default)",
+                        default=None)
+    parser.add_argument('--verdict', action='store_true',
+                        help=("Quick-verdict mode: report only the outcome of the log and "
+                              "the first error of each type, without error details"),
+                        default=False)
+    parser.add_argument('--fields', metavar='FIELD,...',
+                        help=("Comma-separated list of the error fields to output, the "
+                              "rest are removed from the errors (default: all)"),
+                        default=None)
+    parser.add_argument('--signature-version', type=int, choices=SIGNATURE_VERSIONS,
+                        help=("Version of the error signatures: 1 for the SHA-1 signatures "
+                              "of the older logspec versions "
+                              f"(default: {DEFAULT_SIGNATURE_VERSION})"),
+                        default=None)
+    parser.add_argument('--cache', metavar='DIR',
+                        help=("Keep the parsing results in a cache in DIR and reuse them "
+                              "when the same log is parsed again (disabled by default)"),
+                        default=None)
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help=("Search the errors of large logs in parallel with N worker "
+                              "processes (disabled by default)"),
+                        default=None)
+    parser.add_argument('--follow', action='store_true',
+                        help=("Parse the log while it's being written and report the errors "
+                              "as soon as they're found. Use '-' as the log to read it from "
+                              "the standard input"),
+                        default=False)
+    parser.add_argument('--idle-timeout', type=float, metavar='SECONDS',
+                        help=("In follow mode, consider the log complete when no new text "
+                              "arrives for SECONDS (default: wait until the input is closed)"),
+                        default=None)
+    parser.add_argument('--checkpoint', metavar='FILE',
+                        help=("In follow mode, keep the progress of the parsing in FILE (and "
+                              "the errors reported in FILE.errors) and resume it from there "
+                              "if FILE exists"),
+                        default=None)
+    parser.add_argument('log', help="Log file to analyze (plain, gzip, xz or zstd)",
+                        nargs='?')
     parser.add_argument('parser', help="Parser to use for the log analysis", nargs='?')
     args = parser.parse_args()
     logging.basicConfig(format='%(levelname)s:%(message)s')
     if args.output == 'debug':
         logging.getLogger().setLevel(logging.DEBUG)
-    elif args.output == 'json':
+    elif args.output in ('json', 'jsonl'):
         logging.disable(logging.INFO)
     elif args.output == 'info':
         logging.getLogger().setLevel(logging.INFO)
@@ -58,8 +126,69 @@ if __name__ == '__main__':
         logging.error("<log> and <parser> arguments are mandatory")
         sys.exit(1)
 
-    data = load_parser_and_parse_log(args.log, args.parser, args.parser_defs)
-    if args.json_full:
+    parser = load_parser(args.parser, args.parser_defs)
+    fields = args.fields.split(',') if args.fields else None
+    if args.follow:
+        unsupported = [option for option, value in (
+            ('--profile', args.profile), ('--regex-stats', args.regex_stats),
+            ('--max-time', args.max_time), ('--max-size', args.max_size),
+            ('--verdict', args.verdict), ('--cache', args.cache),
+            ('--workers', args.workers)) if value]
+        if unsupported:
+            logging.error(f"{', '.join(unsupported)} can't be used with --follow")
+            sys.exit(1)
+        writer = JsonLinesWriter(sys.stdout, full=args.json_full)
+        checkpoint = reported_errors = None
+        if args.checkpoint:
+            # The errors reported up to the checkpoint are kept in a
+            # separate file
+            errors_file = f'{args.checkpoint}.errors'
+            checkpoint = load_checkpoint(args.checkpoint)
+            reported_errors = load_errors(errors_file,
+                                          checkpoint['error_count'] if checkpoint else 0)
+        follow_options = {'window_size': args.window_size} if args.window_size else {}
+        for record in follow_log(sys.stdin.buffer if args.log == '-' else args.log, parser,
+                                 checkpoint, max_errors=args.max_errors, fields=fields,
+                                 signature_version=args.signature_version,
+                                 idle_timeout=args.idle_timeout,
+                                 reported_errors=reported_errors, **follow_options):
+            for error in record['errors']:
+                if args.output == 'jsonl':
+                    writer.write_error(error)
+                else:
+                    logging.info(f"New error: {format_data_output(error, args.json_full)}")
+            if args.checkpoint:
+                append_errors(record['errors'], errors_file)
+                save_checkpoint(record['checkpoint'], args.checkpoint)
+        data = record['data']
+        if '_truncated' in data:
+            logging.warning(f"Parsing truncated ({data['_truncated']} limit reached)")
+        if args.output == 'jsonl':
+            writer.write(data)
+        else:
+            print(format_data_output(data, args.json_full))
+        sys.exit(0)
+    with contextlib.ExitStack() as stack:
+        if args.regex_stats:
+            regex_stats = stack.enter_context(collect_regex_stats())
+        data = parse_log_file(args.log, parser, args.window_size,
+                              profile=bool(args.profile), max_time=args.max_time,
+                              max_size=args.max_size, max_errors=args.max_errors,
+                              verdict=args.verdict,
+                              fields=fields,
+                              signature_version=args.signature_version,
+                              cache=ResultCache(args.cache) if args.cache else None,
+                              workers=args.workers)
+    if '_truncated' in data:
+        logging.warning(f"Parsing truncated ({data['_truncated']} limit reached)")
+    if args.regex_stats:
+        print(format_regex_stats(regex_stats, args.regex_stats), file=sys.stderr)
+    if args.profile:
+        with open(args.profile, 'w') as trace_file:
+            json.dump(chrome_trace(data['_profile']), trace_file, indent=4)
+    if args.output == 'jsonl':
+        JsonLinesWriter(sys.stdout, full=args.json_full).write(data)
+    elif args.json_full:
         print(format_data_output(data, full=True))
     else:
         print(format_data_output(data))
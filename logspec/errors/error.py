@@ -3,65 +3,126 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-from logspec.utils.utils import generate_signature
+import functools
+
+from logspec.utils.utils import text_range
+from logspec.utils.signature import SignatureHasher
+from logspec.utils.projection import projected_fields
+from logspec.utils.verdict import in_verdict_mode
 
 
 class Error():
+    """Base class of the error records.
+
+    There can be many thousands of errors in a single log, so the
+    errors don't have a per-instance dict: every subclass declares the
+    fields it adds in `__slots__', and the fields not set by the parser
+    are simply missing from the error. The class-level
+    `_signature_fields' tuple lists the fields used to generate the
+    error signature hash (the ones that aren't set or are empty are
+    skipped).
+    """
+    __slots__ = ('error_type', 'error_summary', '_report', '_signature', '_signature_loc')
+    # Field names used to generate the error signature hash
+    _signature_fields = ('error_type', 'error_summary')
+    # Generate a secondary signature without the error message (see
+    # _generate_signature())
+    _add_signature_loc = False
+    # Fields left out of the secondary signature
+    _signature_loc_excluded = frozenset(('error_summary', 'position'))
+    # Fields with the details of the error. Their extraction is
+    # skipped at parse time when they aren't needed (see
+    # _details_needed())
+    _detail_fields = ()
+
     def __init__(self):
         self.error_type = None
         self.error_summary = ""
         self._report = ""
-        # List of field names used to generate the error signature hash
-        self._signature_fields = [
-            'error_type',
-            'error_summary',
-        ]
         # Error signature hash
         self._signature = ""
 
+    @classmethod
+    @functools.cache
+    def _fields(cls):
+        """Returns the names of all the fields declared in the
+        `__slots__' of the class and its base classes, in declaration
+        order.
+        """
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(klass.__dict__.get('__slots__', ()))
+        return tuple(fields)
+
     def fields_to_serialize(self, full=False):
-        """Returns a dict with the fields to serialize. By default, this
-        excludes all fields starting with '_'. If `full' is set to True,
-        all fields are included.
+        """Returns a dict with the fields to serialize (only those that
+        are set). By default, this excludes all fields starting with
+        '_'. If `full' is set to True, all fields are included.
         """
-        if full:
-            return {k: v for k, v in vars(self).items()}
-        return {k: v for k, v in vars(self).items() if not k.startswith('_')}
+        data = {}
+        for field in self._fields():
+            if not full and field.startswith('_'):
+                continue
+            try:
+                data[field] = getattr(self, field)
+            except AttributeError:
+                continue
+        return data
 
-    def parse(self, text):
-        parse_ret = self._parse(text)
-        self._generate_signature()
-        """When we have compiler errors, gcc and clang give us different
-        error summary messages. That it impossible for the signature matching
-        when we try to use this in KCIDB for example. As a solution,
-        we are generating a sub-signature that consider the line of code that
-        threw the error, but excluding the error message.
+    def _details_needed(self):
+        """Returns True if the detail fields of the error must be
+        extracted: always, unless the parsing runs in verdict mode (see
+        utils.verdict) or the detail fields aren't in the projection of
+        the error fields (see utils.projection) nor used to generate
+        the error signature.
         """
-        if hasattr(self, '_add_signature_loc') and self._add_signature_loc:
-            self._generate_signature_loc()
+        if in_verdict_mode():
+            return False
+        fields = projected_fields()
+        if fields is None:
+            return True
+        return any(f in fields or f in self._signature_fields for f in self._detail_fields)
+
+    def parse(self, text, start=None, end=None):
+        """Parses the error report found in `text' between the `start'
+        and `end' positions and generates the error signature.
+
+        Returns the value returned by the class-specific `_parse()'
+        method, normally the position in `text' where the report ends.
+        """
+        start, end = text_range(text, start, end)
+        parse_ret = self._parse(text, start, end)
+        self._generate_signature()
         return parse_ret
 
     def _generate_signature(self):
-        """Uses utils.generate_signature() to generate a unique hash
-        string for this error, based on a custom set of error fields.
+        """Generates a unique hash string for this error (see
+        utils.signature), based on the fields listed in
+        `_signature_fields' that are set and not empty.
+
+        When we have compiler errors, gcc and clang give us different
+        error summary messages. That it impossible for the signature
+        matching when we try to use this in KCIDB for example. As a
+        solution, if `_add_signature_loc' is set, we are also generating
+        a sub-signature that consider the line of code that threw the
+        error, but excluding the error message. Both are computed in a
+        single pass over the fields: the excluded ones are hashed last.
 
         This method is meant to be called after the parsing has been
         done.
         """
-        self._signature = self._generate_signature_common(self._signature_fields)
-
-    def _generate_signature_loc(self):
-        loc_signature_fields = [f for f in self._signature_fields if f not in {'error_summary', 'position'}]
-
-        self._signature_loc = self._generate_signature_common(loc_signature_fields)
-
-    def _generate_signature_common(self, signature_fields):
-        signature_dict = {}
-        for field in signature_fields:
-            try:
-                val = getattr(self, field)
-                if val:
-                    signature_dict[field] = val
-            except AttributeError:
+        hasher = SignatureHasher()
+        excluded = []
+        for field in self._signature_fields:
+            value = getattr(self, field, None)
+            if not value:
                 continue
-        return generate_signature(signature_dict)
+            if self._add_signature_loc and field in self._signature_loc_excluded:
+                excluded.append((field, value))
+            else:
+                hasher.update(field, value)
+        if self._add_signature_loc:
+            self._signature_loc = hasher.copy().hexdigest()
+            for field, value in excluded:
+                hasher.update(field, value)
+        self._signature = hasher.hexdigest()
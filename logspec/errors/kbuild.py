@@ -3,20 +3,52 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
+import itertools
 import logging
 import os
 import re
 
 from logspec.errors.error import Error
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+from logspec.utils.utils import text_range
 
 TIMESTAMP = r'(?:\d\d:\d\d:\d\d *)?'
 
+MAKE_ERROR_REGEX = register_pattern(__name__, 'make_error', r'make.*?: \*\*\* (?P<error_str>.*)')
+MAKE_ERROR_LINE_REGEX = register_pattern(__name__, 'make_error_line', r'\*\*\*.*')
+MODPOST_ERROR_REGEX = register_pattern(__name__, 'modpost_error', fr'{TIMESTAMP}(?:ERROR|FATAL): modpost: (?P<message>.*)')
+UNINDENTED_LINE_REGEX = register_pattern(__name__, 'unindented_line', r'^[^\s]+.*$', flags=re.MULTILINE)
+UNINDENTED_LINE_TAIL_REGEX = register_pattern(__name__, 'unindented_line_tail', r'[^\s]+.*$', flags=re.MULTILINE)
+SCRIPT_TARGET_REGEX = register_pattern(__name__, 'script_target', r'\[(?P<script>.*?): (?P<target>.*?)\] Error')
+LINKER_TARGET_REGEX = register_pattern(__name__, 'linker_target', r'(?P<script>.*?ld): (?P<target>.*?)\.\w+: (?P<error_str>.*)')
+LINKER_OBJ_FILE_REGEX = register_pattern(__name__, 'linker_obj_file', 'ld: (?P<obj_file>.*?):')
+LINKER_MESSAGE_REGEX = register_pattern(__name__, 'linker_message', 'ld: (?P<message>.*)')
+COMPILER_MESSAGE_REGEX = register_pattern(__name__, 'compiler_message', fr'{TIMESTAMP}(.*?(?P<type>error|warning): (?P<message>.*?)\n)')
+GENERIC_ERROR_MESSAGE_REGEX = register_pattern(__name__, 'generic_error_message', fr'{TIMESTAMP}(.*error:.*)')
+
+# Number of characters of the log before a make error line that are
+# looked at to classify and parse the error
+KBUILD_ERROR_CONTEXT = 256 * 1024
+
 ##### Kbuild error classes
 
 
 class KbuildCompilerError(Error):
     """Models the information extracted from a compiler/linker error.
     """
+    __slots__ = ('script', 'target', 'src_file', 'location', 'line_no', 'position')
+    # `location', `line_no' and `position' are only used when they're
+    # found in the error report
+    _signature_fields = Error._signature_fields + (
+        'src_file',
+        'target',
+        'location',
+        'line_no',
+        'position',
+    )
+    _add_signature_loc = True
+
     def __init__(self, script=None, target=None):
         """Object initializer.
 
@@ -33,11 +65,6 @@ class KbuildCompilerError(Error):
         self.line_no = ""
         self.position = ""
         self.error_type = "kbuild.compiler"
-        self._add_signature_loc = True
-        self._signature_fields.extend([
-            'src_file',
-            'target',
-        ])
 
     def _parse_linker_error(self, text):
         """Parses a linker error message and saves the source file and
@@ -56,7 +83,7 @@ class KbuildCompilerError(Error):
             regex = re.compile(rf'ld: .*?(?P<obj_file>{self.target}\.\w+)')
         else:
             # Target is a relative path
-            regex = re.compile('ld: (?P<obj_file>.*?):')
+            regex = LINKER_OBJ_FILE_REGEX
 
         match = regex.search(text)
         if match:
@@ -71,7 +98,7 @@ class KbuildCompilerError(Error):
                 self.error_summary = match.group('message').strip()
             return True
         # Catch any other linker error
-        match = re.search('ld: (?P<message>.*)', text)
+        match = LINKER_MESSAGE_REGEX.search(text)
         if match:
             self.error_type += ".linker_error"
             self.error_summary = match.group('message')
@@ -93,11 +120,11 @@ class KbuildCompilerError(Error):
         """
         logging.debug(f"[_parse_compiler_error()] text: {text}")
         # Bail out if the error in the text looks like a linker error
-        if re.search('ld: ', text):
+        if LINKER_MESSAGE_REGEX.search(text):
             return False
 
         # Get error type and summary
-        match = re.search(fr'{TIMESTAMP}(.*?(?P<type>error|warning): (?P<message>.*?)\n)', text)
+        match = COMPILER_MESSAGE_REGEX.search(text)
         if match:
             self.error_type += f".{match.group('type')}"
             self.error_summary = match.group(1).strip()
@@ -123,7 +150,7 @@ class KbuildCompilerError(Error):
                 return True
         return False
 
-    def _parse_compiler_error_line(self, text):
+    def _parse_compiler_error_line(self, text, start, end):
         """Searches for and parses compiler errors/warnings that are
         contained in a single line (see the regex below for details).
 
@@ -135,19 +162,20 @@ class KbuildCompilerError(Error):
         drivers/../link_factory.c:743:1: error: the frame size of 1040 bytes is larger than 1024 bytes [-Werror=frame-larger-than=]
         """
         file_pattern = os.path.splitext(self.target)[0]
-        match = re.search(fr'^.*?(?P<src_file>{file_pattern}.*?):(?P<line_no>\d+):(?P<position>\d+): (?P<type>.*?): (?P<message>.*?)\n',
-                          text, flags=re.MULTILINE)
+        regex = re.compile(fr'^.*?(?P<src_file>{file_pattern}.*?):(?P<line_no>\d+):(?P<position>\d+): (?P<type>.*?): (?P<message>.*?)\n',
+                           flags=re.MULTILINE)
+        match = regex.search(text, start, end)
         if match:
-            self._report = text[match.start():]
+            self._report = text[match.start():end]
             self.src_file = match.group('src_file')
             self.line_no = match.group('line_no')
             self.position = match.group('position')
             self.error_type += f".{match.group('type')}"
             self.error_summary = match.group('message')
-            return len(text)
+            return end
         return 0
 
-    def _parse_compiler_error_block(self, text):
+    def _parse_compiler_error_block(self, text, start, end):
         """Parses compiler errors that are laid out in a block of lines.
         It searches for a line that contains the target string, then
         looks for the error block starting after it, where the error
@@ -172,7 +200,7 @@ class KbuildCompilerError(Error):
               |            ^~~~~~~~~~~~~~
         cc1: some warnings being treated as errors
         """
-        def _find_error_block(text, target):
+        def _find_error_block(text, start, end, target):
             """Given a <text> containing one or many compiler error
             outputs and a build <target>, searches for all the error
             blocks in the text related to the target and returns the
@@ -182,7 +210,8 @@ class KbuildCompilerError(Error):
             # Get the start position of the block to parse (ie. the
             # block where the Make target file appears that's closest to
             # the Make failure)
-            matches = re.finditer(f'^.*{target_stem}.*$', text, flags=re.MULTILINE)
+            regex = re.compile(f'^.*{target_stem}.*$', flags=re.MULTILINE)
+            matches = regex.finditer(text, start, end)
             # Get the last match (the last block, if many were found)
             try:
                 *_, match = matches
@@ -192,11 +221,11 @@ class KbuildCompilerError(Error):
 
         # Get the error text block
         logging.debug(f"[_parse_compiler_error_block()] target: {self.target}")
-        block_start = _find_error_block(text, self.target)
+        block_start = _find_error_block(text, start, end, self.target)
         if not block_start:
             return 0
-        self._report = text[block_start:]
-        logging.debug(f"[_parse_compiler_error_block()] block: {text[block_start:]}")
+        self._report = text[block_start:end]
+        logging.debug(f"[_parse_compiler_error_block()] block: {self._report}")
         parsers = [
             self._parse_compiler_error,
             self._parse_linker_error,
@@ -204,9 +233,9 @@ class KbuildCompilerError(Error):
         for parser in parsers:
             if parser(self._report):
                 break
-        return len(text)
+        return end
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a log fragment looking for a compiler error for a
         specific file (self.target) and updates the object with the
         extracted information.
@@ -221,6 +250,8 @@ class KbuildCompilerError(Error):
 
         Parameters:
           text (str): the text log containing the compiler error
+          start (int): position in `text' where the parsing starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the error block ends (if
         found).
@@ -232,15 +263,9 @@ class KbuildCompilerError(Error):
 
         parse_end_pos = 0
         for strat in parse_strategies:
-            parse_end_pos = strat(text)
+            parse_end_pos = strat(text, start, end)
             if parse_end_pos:
                 break
-        if self.location:
-            self._signature_fields.append('location')
-        if self.line_no:
-            self._signature_fields.append('line_no')
-        if self.position:
-            self._signature_fields.append('position')
         return parse_end_pos
 
 
@@ -248,6 +273,9 @@ class KbuildProcessError(Error):
     """Models the information extracted from a kbuild error caused by a
     script, configuration or other runtime error.
     """
+    __slots__ = ('script', 'target')
+    _signature_fields = Error._signature_fields + ('script', 'target')
+
     def __init__(self, script=None, target=None):
         """Object initializer.
 
@@ -258,12 +286,8 @@ class KbuildProcessError(Error):
         super().__init__()
         self.script = script
         self.target = target
-        self._signature_fields.extend([
-            'script',
-            'target',
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a log fragment looking for a generic Kbuild error
         and updates the object with the extracted information.
 
@@ -271,27 +295,32 @@ class KbuildProcessError(Error):
 
         Parameters:
           text (str): the text log containing the error
+          start (int): position in `text' where the parsing starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the error block ends (if
         found).
         """
-        end = 0
+        parse_end = 0
         self.error_type = "kbuild.make"
-        match = re.finditer(r'\*\*\*.*', text)
+        match = MAKE_ERROR_LINE_REGEX.finditer(text, start, end)
         summary_strings = []
         for m in match:
             self._report += f"{m.group(0)}\n"
             summary_strings.append(m.group(0).strip('*\n '))
-            end = m.end()
+            parse_end = m.end()
         if summary_strings:
             self.error_summary = " ".join([string for string in summary_strings if string])
-        return end
+        return parse_end
 
 
 class KbuildModpostError(Error):
     """Models the information extracted from a kbuild error in the
     modpost target.
     """
+    __slots__ = ('script', 'target')
+    _signature_fields = Error._signature_fields + ('script', 'target')
+
     def __init__(self, script=None, target=None):
         """Object initializer.
 
@@ -302,12 +331,8 @@ class KbuildModpostError(Error):
         super().__init__()
         self.script = script
         self.target = target
-        self._signature_fields.extend([
-            'script',
-            'target',
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a log fragment looking for a modpost Kbuild error
         and updates the object with the extracted information.
 
@@ -315,21 +340,23 @@ class KbuildModpostError(Error):
 
         Parameters:
           text (str): the text log containing the modpost error
+          start (int): position in `text' where the parsing starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the error block ends (if
         found).
         """
-        end = 0
+        parse_end = 0
         self.error_type = "kbuild.modpost"
-        match = re.finditer(fr'{TIMESTAMP}(?:ERROR|FATAL): modpost: (?P<message>.*)', text)
+        match = MODPOST_ERROR_REGEX.finditer(text, start, end)
         summary_strings = []
         for m in match:
             self._report += f"{m.group(0)}\n"
             summary_strings.append(m.group('message'))
-            end = m.end()
+            parse_end = m.end()
         if summary_strings:
             self.error_summary = " ".join(summary_strings)
-        return end
+        return parse_end
 
 
 class KbuildGenericError(Error):
@@ -338,6 +365,9 @@ class KbuildGenericError(Error):
     look like a known Kbuild error but for which we don't have enough
     info to really tell which type it is.
     """
+    __slots__ = ('script', 'target')
+    _signature_fields = Error._signature_fields + ('script', 'target')
+
     def __init__(self, script=None, target=None):
         """Object initializer.
 
@@ -348,12 +378,8 @@ class KbuildGenericError(Error):
         super().__init__()
         self.script = script
         self.target = target
-        self._signature_fields.extend([
-            'script',
-            'target',
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a log fragment looking for a generic Kbuild error
         and updates the object with the extracted information.
 
@@ -363,18 +389,20 @@ class KbuildGenericError(Error):
 
         Parameters:
           text (str): the text log containing the modpost error
+          start (int): position in `text' where the parsing starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the error block ends (if
         found).
         """
         self.error_type = "kbuild.other"
-        end = 0
+        parse_end = 0
         if self.target:
-            match = re.search(self.target, text)
+            match = re.compile(self.target).search(text, start, end)
             if not match:
-                return end
+                return parse_end
             summary_strings = []
-            match = re.finditer(r'^[^\s]+.*$', text[match.end():], flags=re.MULTILINE)
+            match = _find_unindented_lines(text, match.end(), end)
             for m in match:
                 current_match = m.group()
                 self._report += f"{current_match}\n"
@@ -385,16 +413,18 @@ class KbuildGenericError(Error):
                 else:
                     # Error type (catch-all): any line containing
                     # 'error:'. Use that as the summary
-                    generic_error_match = re.search(fr'{TIMESTAMP}(.*error:.*)', current_match)
+                    generic_error_match = GENERIC_ERROR_MESSAGE_REGEX.search(current_match)
                     if generic_error_match:
                         summary_strings.append(generic_error_match.group(1))
-                end = m.end()
+                parse_end = m.end()
             if summary_strings:
                 self.error_summary = " ".join([string for string in summary_strings if string])
-        return end
+        return parse_end
 
 
 class KbuildUnknownError(Error):
+    __slots__ = ()
+
     def __init__(self, text):
         super().__init__()
         self.error_type = "kbuild.unknown"
@@ -405,6 +435,21 @@ class KbuildUnknownError(Error):
 ##### Error detection utility functions
 
 
+def _find_unindented_lines(text, start, end):
+    """Returns an iterator over the unindented lines found in `text'
+    between `start' and `end'. If `start' is in the middle of a line,
+    the rest of that line is considered a line too.
+    """
+    matches = UNINDENTED_LINE_REGEX.finditer(text, start, end)
+    if start > 0 and text[start - 1] != '\n':
+        first_match = UNINDENTED_LINE_TAIL_REGEX.match(text, start, end)
+        if first_match:
+            matches = itertools.chain(
+                [first_match],
+                UNINDENTED_LINE_REGEX.finditer(text, first_match.end(), end))
+    return matches
+
+
 def _is_object_file(target):
     """Returns True if `target' looks like an object or "output" file
     according to a list of known extensions. Returns False otherwise.
@@ -419,13 +464,13 @@ def _is_object_file(target):
     return True
 
 
-def _is_other_compiler_target(target, text):
+def _is_other_compiler_target(target, text, start, end):
     """Returns True if `target` can be identified to be a compiler
-    target file based on its appearance in `text`. Returns False
-    otherwise.
+    target file based on its appearance in `text` (between `start` and
+    `end`). Returns False otherwise.
     """
     target_base = os.path.splitext(os.path.basename(target))[0]
-    match = re.search(rf'{target_base}(\.\w+)?:', text)
+    match = re.compile(rf'{target_base}(\.\w+)?:').search(text, start, end)
 
     if match:
         return True
@@ -446,8 +491,8 @@ def _is_kbuild_target(target):
     return False
 
 
-def _find_script_target(error_str, text):
-    match = re.search(r'\[(?P<script>.*?): (?P<target>.*?)\] Error', error_str)
+def _find_script_target(error_str, text, start, end):
+    match = SCRIPT_TARGET_REGEX.search(error_str)
     if not match:
         return None, None
 
@@ -459,24 +504,28 @@ def _find_script_target(error_str, text):
     if target.endswith('vmlinux'):
 
         # extract the script and target from the linker error message
-        if match_ld := re.search(
-            r'(?P<script>.*?ld): (?P<target>.*?)\.\w+: (?P<error_str>.*)', text
-        ):
+        if match_ld := LINKER_TARGET_REGEX.search(text, start, end):
             script = match_ld.group('script')
             target = match_ld.group('target')
 
     return script, target
 
 
-def find_kbuild_error(text):
+def find_kbuild_error(text, start=None, end=None):
     """Find a kbuild error in a text segment.
 
     Currently supported:
       - compiler errors (C)
       - Make / Kbuild runtime errors
 
+    The error is classified and parsed using the log text between the
+    make error line and up to KBUILD_ERROR_CONTEXT characters before it
+    (see states.kbuild).
+
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the search starts
+      end (int): position in `text' where the search ends
 
     Returns:
     If an error report was found, it returns a dict containing:
@@ -484,21 +533,22 @@ def find_kbuild_error(text):
       'end': position in the text right after the parsed block
     None if no error report was found.
     """
-    end = 0
-    match = re.search(r'make.*?: \*\*\* (?P<error_str>.*)', text)
+    start, end = text_range(text, start, end)
+    match = find_marker(MAKE_ERROR_REGEX, text, start, end)
     if not match:
         return None
     error_str = match.group('error_str')
-    start = match.start()
-    end = match.end()
+    error_start = match.start()
+    context_start = max(start, error_start - KBUILD_ERROR_CONTEXT)
 
-    script, target = _find_script_target(error_str, text)
+    script, target = _find_script_target(error_str, text, context_start, match.end())
 
     if script or target:
         logging.debug(f"[find_kbuild_error] script: {script}, target: {target}")
         error = None
         # Kbuild error classification
-        if _is_object_file(target) or _is_other_compiler_target(target, text[:start]):
+        if _is_object_file(target) or _is_other_compiler_target(target, text, context_start,
+                                                                 error_start):
             error = KbuildCompilerError(script=script, target=target)
         elif 'modpost' in script:
             error = KbuildModpostError(script=script, target=target)
@@ -507,12 +557,11 @@ def find_kbuild_error(text):
         else:
             # Catch-all condition for non-specific errors
             error = KbuildGenericError(script=script, target=target)
-        text = text[:start]
-        error.parse(text)
+        error.parse(text, context_start, error_start)
     else:
         # Unrecognized error, these are marked as unknown and not parsed
         error = KbuildUnknownError(error_str)
     return {
         'error': error,
-        '_end': end,
+        '_end': match.end(),
     }
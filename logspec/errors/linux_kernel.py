@@ -26,9 +26,20 @@
 
 
 import re
+import sys
 
 from logspec.utils.defs import LINUX_TIMESTAMP
 from logspec.errors.error import Error
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+from logspec.utils.lines import find_line_end, timestamp_block_end
+
+
+# Patterns shared by the different types of reports
+HARDWARE_REGEX = register_pattern(__name__, 'hardware', f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)')
+CALL_TRACE_REGEX = register_pattern(__name__, 'call_trace', f'{LINUX_TIMESTAMP} call trace:', flags=re.IGNORECASE)
+CALL_TRACE_LINE_REGEX = register_pattern(__name__, 'call_trace_line', f'{LINUX_TIMESTAMP}  (.*)')
+CALL_TRACE_ENTRY_REGEX = register_pattern(__name__, 'call_trace_entry', rf'{LINUX_TIMESTAMP}  ([^\s].*)')
 
 
 class GenericError(Error):
@@ -37,6 +48,12 @@ class GenericError(Error):
     """
     start_marker_regex = fr'{LINUX_TIMESTAMP} -+\[ cut here \].*'
     end_marker_regex = fr'{LINUX_TIMESTAMP} -+\[ end trace'
+    _end_marker = register_pattern(__name__, 'generic_error.end_marker', end_marker_regex)
+    _banner = register_pattern(__name__, 'generic_error.banner', fr'{LINUX_TIMESTAMP}.*?(?P<report_type>[A-Z]+):.*? at (?P<location>.*)')
+    _modules = register_pattern(__name__, 'generic_error.modules', f'{LINUX_TIMESTAMP} Modules linked in: (?P<modules>.*)')
+    __slots__ = ('hardware', 'location', 'call_trace', 'modules')
+    _signature_fields = Error._signature_fields + ('location',)
+    _detail_fields = ('modules', 'hardware', 'call_trace')
 
     def __init__(self):
         super().__init__()
@@ -45,44 +62,40 @@ class GenericError(Error):
         self.location = None
         self.call_trace = []
         self.modules = []
-        self._signature_fields.extend([
-            'location',
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a generic "cut here" kernel error report and updates
         the object with the extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found).
         """
         # Report starts on the next line after the "cut here" tag
-        try:
-            msg_start = text.index('\n') + 1
-        except ValueError:
-            msg_start = 0
-
-        # Find the end of the report block, if found, narrow the text to
-        # those lines
-        match = re.search(self.end_marker_regex, text[msg_start:])
+        msg_start = find_line_end(text, start, end) + 1
+        if not msg_start:
+            msg_start = start
+
+        # Find the end of the report block, if found, narrow the parsing
+        # to those lines
+        match = find_marker(self._end_marker, text, msg_start, end)
         report_end = None
         if match:
-            report_end = msg_start + match.start()
+            report_end = match.start()
             self._report = text[msg_start:report_end]
+            end = report_end
+        # At this point, the parsing starts after the `cut here' marker
+        # line. If a `end trace' marker was found, it ends before it.
 
-        text = text[msg_start:report_end]
-        # At this point, `text' starts after the `cut here' marker
-        # line. If a `end trace' marker was found, `text' ends before
-        # it.
-
-        match_end = 0
+        match_end = msg_start
         # Report banner (identifier)
-        match = re.search(fr'{LINUX_TIMESTAMP}.*?(?P<report_type>[A-Z]+):.*? at (?P<location>.*)', text)
+        match = self._banner.search(text, msg_start, end)
         if match:
-            match_end += match.end()
+            match_end = match.end()
             self.error_type += f".{match.group('report_type').lower()}"
             self.location = match.group('location')
             # Search for error messages before the banner
@@ -94,30 +107,36 @@ class GenericError(Error):
             # Best-effort alternative: just keep the warning and the location
             self.error_summary = f"{match.group('report_type')} at {self.location}"
 
+        if self._details_needed():
+            self._parse_details(text, match_end, end)
+
+        # if not report_end and match_end > 0:
+        #     report_end = match_end
+        return report_end
+
+    def _parse_details(self, text, start, end):
+        """Extracts the list of modules, the hardware name and the call
+        trace of the report, found in `text' between `start' (the end of
+        the report banner) and `end'.
+        """
+        match_end = start
         # List of modules
-        match = re.search(f'{LINUX_TIMESTAMP} Modules linked in: (?P<modules>.*)', text[match_end:])
+        match = self._modules.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            self.modules = sorted(match.group('modules').split())
+            match_end = match.end()
+            self.modules = sorted(map(sys.intern, match.group('modules').split()))
         # Hardware name
-        match = re.search(f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)', text[match_end:])
+        match = HARDWARE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            self.hardware = match.group('hardware')
+            match_end = match.end()
+            self.hardware = sys.intern(match.group('hardware'))
         # Registers (maybe not needed)
         # Call trace
-        match = re.search(f'{LINUX_TIMESTAMP} call trace:', text[match_end:], flags=re.IGNORECASE)
+        match = CALL_TRACE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            matches = re.finditer(f'{LINUX_TIMESTAMP}  (.*)', text[match_end:])
-            if matches:
-                for m in matches:
-                    match_end += match.end()
-                    self.call_trace.append(m.group(1))
-
-        # if not report_end and match_end > 0:
-        #     report_end = match_end
-        return report_end
+            match_end = match.end()
+            for m in CALL_TRACE_LINE_REGEX.finditer(text, match_end, end):
+                self.call_trace.append(sys.intern(m.group(1)))
 
 
 class ErrorReturnCode(Error):
@@ -125,17 +144,21 @@ class ErrorReturnCode(Error):
     report.
     """
     start_marker_regex = fr'{LINUX_TIMESTAMP} .*?error -\d+.*?'
+    _message = register_pattern(__name__, 'error_return_code.message', r'.*?: (?P<message>.*error -\d+)')
+    __slots__ = ()
 
     def __init__(self):
         super().__init__()
         self.error_type = "linux.kernel.error_return_code"
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a generic failed with error -2 kernel error report and
         updates the object with the extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found).
@@ -143,13 +166,13 @@ class ErrorReturnCode(Error):
 
         # Match lines with "error -d", where d is a number
         # and extract the message of the line after the colon
-        match = re.search(r'.*?: (?P<message>.*error -\d+)', text)
+        match = self._message.search(text, start, end)
         if not match:
             return None
 
         self.error_summary = match.group('message')
         report_end = match.end()
-        self._report = text[:report_end]
+        self._report = text[start:report_end]
         return report_end
 
 
@@ -159,6 +182,11 @@ class NullPointerDereference(Error):
     """
     start_marker_regex = f'{LINUX_TIMESTAMP} Unable to handle kernel NULL pointer dereference'
     end_marker_regex = fr'{LINUX_TIMESTAMP} ---\[ end trace'
+    _end_marker = register_pattern(__name__, 'null_pointer_dereference.end_marker', end_marker_regex)
+    _address = register_pattern(__name__, 'null_pointer_dereference.address', 'at virtual address (?P<address>.*)')
+    __slots__ = ('hardware', 'address', 'call_trace')
+    _signature_fields = Error._signature_fields + ('address', 'call_trace')
+    _detail_fields = ('hardware', 'call_trace')
 
     def __init__(self):
         super().__init__()
@@ -167,55 +195,59 @@ class NullPointerDereference(Error):
         self.hardware = None
         self.address = None
         self.call_trace = []
-        self._signature_fields.extend([
-            'address',
-            'call_trace'
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a kernel error report for a NULL pointer dereference
         and updates the object with the extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found).
         """
-        # Find the end of the report block, if found, narrow the text to
-        # those lines
-        match = re.search(self.end_marker_regex, text)
+        # Find the end of the report block, if found, narrow the parsing
+        # to those lines
+        match = find_marker(self._end_marker, text, start, end)
         report_end = None
         if match:
             report_end = match.start()
-            self._report = text[:report_end]
-        text = text[:report_end]
+            self._report = text[start:report_end]
+            end = report_end
 
-        match_end = 0
+        match_end = start
         # Initial line
-        match = re.search('at virtual address (?P<address>.*)', text)
+        match = self._address.search(text, start, end)
         if match:
             match_end = match.end()
             self.address = match.group('address')
             self.error_summary += f" at virtual address {self.address}"
+        if self._details_needed():
+            self._parse_details(text, match_end, end)
+
+        # if not report_end and match_end > 0:
+        #     report_end = match_end
+        return report_end
+
+    def _parse_details(self, text, start, end):
+        """Extracts the hardware name and the call trace of the report,
+        found in `text' between `start' (the end of the initial line)
+        and `end'.
+        """
+        match_end = start
         # Hardware name
-        match = re.search(f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)', text[match_end:])
+        match = HARDWARE_REGEX.search(text, match_end, end)
         if match:
             match_end = match.end()
-            self.hardware = match.group('hardware')
+            self.hardware = sys.intern(match.group('hardware'))
         # Call trace
-        match = re.search(f'{LINUX_TIMESTAMP} call trace:', text[match_end:], flags=re.IGNORECASE)
+        match = CALL_TRACE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            matches = re.finditer(f'{LINUX_TIMESTAMP}  (.*)', text[match_end:])
-            if matches:
-                for m in matches:
-                    match_end += match.end()
-                    self.call_trace.append(m.group(1))
-
-        # if not report_end and match_end > 0:
-        #     report_end = match_end
-        return report_end
+            match_end = match.end()
+            for m in CALL_TRACE_LINE_REGEX.finditer(text, match_end, end):
+                self.call_trace.append(sys.intern(m.group(1)))
 
 
 class KernelBug(Error):
@@ -223,6 +255,13 @@ class KernelBug(Error):
     """
     start_marker_regex = f'{LINUX_TIMESTAMP} (kernel )?BUG'
     end_marker_regex = fr'{LINUX_TIMESTAMP} ---\[ end trace'
+    _end_marker = register_pattern(__name__, 'kernel_bug.end_marker', end_marker_regex)
+    _bug_at = register_pattern(__name__, 'kernel_bug.bug_at', f'{LINUX_TIMESTAMP} kernel BUG at (?P<location>.*)!')
+    _bug_message = register_pattern(__name__, 'kernel_bug.bug_message', f'{LINUX_TIMESTAMP} BUG: (?P<message>.*)')
+    _bug_location = register_pattern(__name__, 'kernel_bug.bug_location', '(?P<bug_cause>.*?) at (?P<location>.*)')
+    _modules = register_pattern(__name__, 'kernel_bug.modules', f'{LINUX_TIMESTAMP} Modules linked in: *(?P<modules>.*)')
+    __slots__ = ('hardware', 'call_trace', 'location', 'modules')
+    _detail_fields = ('hardware', 'modules', 'call_trace')
 
     def __init__(self):
         super().__init__()
@@ -230,45 +269,45 @@ class KernelBug(Error):
         self.hardware = None
         self.call_trace = []
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a kernel BUG report and updates the object with the
         extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found).
         """
-        # Find the end of the report block, if found, narrow the text to
-        # those lines
-        match = re.search(self.end_marker_regex, text)
+        # Find the end of the report block, if found, narrow the parsing
+        # to those lines
+        match = find_marker(self._end_marker, text, start, end)
         report_end = None
         if match:
             report_end = match.start()
-            self._report = text[:report_end]
+            self._report = text[start:report_end]
+            end = report_end
+        # At this point, the parsing starts at the `BUG' marker line. If
+        # a `end trace' marker was found, it ends before it.
 
-        text = text[:report_end]
-        # At this point, `text' starts after the `BUG' marker line. If a
-        # `end trace' marker was found, `text' ends before it.
-
-        match_end = 0
-        start_of_modules_list = 0
+        match_end = start
         # Initial line
         message = ""
 
         # Format 1: "kernel BUG at <location>!"
-        if (match := re.search(f'{LINUX_TIMESTAMP} kernel BUG at (?P<location>.*)!', text)):
-            match_end += match.end()
+        if (match := self._bug_at.search(text, start, end)):
+            match_end = match.end()
             self.location = match.group('location')
             self.error_summary = f"kernel BUG at {self.location}"
         # Format 2: "BUG: <message>"
-        elif (match := re.search(f'{LINUX_TIMESTAMP} BUG: (?P<message>.*)', text)):
+        elif (match := self._bug_message.search(text, start, end)):
             if match:
-                match_end += match.end()
+                match_end = match.end()
                 message = match.group('message')
             # Extract "location" from bug message
-            match = re.search('(?P<bug_cause>.*?) at (?P<location>.*)', message)
+            match = self._bug_location.search(message)
             if match:
                 self.location = match.group('location')
                 self.error_summary = f"{match.group('bug_cause')} at {self.location}"
@@ -289,17 +328,35 @@ class KernelBug(Error):
                 # General bug message handling
                 self.error_summary = message
 
+        # Without an end marker, the report block ends after the details
+        if report_end is None or self._details_needed():
+            match_end = self._parse_details(text, start, match_end, end)
+
+        if report_end is None and match_end > start:
+            report_end = match_end
+        return report_end
+
+    def _parse_details(self, text, start, match_end, end):
+        """Extracts the hardware name, the list of modules and the call
+        trace of the report, found in `text' between `start' (the start
+        of the report block) and `end'. `match_end' is the end of the
+        initial line.
+
+        Returns the position in `text' where the last of the details
+        found ends.
+        """
+        start_of_modules_list = start
         # Hardware name
-        match = re.search(f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)', text[match_end:])
+        match = HARDWARE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            self.hardware = match.group('hardware')
+            match_end = match.end()
+            self.hardware = sys.intern(match.group('hardware'))
         # List of modules
-        match = re.search(f'{LINUX_TIMESTAMP} Modules linked in: *(?P<modules>.*)', text[match_end:])
+        match = self._modules.search(text, match_end, end)
         if match:
-            start_of_modules_list = match.start() + match_end
-            match_end += match.end()
-            self.modules = sorted(match.group('modules').split())
+            start_of_modules_list = match.start()
+            match_end = match.end()
+            self.modules = sorted(map(sys.intern, match.group('modules').split()))
             # Additional lines (NOTE: Disabled, a multi-line modules
             # list is probably a consequence of interleaved log
             # lines. Best effort: don't parse them)
@@ -311,19 +368,16 @@ class KernelBug(Error):
             #     self.modules += modules.split()
             #     self.modules.sort()
         # Call trace (before the list of modules, if found)
-        if (match := re.search(f'{LINUX_TIMESTAMP} call trace:', text[:start_of_modules_list], flags=re.IGNORECASE)):
-            matches = re.findall(rf'{LINUX_TIMESTAMP}  ([^\s].*)', text[match.end():start_of_modules_list])
+        if (match := CALL_TRACE_REGEX.search(text, start, start_of_modules_list)):
+            matches = CALL_TRACE_ENTRY_REGEX.findall(text, match.end(), start_of_modules_list)
             if matches:
-                self.call_trace = matches
+                self.call_trace = [sys.intern(m) for m in matches]
         # Call trace (after the list of modules, if found)
-        elif (match := re.search(f'{LINUX_TIMESTAMP} call trace:', text[match_end:], flags=re.IGNORECASE)):
-            matches = re.findall(rf'{LINUX_TIMESTAMP}  ([^\s].*)', text[match_end + match.end():])
+        elif (match := CALL_TRACE_REGEX.search(text, match_end, end)):
+            matches = CALL_TRACE_ENTRY_REGEX.findall(text, match.end(), end)
             if matches:
-                self.call_trace = matches
-
-        if not report_end and match_end > 0:
-            report_end = match_end
-        return report_end
+                self.call_trace = [sys.intern(m) for m in matches]
+        return match_end
 
 
 class KernelPanic(Error):
@@ -331,6 +385,10 @@ class KernelPanic(Error):
     """
     start_marker_regex = f'{LINUX_TIMESTAMP} Kernel panic'
     end_marker_regex = fr'{LINUX_TIMESTAMP} ---\[ end Kernel panic'
+    _end_marker = register_pattern(__name__, 'kernel_panic.end_marker', end_marker_regex)
+    _message = register_pattern(__name__, 'kernel_panic.message', f'{LINUX_TIMESTAMP} Kernel panic .*?: (?P<message>.*)')
+    __slots__ = ('hardware', 'call_trace')
+    _detail_fields = ('hardware', 'call_trace')
 
     def __init__(self):
         super().__init__()
@@ -338,60 +396,67 @@ class KernelPanic(Error):
         self.hardware = None
         self.call_trace = []
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a kernel panic report and updates the object with the
         extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found). Returns None if the parsing failed.
         """
-        # Find the end of the report block, if found, narrow the text to
-        # those lines. If not found, bail out after the kernel panic
+        # Find the end of the report block, if found, narrow the parsing
+        # to those lines. If not found, bail out after the kernel panic
         # tag. Process only complete kernel panic reports.
-        match = re.search(self.end_marker_regex, text)
+        match = find_marker(self._end_marker, text, start, end)
         report_end = None
         if match:
             report_end = match.start()
-            self._report = text[:report_end]
         else:
             # If we couldn't find the end marker, we probably rebooted. So
             # match sequential lines starting with timestamp.
-            lines = text.split('\n')
-            i = 0
-            while i < len(lines) and re.match(LINUX_TIMESTAMP, lines[i]):
-                i += 1
-            report_end = len('\n'.join(lines[:i]))
-            self._report = text[:report_end]
-
-        text = text[:report_end]
+            report_end = timestamp_block_end(text, start, end)
+        self._report = text[start:report_end]
+        end = report_end
 
-        match_end = 0
+        match_end = start
         # Initial line
-        match = re.search(f'{LINUX_TIMESTAMP} Kernel panic .*?: (?P<message>.*)', text)
+        match = self._message.search(text, start, end)
         if match:
-            match_end += match.end()
+            match_end = match.end()
             self.error_summary = match.group('message')
+        # Without a report block, the report ends after the details
+        if report_end == start or self._details_needed():
+            match_end = self._parse_details(text, match_end, end)
+
+        if report_end == start and match_end > start:
+            report_end = match_end
+        return report_end
+
+    def _parse_details(self, text, start, end):
+        """Extracts the hardware name and the call trace of the report,
+        found in `text' between `start' (the end of the initial line)
+        and `end'.
+
+        Returns the position in `text' where the last of the details
+        found ends.
+        """
+        match_end = start
         # Hardware name
-        match = re.search(f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)', text[match_end:])
+        match = HARDWARE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            self.hardware = match.group('hardware')
+            match_end = match.end()
+            self.hardware = sys.intern(match.group('hardware'))
         # Call trace
-        match = re.search(f'{LINUX_TIMESTAMP} call trace:', text[match_end:], flags=re.IGNORECASE)
+        match = CALL_TRACE_REGEX.search(text, match_end, end)
         if match:
-            match_end += match.end()
-            matches = re.finditer(f'{LINUX_TIMESTAMP}  (.*)', text[match_end:])
-            if matches:
-                for m in matches:
-                    match_end += match.end()
-                    self.call_trace.append(m.group(1))
-
-        if not report_end and match_end > 0:
-            report_end = match_end
-        return report_end
+            match_end = match.end()
+            for m in CALL_TRACE_LINE_REGEX.finditer(text, match_end, end):
+                self.call_trace.append(sys.intern(m.group(1)))
+        return match_end
 
 
 class UBSANError(Error):
@@ -402,6 +467,15 @@ class UBSANError(Error):
         r"-+\[ end trace",
         "================================================================================",
     ]
+    _end_marker = register_pattern(__name__, 'ubsan_error.end_marker', '|'.join([f"({tag})" for tag in end_marker_regex]))
+    _banner = register_pattern(__name__, 'ubsan_error.banner', fr'{LINUX_TIMESTAMP} UBSAN: (?P<error_msg>.*?) in (?P<location>.*)')
+    # NOTE (best effort): the regex is an attempt to make the details
+    # parsing more robust in case there are interleaved log lines. We
+    # trust UBSAN detail strings won't contain colons.
+    _details = register_pattern(__name__, 'ubsan_error.details', fr'^{LINUX_TIMESTAMP} (?P<error_details>[^:]*?)\n', flags=re.MULTILINE)
+    __slots__ = ('location', 'hardware')
+    _signature_fields = Error._signature_fields + ('location',)
+    _detail_fields = ('hardware',)
 
     def __init__(self):
         super().__init__()
@@ -410,52 +484,47 @@ class UBSANError(Error):
         self.hardware = None
         # Not needed for now:
         # self.call_trace = []
-        self._signature_fields.extend([
-            'location',
-        ])
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Parses a UBSAN error report and updates the object with the
         extracted information.
 
         Parameters:
-          text (str): the text log from the start of the report block
+          text (str): the full log
+          start (int): position in `text' where the report block starts
+          end (int): position in `text' where the parsing ends
 
         Returns the position in `text' where the report block ends (if
         found).
         """
-        # Find the end of the report block, if found, narrow the text to
-        # those lines
-        regex = '|'.join([f"({tag})" for tag in self.end_marker_regex])
-        match = re.search(regex, text)
+        # Find the end of the report block, if found, narrow the parsing
+        # to those lines
+        match = find_marker(self._end_marker, text, start, end)
         report_end = None
         if match:
             report_end = match.start()
-            self._report = text[:report_end]
-        text = text[:report_end]
+            self._report = text[start:report_end]
+            end = report_end
 
-        match_end = 0
+        match_end = start
         # Initial line
-        match = re.search(fr'{LINUX_TIMESTAMP} UBSAN: (?P<error_msg>.*?) in (?P<location>.*)', text)
+        match = self._banner.search(text, start, end)
         if match:
-            match_end += match.end()
+            match_end = match.end()
             self.error_summary = match.group('error_msg')
             self.location = match.group('location')
         # Second line: error details
         match_end += 1
-        # NOTE (best effort): the regex is an attempt to make the
-        # details parsing more robust in case there are interleaved log
-        # lines. We trust UBSAN detail strings won't contain colons.
-        match = re.search(fr'^{LINUX_TIMESTAMP} (?P<error_details>[^:]*?)\n',
-                          text[match_end:], flags=re.MULTILINE)
+        match = self._details.search(text, match_end, end)
         if match:
-            match_end += match.end()
+            match_end = match.end()
             self.error_summary += f": {match.group('error_details')}"
 
         # Hardware name
-        match = re.search(f'{LINUX_TIMESTAMP} Hardware name: (?P<hardware>.*)', text[match_end:])
-        if match:
-            match_end += match.end()
-            self.hardware = match.group('hardware')
+        if self._details_needed():
+            match = HARDWARE_REGEX.search(text, match_end, end)
+            if match:
+                match_end = match.end()
+                self.hardware = sys.intern(match.group('hardware'))
 
         return report_end
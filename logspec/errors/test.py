@@ -3,18 +3,22 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
-
 from logspec.errors.error import Error
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+
+KSELFTEST_ERROR_REGEX = register_pattern(__name__, 'kselftest_error', r'(?P<message>not ok \d+ selftests:.*+)')
 
 
 class TestError(Error):
     """Models a generic test error."""
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.error_type = "test"
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Dummy parse function. The purpose of this is to keep the
         caller code working if it calls parse() to generate the error
         signature"""
@@ -23,18 +27,20 @@ class TestError(Error):
 
 class KselftestError(Error):
     """ Parser for kserlftest errors."""
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
         self.error_type = "linux.kselftest"
 
-    def _parse(self, text):
+    def _parse(self, text, start, end):
         """Dummy parse function. The purpose of this is to keep the
         caller code working if it calls parse() to generate the error
         signature"""
-        match = re.search(r'(?P<message>not ok \d+ selftests:.*+)', text)
+        match = find_marker(KSELFTEST_ERROR_REGEX, text, start, end)
         if not match:
             return None
         self.error_summary = match.group('message')
         report_end = match.end()
-        self._report = text[:report_end]
+        self._report = text[start:report_end]
         return report_end
@@ -3,148 +3,999 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
+import contextlib
+import copy
 import json
+import locale
 import logging
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 import yaml
 import logspec.version
+from logspec.parser_classes import Parser
 from logspec.parser_loader import parser_loader
-from logspec.utils.defs import JsonSerialize, JsonSerializeDebug
-from logspec.utils.utils import update_dict, generate_signature
+from logspec.utils.budget import ParseBudget, parse_budget
+from logspec.utils.cache import bytes_digest, log_file_digest, log_text_digest
+from logspec.utils.compression import detect_compression, open_log_stream
+from logspec.utils.defs import output_view
+from logspec.utils.events import event_index
+from logspec.utils.follow import CHECKPOINT_VERSION, DEFAULT_POLL_INTERVAL, FollowReader
+from logspec.utils.lines import log_index
+from logspec.utils.parallel import parallel_search
+from logspec.utils.profile import ParseProfile
+from logspec.utils.projection import field_projection, project_errors
+from logspec.utils.regex_stats import collect_regex_stats
+from logspec.utils.signature import DEFAULT_SIGNATURE_VERSION, signature_engine, fields_signature
+from logspec.utils.utils import update_dict
+from logspec.utils.verdict import verdict_mode, make_verdict
+
+# Cache of loaded parsers.
+# Key: (parser definitions file path, file mtime, file size, parser id),
+# value: loaded Parser
+_parser_cache = {}
+
+# Parser used by the worker processes of parse_logs()
+_worker_parser = None
+
+# Default window size and overlap (in characters) used to parse logs in
+# windows (see parse_log_stream())
+DEFAULT_WINDOW_SIZE = 4 * 1024 * 1024
+DEFAULT_WINDOW_OVERLAP = 128 * 1024
 
 
 def format_data_output(data, full=False):
     """Returns a string containing the JSON-serialized version of
-    `data'. By default, all fields starting with '_' are not printed,
-    unless `full' is set to True.
-    """
-    def remove_keys(data_dict, prefix):
-        for key in list(data_dict):
-            if key.startswith(prefix):
-                del data_dict[key]
-        # Remove recursively on any remaining nested dict (even inside
-        # lists)
-        for key in list(data_dict):
-            if isinstance(data_dict[key], dict):
-                remove_keys(data_dict[key], prefix)
-            if isinstance(data_dict[key], list):
-                for d in data_dict[key]:
-                    if isinstance(d, dict):
-                        remove_keys(d, prefix)
-
-    def remove_empty_error_keys(data):
-        """Removes keys with empty values (e.g., "") from the 'errors' entry in the data."""
-        for error in data.get('errors', []):
-            if hasattr(error, '__dict__'):
-                # Handle objects with __dict__ attribute
-                for key in [k for k, v in vars(error).items() if v == ""]:
-                    delattr(error, key)
-
-    if full:
-        json_serializer = JsonSerializeDebug
-    else:
-        json_serializer = JsonSerialize
-        remove_keys(data, '_')
-        remove_empty_error_keys(data)
-    return json.dumps(data, indent=4, sort_keys=True, cls=json_serializer, ensure_ascii=False)
+    `data'. By default, all fields starting with '_' and the empty
+    error fields are not printed, unless `full' is set to True. `data'
+    isn't modified (see utils.defs.output_view()), so the same data can
+    be serialized both ways.
+    """
+    return json.dumps(output_view(data, full), indent=4, sort_keys=True, ensure_ascii=False)
+
+
+def _generate_signature(data_dict, version=None):
+    """Uses utils.signature.fields_signature() to generate and return a
+    unique hash for the list of '_signature_fields' found in
+    data_dict, if any.  The returned signature can be used to
+    uniquely identify the conditions described by those fields.
+    `version' is the signature engine version (see utils.signature).
+
+    Returns None if data_dict doesn't define any signature fields.
+    """
+    signature_dict = {}
+    if not data_dict.get('_signature_fields'):
+        return None
+    for field in data_dict['_signature_fields']:
+        signature_dict[field] = data_dict[field]
+    return fields_signature(signature_dict, version)
+
+
+def _update_parser_data(data, state_data):
+    """Merges the data generated by a state function (`state_data')
+    into the parser data (`data'). The state summary, if any, is
+    appended to the list of state summaries.
+    """
+    state_summary = state_data.pop('_summary', None)
+    if state_summary:
+        data['_states_summary'].append(state_summary)
+    update_dict(data, state_data)
+
+
+def _finish_budget(data, cumulative_errors, budget):
+    """Marks the parser data as truncated if the parsing `budget' was
+    exceeded (see utils.budget) and drops the errors beyond the maximum
+    number of errors.
+    """
+    if budget.truncated:
+        data['_truncated'] = budget.truncated
+    if budget.max_errors is not None:
+        del cumulative_errors[budget.max_errors:]
+
+
+def _finish_parse(data, cumulative_errors, budget, signature_version, profiler=None,
+                  verdict=False, fields=None):
+    """Completes the parser data once the FSM is done: collects the
+    errors, generates the signature and applies the profiling, verdict
+    mode and field projection options, if any (see parse_log()).
+
+    Returns the final parser data.
+    """
+    _finish_budget(data, cumulative_errors, budget)
+    data['errors'] = cumulative_errors
+    data['_signature_version'] = signature_version or DEFAULT_SIGNATURE_VERSION
+    data['_signature'] = _generate_signature(data, data['_signature_version'])
+    if profiler:
+        data['_profile'] = profiler.result()
+    if verdict:
+        data = make_verdict(data)
+    if fields is not None:
+        project_errors(data['errors'], fields)
+    return data
+
+
+def parse_log(log, parser, profile=False, max_time=None, max_size=None, max_errors=None,
+              verdict=False, fields=None, signature_version=None, workers=None):
+    """Parses a log (str) using a loaded parser (see load_parser()). For
+    backwards compatibility, `parser' can also be the start state of a
+    loaded FSM.
+
+    All the data generated during the parsing is kept in this function,
+    so the same parser can be used by many concurrent calls.
+
+    If `profile' is True, the time spent in every state and the
+    transitions taken are recorded in the `_profile' field of the
+    returned data (see utils.profile).
+
+    The parsing can be limited to a maximum time (`max_time', seconds),
+    a maximum size of the log (`max_size', characters) and a maximum
+    number of errors (`max_errors'). When a limit is reached, the
+    parsing stops and the data collected so far is returned, with the
+    reason in the `_truncated' field (see utils.budget).
+
+    If `verdict' is True, the log is parsed in quick-verdict mode (see
+    utils.verdict): only the first error of each type is searched,
+    without its details, and a verdict record is returned.
 
+    If `fields' is set (list of error field names, such as
+    ['error_type', '_signature']), the fields of the errors not in the
+    list are removed from the output (see utils.projection).
 
-def parse_log(log, start_state):
-    """Parses a log (str) using a loaded FSM that starts in
-    `start_state'.
+    `signature_version' is the version of the engine used to generate
+    the signatures of the errors and of the results (see
+    utils.signature), by default the latest one. Use 1 to get the SHA-1
+    signatures of the older logspec versions. The version used is
+    returned in the `_signature_version' field.
+
+    If `workers' is greater than 1, the errors of the large parts of
+    the log are searched in parallel by that number of worker processes
+    (see utils.parallel). The results are the same as those of a
+    sequential parsing.
 
     Returns:
-      The FSM data (dict) after the parsing is done.
+      The FSM data (dict) after the parsing is done, or the verdict
+      record in verdict mode.
     """
-    state = start_state
+    if isinstance(parser, Parser):
+        state = parser.start_state
+    else:
+        state = parser
     data = {
         '_signature_fields': [],
         '_states_summary': [],
     }
     cumulative_errors = []
     log_start = 0
+    log_end = len(log)
+    profiler = ParseProfile() if profile else None
+    budget = ParseBudget(max_time, max_size, max_errors)
+    if max_size is not None and max_size < log_end:
+        # Parse the beginning of the log as if it were the complete log
+        log_end = max_size
 
-    def _generate_signature(data_dict):
-        """Uses utils.generate_signature() to generate and return a
-        unique hash for the list of '_signature_fields' found in
-        data_dict, if any.  The returned signature can be used to
-        uniquely identify the conditions described by those fields.
+    # The markers searched by the states and error parsers and the
+    # lines of the log are indexed once for the whole log and shared by
+    # all the states (see utils.events and utils.lines)
+    with event_index(log), log_index(log), parse_budget(budget), verdict_mode(verdict), \
+         field_projection(fields), signature_engine(signature_version), \
+         parallel_search(log, workers):
+        while state and not budget.exceeded():
+            # The log is never narrowed down or copied. Instead, every
+            # state function gets the full log together with the
+            # position where the parsing must start. If the state
+            # function sets a `_match_end' field in its data, this marks
+            # the (absolute) position where its parsing ended, so the
+            # next state will start parsing from there.
+            logging.debug(f"State: {state}")
+            if profiler:
+                state_data = profiler.run_state(state, log_start, log, log_start, log_end)
+                next_state = profiler.transition(state, state_data)
+            else:
+                state_data = state.run(log, log_start, log_end)
+                next_state = state.transition(state_data)
 
-        Returns None if data_dict doesn't define any signature fields.
-        """
-        signature_dict = {}
-        if not data_dict.get('_signature_fields'):
-            return None
-        for field in data_dict['_signature_fields']:
-            signature_dict[field] = data_dict[field]
-        return generate_signature(signature_dict)
-
-    while state:
-        # The log fragment to parse is adjusted after every state
-        # transition if the state function sets a `match_end' field in
-        # its data. This is supposed to mark the position where the
-        # parsing ended, so the next state will start parsing from
-        # there.
-        #
-        # TODO: If some states need to do non-sequential parsing we can
-        # explicitly pass the `start' and `end' parsing positions
-        # together with the full log to `run()' instead of passing a
-        # narrowed down log.
+            # Update collected data with the data generated in this state
+            if 'errors' in state_data:
+                cumulative_errors.extend(state_data['errors'])
+                budget.errors += len(state_data['errors'])
+            _update_parser_data(data, state_data)
+            if '_match_end' in data:
+                log_start = data['_match_end']
+            if profiler:
+                profiler.end_state(log_start)
+            state = next_state
+    if log_end < len(log) and not budget.truncated:
+        budget.truncated = 'size'
+    return _finish_parse(data, cumulative_errors, budget, signature_version, profiler,
+                         verdict, fields)
+
+
+def _run_window_states(state, text, log_start, window, data, cumulative_errors, budget,
+                       profiler=None):
+    """Runs the FSM from `state' on the `text' of a window of a log
+    (see parse_log_stream()), starting at `log_start', until it's done,
+    the parsing `budget' is exceeded or a state needs more text to
+    continue. The parser `data' and the `cumulative_errors' are updated
+    with the results of the states.
+
+    When a state needs more text, the text before the position where it
+    must be resumed is dropped and the window offset is updated
+    accordingly, so the caller only has to append the next part of the
+    log to the returned text and call this again.
+
+    Returns a (state, text, log_start, window) tuple with the state to
+    run next (None if the FSM is done), the remaining text, the
+    position where the parsing continues and the window descriptor.
+    """
+    while state and not budget.exceeded():
         logging.debug(f"State: {state}")
-        state_data = state.run(log)
-        state = state.transition()
+        if profiler:
+            state_data = profiler.run_state(state, window['offset'] + log_start,
+                                            text, log_start, len(text), window)
+        else:
+            state_data = state.run(text, log_start, len(text), window)
+        if state_data.get('_partial'):
+            # The state needs more text: drop the text before the
+            # position where it must be resumed
+            cumulative_errors.extend(state_data['errors'])
+            budget.errors += len(state_data['errors'])
+            resume = state_data['_match_end']
+            text = text[resume:]
+            window['offset'] += resume
+            return state, text, 0, window
+        if profiler:
+            next_state = profiler.transition(state, state_data)
+        else:
+            next_state = state.transition(state_data)
+        # Positions are absolute in the parser data
+        if '_match_end' in state_data:
+            state_data['_match_end'] += window['offset']
+        # Clear the state-specific window info
+        window = {k: window[k] for k in ('offset', 'overlap', 'eof', 'follow') if k in window}
 
-        # Update collected data with the data generated in this state
         if 'errors' in state_data:
             cumulative_errors.extend(state_data['errors'])
-        state_summary = state_data.pop('_summary', None)
-        if state_summary:
-            data['_states_summary'].append(state_summary)
-        update_dict(data, state_data)
+            budget.errors += len(state_data['errors'])
+        _update_parser_data(data, state_data)
         if '_match_end' in data:
-            log_start += data['_match_end']
-            log = log[data['_match_end']:]
-            data['_match_end'] = log_start
-    data['errors'] = cumulative_errors
-    data['_signature'] = _generate_signature(data)
-    return data
+            log_start = data['_match_end'] - window['offset']
+        if profiler:
+            profiler.end_state(window['offset'] + log_start)
+        state = next_state
+    return state, text, log_start, window
+
+
+def _check_bounded_window(parser):
+    """Logs a warning if any of the states of `parser' can't bound the
+    text it keeps when the log is parsed in windows (see State), since
+    the memory needed to parse the log may then grow up to the size of
+    the complete log. Nothing is checked if `parser' is the start state
+    of a loaded FSM instead of a Parser.
+    """
+    if not isinstance(parser, Parser):
+        return
+    unbounded = [name for name, state in parser.states.items() if not state.bounded_window]
+    if unbounded:
+        logging.warning(f"Parser {parser.name} can't bound the memory used to parse a log "
+                        f"in windows (states: {', '.join(unbounded)})")
 
 
-def parse_log_file(log_file_path, start_state):
-    """Parses a log file using a loaded FSM that starts in
-    `start_state'.
+def parse_log_stream(log_stream, parser, window_size=DEFAULT_WINDOW_SIZE,
+                     overlap=DEFAULT_WINDOW_OVERLAP, profile=False, max_time=None,
+                     max_size=None, max_errors=None, verdict=False, fields=None,
+                     signature_version=None):
+    """Parses a log read from a text stream (such as an open file)
+    using a loaded parser (see parse_log()), without reading the
+    complete log in memory.
+
+    The log is read in windows of `window_size' characters. Every state
+    function gets the text of the current window together with a
+    window descriptor (dict) containing:
+      'offset': position of the window text in the complete log
+      'overlap': number of characters at the end of the window that
+          may contain incomplete reports
+      'eof': True if this is the last window of the log
+      'follow': only when following a live log (see follow_log())
+    plus any state-specific info that the state function wants to keep
+    between windows. If a state can't finish its work in the current
+    window, it returns a partial result (see
+    utils.window_partial_result()) and it's run again on a new window
+    that starts where it requested. The text before that point is
+    discarded. If the state didn't advance at all, the window grows.
+
+    Every error report is assumed to fit in `overlap' characters. With
+    that condition, the results are the same as those of parse_log()
+    on the complete log, and the memory used is bounded by the window
+    size, with these exceptions: kbuild logs keep the context of the
+    errors (see errors.kbuild.KBUILD_ERROR_CONTEXT), kernel error
+    reports keep the text until their end marker is found and the
+    states that can't bound the text they keep (such as the kselftest
+    one, which keeps the text after the last error found) may keep up
+    to the complete log. A warning is logged when the parser has any
+    of these states.
+
+    The `profile', `max_time', `max_size', `max_errors', `verdict',
+    `fields' and `signature_version' parameters work as in
+    parse_log(). With `max_size', the
+    log is read only up to that size. In verdict mode, the errors
+    collected in the windows before the last one are collected as in
+    the normal mode, but without their details.
 
     Returns:
-      The FSM data (dict) after the parsing is done.
+      The FSM data (dict) after the parsing is done, or the verdict
+      record in verdict mode.
     """
+    if isinstance(parser, Parser):
+        state = parser.start_state
+    else:
+        state = parser
+    data = {
+        '_signature_fields': [],
+        '_states_summary': [],
+    }
+    cumulative_errors = []
+    budget = ParseBudget(max_time, max_size, max_errors)
+    size_left = max_size
+    size_truncated = False
+
+    def read_window(read_size):
+        """Reads the next `read_size' characters of the log, or less if
+        they're beyond `max_size'. Returns the text read and True if
+        it's the end of the log (or of the part of it to parse).
+        """
+        nonlocal size_left, size_truncated
+        if size_left is None:
+            new_text = log_stream.read(read_size)
+            return new_text, len(new_text) < read_size
+        read_size = min(read_size, size_left)
+        new_text = log_stream.read(read_size)
+        size_left -= len(new_text)
+        if len(new_text) < read_size:
+            return new_text, True
+        if not size_left:
+            # Check if there's more log text beyond the maximum size
+            size_truncated = size_truncated or bool(log_stream.read(1))
+            return new_text, True
+        return new_text, False
+
+    text, eof = read_window(window_size)
+    window = {
+        'offset': 0,
+        'overlap': overlap,
+        'eof': eof,
+    }
+    log_start = 0
+    profiler = ParseProfile() if profile else None
+    _check_bounded_window(parser)
+
+    with parse_budget(budget), verdict_mode(verdict), field_projection(fields), \
+         signature_engine(signature_version):
+        while True:
+            state, text, log_start, window = _run_window_states(
+                state, text, log_start, window, data, cumulative_errors, budget, profiler)
+            if not state or budget.exceeded():
+                break
+            # The state needs more text: read the next window
+            new_text, window['eof'] = read_window(max(window_size - len(text), len(text)))
+            text += new_text
+    if size_truncated and not budget.truncated:
+        budget.truncated = 'size'
+    return _finish_parse(data, cumulative_errors, budget, signature_version, profiler,
+                         verdict, fields)
+
+
+def _read_log_file(log_file_path):
+    """Reads a complete log file and returns its contents (str), decoded
+    and with its newlines translated the same way as when reading the
+    file in text mode.
+
+    Regular files are memory-mapped and decoded directly from the
+    mapping, which avoids the buffering and incremental decoding of a
+    file opened in text mode. Other files (pipes, empty files) are read
+    in text mode.
+
+    This only makes the reading faster: the whole log is still decoded
+    to a single str, so the memory needed is the same as when reading
+    it in text mode. To parse a log with bounded memory, read it in
+    windows instead (see parse_log_stream()).
+    """
+    with open(log_file_path, 'rb') as log_file:
+        try:
+            log_map = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            log_map = None
+        if log_map:
+            with log_map:
+                log = str(log_map, locale.getpreferredencoding(False))
+            if '\r' in log:
+                log = log.replace('\r\n', '\n').replace('\r', '\n')
+            return log
     with open(log_file_path, 'r') as log_file:
-        log = log_file.read()
-    return parse_log(log, start_state)
+        return log_file.read()
+
+
+def _result_options(window_size, overlap, max_size, max_errors, verdict, fields,
+                    signature_version):
+    """Returns a dict with the parsing options that change the results,
+    normalized, to be used in the key of a cached result (see
+    utils.cache).
+
+    The time limit isn't included: the results truncated by it aren't
+    cached (see _cache_result()), and the rest are the same as without
+    the limit.
+    """
+    return {
+        'window_size': window_size,
+        'overlap': overlap,
+        'max_size': max_size,
+        'max_errors': max_errors,
+        'verdict': bool(verdict),
+        'fields': sorted(fields) if fields is not None else None,
+        'signature_version': signature_version or DEFAULT_SIGNATURE_VERSION,
+    }
+
+
+def _cache_result(cache, key, data):
+    """Stores the parser `data' in the result `cache' with `key', unless
+    the parsing was truncated by the time limit (the results depend on
+    the speed of the machine). A failure to store the result is only
+    logged.
+    """
+    if data.get('_truncated') == 'time':
+        return
+    try:
+        cache.put(key, data)
+    except OSError as err:
+        logging.warning(f"Couldn't store the result in the cache: {err}")
+
+
+def parse_log_file(log_file_path, parser, window_size=None,
+                   overlap=DEFAULT_WINDOW_OVERLAP, profile=False, max_time=None,
+                   max_size=None, max_errors=None, verdict=False, fields=None,
+                   signature_version=None, cache=None, workers=None):
+    """Parses a log file using a loaded parser (see parse_log()).
 
+    If `window_size' is set, the log file is parsed in windows of that
+    size with the specified `overlap' (see parse_log_stream()) instead
+    of being read completely in memory.
 
-def load_parser(parser_id, parser_defs_file=logspec.default_parser_defs_file):
+    Compressed log files (see utils.compression) are decompressed
+    incrementally and always parsed in windows (of DEFAULT_WINDOW_SIZE
+    if `window_size' isn't set).
+
+    The `profile', `max_time', `max_size', `max_errors', `verdict',
+    `fields', `signature_version' and `workers' parameters work as in
+    parse_log(). `workers' isn't used when the log is parsed in
+    windows.
+
+    If a result `cache' is specified (utils.cache.ResultCache), the
+    result is looked up in it, by the contents of the log, the parser
+    and the parsing options, and the log is parsed only if it isn't
+    found. Profiled parsings don't use the cache.
+
+    Returns:
+      The FSM data (dict) after the parsing is done, or the verdict
+      record in verdict mode.
+    """
+    key = None
+    if cache is not None and not profile:
+        options = _result_options(window_size, overlap, max_size, max_errors, verdict,
+                                  fields, signature_version)
+        key = cache.key(log_file_digest(log_file_path), parser, options)
+        data = cache.get(key) if key else None
+        if data is not None:
+            return data
+    data = _parse_log_file(log_file_path, parser, window_size, overlap, profile, max_time,
+                           max_size, max_errors, verdict, fields, signature_version, workers)
+    if key:
+        _cache_result(cache, key, data)
+    return data
+
+
+def _parse_log_file(log_file_path, parser, window_size, overlap, profile, max_time,
+                    max_size, max_errors, verdict, fields, signature_version, workers=None):
+    with open(log_file_path, 'rb') as log_file:
+        if window_size or detect_compression(log_file):
+            with open_log_stream(log_file) as log_stream:
+                return parse_log_stream(log_stream, parser,
+                                        window_size or DEFAULT_WINDOW_SIZE, overlap,
+                                        profile, max_time, max_size, max_errors,
+                                        verdict, fields, signature_version)
+    return parse_log(_read_log_file(log_file_path), parser, profile,
+                     max_time, max_size, max_errors, verdict, fields, signature_version,
+                     workers)
+
+
+def _checkpoint_state_name(parser, state):
+    """Returns the name of `state' in `parser', or None if `state' is
+    None (the FSM is done).
+    """
+    if state is None:
+        return None
+    for name, parser_state in parser.states.items():
+        if parser_state is state:
+            return name
+    raise ValueError(f"State {state.name} not found in parser {parser.name}")
+
+
+def _copy_parser_data(data):
+    """Returns a copy of the parser `data' that isn't affected by the
+    updates made to it by the next states (see _update_parser_data()).
+    """
+    return {k: list(v) if isinstance(v, list) else v for k, v in data.items()}
+
+
+def _reported_error_count(cumulative_errors, budget):
+    """Returns the number of errors of `cumulative_errors' that are
+    reported, that is, the ones within the maximum number of errors of
+    the parsing `budget'.
+    """
+    if budget.max_errors is None:
+        return len(cumulative_errors)
+    return min(len(cumulative_errors), budget.max_errors)
+
+
+def _check_checkpoint(checkpoint, parser, options):
+    """Raises a ValueError if `checkpoint' can't be used to resume the
+    parsing of a log with `parser' and the parsing `options' (see
+    _result_options()).
+    """
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version: {checkpoint.get('version')}")
+    if checkpoint['parser'] != parser.name:
+        raise ValueError(f"The checkpoint was made with parser {checkpoint['parser']}")
+    if checkpoint['defs_digest'] != parser.defs_digest:
+        raise ValueError("The checkpoint was made with different parser definitions")
+    if checkpoint['options'] != options:
+        raise ValueError("The checkpoint was made with different parsing options")
+
+
+def follow_log(log_file, parser, checkpoint=None, window_size=DEFAULT_WINDOW_SIZE,
+               overlap=DEFAULT_WINDOW_OVERLAP, max_errors=None, fields=None,
+               signature_version=None, poll_interval=DEFAULT_POLL_INTERVAL,
+               idle_timeout=None, stop=None, reported_errors=None):
+    """Parses a log that is still being written (live tail-follow) using
+    a loaded parser (see load_parser()), and reports the errors as soon
+    as they're found.
+
+    `log_file' is the path of the log file or a binary file object,
+    such as a pipe. The log is read as it grows (see
+    utils.follow.FollowReader) and parsed in windows, as in
+    parse_log_stream(): an error is reported once it's complete, that
+    is, as soon as its report is known to have ended (for instance, when
+    its end marker is found, see utils.collect_window_errors()), once
+    `overlap' characters follow it or when the log is complete. The log
+    is complete when it's closed by the writer (pipe), when no new text
+    arrives for `idle_timeout' seconds or when the `stop' function
+    returns True. `poll_interval' is the time between checks for new
+    text.
+
+    The parsing can be resumed from a `checkpoint' generated by a
+    previous call with the same parser and options, even in another
+    process (see utils.follow.save_checkpoint()). The part of the log
+    before the checkpoint isn't parsed again. The checkpoint only keeps
+    the incremental state of the parsing (FSM state, reader position,
+    window text, parser data and number of errors reported), not the
+    errors themselves: the errors reported up to the checkpoint (the
+    'errors' of the records until the one that generated it, see
+    utils.follow.append_errors()) must be passed in `reported_errors'
+    to complete the final results.
+
+    The `max_errors', `fields' and `signature_version' parameters work
+    as in parse_log(). The time and size limits, the verdict mode and
+    the profiling aren't supported.
+
+    Generates a record (dict) every time the parser has consumed new
+    log text, containing:
+      'errors': list of the new errors found since the previous record
+      'checkpoint': checkpoint of the parsing after this record, to be
+          passed to a later call to resume the parsing (it's no longer
+          updated after the record is generated, so it can be kept or
+          serialized at any time). Its size doesn't depend on the
+          number of errors found
+      'data': the final parser data (see parse_log()) in the last
+          record, once the log is complete. None in the rest of them
+
+    If the checkpoint of a complete parsing is passed, only the last
+    record is generated again.
+    """
+    options = _result_options(window_size, overlap, None, max_errors, False, fields,
+                              signature_version)
+    if checkpoint is None:
+        checkpoint = {
+            'version': CHECKPOINT_VERSION,
+            'parser': parser.name,
+            'defs_digest': parser.defs_digest,
+            'options': options,
+            'state': _checkpoint_state_name(parser, parser.start_state),
+            'position': None,
+            'text': '',
+            'log_start': 0,
+            'window': {
+                'offset': 0,
+                'overlap': overlap,
+                'eof': False,
+                'follow': True,
+            },
+            'data': {
+                '_signature_fields': [],
+                '_states_summary': [],
+            },
+            'error_count': 0,
+            'result': None,
+        }
+    else:
+        _check_checkpoint(checkpoint, parser, options)
+    if checkpoint['result'] is not None:
+        yield {'errors': [], 'checkpoint': checkpoint, 'data': checkpoint['result']}
+        return
+    cumulative_errors = list(reported_errors or [])
+    if len(cumulative_errors) != checkpoint['error_count']:
+        raise ValueError(f"The checkpoint was made after {checkpoint['error_count']} errors, "
+                         f"{len(cumulative_errors)} were passed")
+    _check_bounded_window(parser)
+    state = parser.states[checkpoint['state']]
+    text = checkpoint['text']
+    log_start = checkpoint['log_start']
+    window = dict(checkpoint['window'])
+    data = _copy_parser_data(checkpoint['data'])
+    data_snapshot = checkpoint['data']
+    budget = ParseBudget(max_errors=max_errors)
+    budget.errors = len(cumulative_errors)
+
+    def new_checkpoint(reader, result=None):
+        return {
+            **checkpoint,
+            'state': _checkpoint_state_name(parser, state),
+            'position': reader.position(),
+            'text': text,
+            'log_start': log_start,
+            'window': dict(window),
+            'data': data_snapshot,
+            'error_count': _reported_error_count(cumulative_errors, budget),
+            'result': result,
+        }
+
+    with FollowReader(log_file, checkpoint['position'], poll_interval, idle_timeout,
+                      stop) as reader:
+        while True:
+            new_text, window['eof'] = reader.read(max(window_size - len(text), len(text)))
+            text += new_text
+            reported = len(cumulative_errors)
+            previous_window = window
+            # The parsing context is set only while the states run, not
+            # while the caller handles the records
+            with parse_budget(budget), field_projection(fields), \
+                 signature_engine(signature_version):
+                state, text, log_start, window = _run_window_states(
+                    state, text, log_start, window, data, cumulative_errors, budget)
+            if window is not previous_window:
+                # The parser data is only updated when a state is done,
+                # which also starts a new window descriptor
+                data_snapshot = _copy_parser_data(data)
+            new_errors = cumulative_errors[reported:budget.max_errors]
+            if fields is not None:
+                project_errors(new_errors, fields)
+            if not state or budget.exceeded():
+                break
+            yield {'errors': new_errors, 'checkpoint': new_checkpoint(reader), 'data': None}
+        data = _finish_parse(data, cumulative_errors, budget, signature_version, fields=fields)
+        state = None
+        yield {'errors': new_errors, 'checkpoint': new_checkpoint(reader, data), 'data': data}
+
+
+def _parser_cache_key(parser_id, parser_defs_file):
+    """Returns the key that identifies a loaded parser in the parser
+    cache. A change in the parser definitions file (detected by its
+    modification time and size) results in a different key.
+    """
+    path = os.path.abspath(parser_defs_file)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size, parser_id)
+
+
+def clear_parser_cache(parser_defs_file=None):
+    """Removes the loaded parsers from the parser cache, so that the
+    next load_parser() call reads and builds them again. If
+    `parser_defs_file' is specified, only the parsers loaded from that
+    file are removed.
+    """
+    if parser_defs_file is None:
+        _parser_cache.clear()
+        return
+    path = os.path.abspath(parser_defs_file)
+    for key in [k for k in _parser_cache if k[0] == path]:
+        del _parser_cache[key]
+
+
+def load_parser(parser_id, parser_defs_file=logspec.default_parser_defs_file,
+                use_cache=True):
     """Reads a parser definition file and loads and initializes the parser
     specified by `parser_id'.
 
+    Loaded parsers are cached, so loading the same parser from the same
+    (unmodified) definitions file again returns the cached parser. Set
+    `use_cache' to False to force a reload, or use clear_parser_cache()
+    to invalidate the cache explicitly.
+
+    The returned Parser is never modified by the parsing, so it can be
+    shared by concurrent parse_log() calls (threads, async tasks).
+
     Returns:
-      The start state of the loaded parser.
+      The loaded Parser.
     """
-    with open(parser_defs_file, 'r') as parser_file:
-        parser_defs = yaml.safe_load(parser_file)
-        assert parser_defs, f"Error loading parser definitions: {parser_defs_file}"
-        start_state = parser_loader(parser_defs, parser_id)
-        assert start_state, f"Error loading parser {parser_id}"
-        return start_state
+    if parser_defs_file is None:
+        parser_defs_file = logspec.default_parser_defs_file
+    key = _parser_cache_key(parser_id, parser_defs_file)
+    if use_cache and key in _parser_cache:
+        return _parser_cache[key]
+    with open(parser_defs_file, 'rb') as parser_file:
+        parser_defs_raw = parser_file.read()
+    parser_defs = yaml.safe_load(parser_defs_raw)
+    assert parser_defs, f"Error loading parser definitions: {parser_defs_file}"
+    parser = parser_loader(parser_defs, parser_id)
+    assert parser, f"Error loading parser {parser_id}"
+    parser.defs_digest = bytes_digest(parser_defs_raw)
+    # Drop any stale entries of this parser (outdated definitions file)
+    for stale_key in [k for k in _parser_cache if k[0] == key[0] and k[3] == parser_id]:
+        del _parser_cache[stale_key]
+    _parser_cache[key] = parser
+    return parser
 
 
-def load_parser_and_parse_log(log_file_path, parser_id, parser_defs_file=None):
+def load_parser_and_parse_log(log_file_path, parser_id, parser_defs_file=None,
+                              window_size=None, profile=False, max_time=None,
+                              max_size=None, max_errors=None):
     """Reads a parser definition file, loads and initializes the parser
-    specified by `parser_id' and uses it to parse a log file.
+    specified by `parser_id' and uses it to parse a log file. If
+    `window_size' is set, the log is parsed in windows of that size (see
+    parse_log_stream()). The `profile', `max_time', `max_size' and
+    `max_errors' parameters work as in parse_log().
 
     Returns:
       The parser data (dict) after the parsing is done.
     """
-    start_state = load_parser(parser_id, parser_defs_file)
-    return parse_log_file(log_file_path, start_state)
+    parser = load_parser(parser_id, parser_defs_file)
+    return parse_log_file(log_file_path, parser, window_size, profile=profile,
+                          max_time=max_time, max_size=max_size, max_errors=max_errors)
+
+
+def _is_log_file(log):
+    """Returns True if `log' (a parse_logs() item) is the path of a log
+    file, False if it's the log text.
+    """
+    if isinstance(log, os.PathLike):
+        return True
+    if not isinstance(log, str):
+        return False
+    return '\n' not in log and os.path.isfile(log)
+
+
+def _parse_batch_item(parser, index, log, regex_stats=False, options=None):
+    """Parses a single parse_logs() item (a log file path or a log
+    text) using a loaded `parser'. If `regex_stats' is True, the regex
+    statistics of the parsing are collected (see utils.regex_stats).
+    `options' is a dict with the parsing options (`max_time',
+    `max_size', `max_errors', `verdict', `fields' and
+    `signature_version', see parse_log()), if any.
+
+    Returns the result record of the item (see parse_logs()). Any
+    exception raised during the parsing is reported in the record.
+    """
+    result = {
+        'index': index,
+        'log_file': None,
+        'data': None,
+        'error': None,
+    }
+    with contextlib.ExitStack() as stack:
+        if regex_stats:
+            result['regex_stats'] = stack.enter_context(collect_regex_stats())
+        if options is None:
+            options = {}
+        try:
+            if _is_log_file(log):
+                result['log_file'] = os.fspath(log)
+                result['data'] = parse_log_file(log, parser, **options)
+            else:
+                result['data'] = parse_log(log, parser, **options)
+        except Exception as err:
+            result['error'] = f"{type(err).__name__}: {err}"
+    return result
+
+
+def _batch_item_key(cache, parser, log, options):
+    """Returns the key of the result of a parse_logs() item (a log file
+    path or a log text) in the result `cache', or None if it can't be
+    cached. `options' are the parsing options of the batch.
+    """
+    try:
+        digest = log_file_digest(log) if _is_log_file(log) else log_text_digest(log)
+    except (OSError, TypeError, ValueError):
+        # The error is reported by the parsing of the item
+        return None
+    return cache.key(digest, parser, _result_options(
+        None, DEFAULT_WINDOW_OVERLAP, options['max_size'], options['max_errors'],
+        options['verdict'], options['fields'], options['signature_version']))
+
+
+def _batch_result(index, log, data, error=None):
+    """Returns a parse_logs() result record."""
+    return {
+        'index': index,
+        'log_file': os.fspath(log) if _is_log_file(log) else None,
+        'data': data,
+        'error': error,
+    }
+
+
+def _init_batch_worker(parser_id, parser_defs_file):
+    """Initializer of the parse_logs() worker processes: loads the
+    parser once per worker.
+    """
+    global _worker_parser
+    _worker_parser = load_parser(parser_id, parser_defs_file)
+
+
+def _parse_batch_item_worker(index, log, regex_stats=False, options=None):
+    return _parse_batch_item(_worker_parser, index, log, regex_stats, options)
+
+
+def parse_logs(logs, parser_id, parser_defs_file=None, workers=None,
+               max_in_flight=None, regex_stats=False, max_time=None, max_size=None,
+               max_errors=None, verdict=False, fields=None, signature_version=None,
+               cache=None):
+    """Parses a batch of logs with the same parser using a pool of
+    `workers' processes (default: one per CPU). Every worker process
+    loads the parser once, when it's started.
+
+    Parameters:
+      logs: iterable of logs to parse. Each item can be a log file path
+          or a log text. A str is considered a path if it names an
+          existing file, and a log text otherwise. Use os.PathLike
+          objects (such as pathlib.Path) to pass paths explicitly.
+      parser_id: name of the parser to use
+      parser_defs_file: parser definitions file (default:
+          logspec/parser_defs.yaml)
+      workers: number of worker processes. If 1, the logs are parsed
+          in the current process.
+      max_in_flight: maximum number of logs submitted to the pool and
+          not yet returned (default: twice the number of workers). The
+          `logs' iterable is consumed lazily, as results are returned.
+      regex_stats: if True, collect the regex statistics of every log
+          (see utils.regex_stats). They can be aggregated for the
+          whole batch with utils.regex_stats.merge_regex_stats().
+      max_time, max_size, max_errors: limits of the parsing of every
+          log (see parse_log()). A log that exceeds them is returned
+          truncated, so that a single pathological log can't stall a
+          worker.
+      verdict: if True, parse the logs in quick-verdict mode (see
+          parse_log())
+      fields: list of the error fields to return (see parse_log()).
+          Returning only the fields needed also reduces the amount of
+          data sent back from the worker processes.
+      signature_version: version of the signature engine (see
+          parse_log())
+      cache: result cache (utils.cache.ResultCache). The results of
+          the logs found in it are returned without parsing them, and
+          the new results are stored in it. Identical logs in the
+          batch are parsed only once. The cache isn't used if
+          `regex_stats' is True.
+
+    Returns:
+      A generator that yields a result record (dict) per log, in
+      completion order:
+        'index': position of the log in `logs'
+        'log_file': the log file path, or None if the log was a text
+        'data': the parser data (dict), or None if the parsing failed
+        'error': None, or a description of the error if the parsing
+            failed. A failed log doesn't abort the batch.
+        'regex_stats': regex statistics of the parsing, only if
+            `regex_stats' is True
+    """
+    if parser_defs_file is None:
+        parser_defs_file = logspec.default_parser_defs_file
+    # Load the parser in this process too, so that an invalid parser
+    # definition fails here rather than in every worker
+    parser = load_parser(parser_id, parser_defs_file)
+    options = {
+        'max_time': max_time,
+        'max_size': max_size,
+        'max_errors': max_errors,
+        'verdict': verdict,
+        'fields': fields,
+        'signature_version': signature_version,
+    }
+    if regex_stats:
+        cache = None
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        # Identical logs are found in the cache after the first one
+        for index, log in enumerate(logs):
+            key = _batch_item_key(cache, parser, log, options) if cache else None
+            data = cache.get(key) if key else None
+            if data is not None:
+                yield _batch_result(index, log, data)
+                continue
+            result = _parse_batch_item(parser, index, log, regex_stats, options)
+            if key and result['data'] is not None:
+                _cache_result(cache, key, result['data'])
+            yield result
+        return
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+
+    def _new_pool():
+        return ProcessPoolExecutor(max_workers=workers,
+                                   initializer=_init_batch_worker,
+                                   initargs=(parser_id, parser_defs_file))
+
+    items = enumerate(logs)
+    pending = {}
+    # Results found in the cache, not returned yet
+    ready = []
+    # Identical logs waiting for the result of the one being parsed.
+    # Key: cache key, value: list of (index, log) items
+    duplicates = {}
+
+    def _in_flight():
+        return len(pending) + len(ready) + sum(len(waiting) for waiting in duplicates.values())
+
+    pool = _new_pool()
+    broken_pool = False
+    try:
+        while True:
+            while not broken_pool and _in_flight() < max_in_flight:
+                item = next(items, None)
+                if item is None:
+                    break
+                index, log = item
+                key = _batch_item_key(cache, parser, log, options) if cache else None
+                if key:
+                    if key in duplicates:
+                        duplicates[key].append(item)
+                        continue
+                    data = cache.get(key)
+                    if data is not None:
+                        ready.append(_batch_result(index, log, data))
+                        continue
+                    duplicates[key] = []
+                pending[pool.submit(_parse_batch_item_worker, index, log, regex_stats,
+                                    options)] = (index, log, key)
+            while ready:
+                yield ready.pop(0)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, log, key = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as err:
+                    # A worker died (eg. killed by the OOM killer). The
+                    # pool can't be used anymore, so the logs that were
+                    # in flight are reported as failed and a new pool is
+                    # started for the rest of the batch.
+                    broken_pool = True
+                    result = _batch_result(index, log, None, f"{type(err).__name__}: {err}")
+                if key:
+                    if result['data'] is not None:
+                        _cache_result(cache, key, result['data'])
+                    for dup_index, dup_log in duplicates.pop(key):
+                        ready.append(_batch_result(dup_index, dup_log,
+                                                   copy.deepcopy(result['data']),
+                                                   result['error']))
+                yield result
+            while ready:
+                yield ready.pop(0)
+            if broken_pool and not pending:
+                pool.shutdown(wait=False)
+                pool = _new_pool()
+                broken_pool = False
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
 
 
 def logspec_version():
@@ -32,53 +32,73 @@ class State:
       - a name and description
       - (optional) a function that runs when the state is entered
       - (optional) a list of transitions
-      - (optional) state-specific data
+      - whether the text kept by the function when the log is parsed
+        in windows is bounded (see main.parse_log_stream())
+
+    A State doesn't keep any data from its runs, the data returned by
+    `run()' must be passed to `transition()' by the caller. This way,
+    the same State can be used by many concurrent parsing runs.
     """
-    def __init__(self, name, description=None, transitions=None, function=None):
+    def __init__(self, name, description=None, transitions=None, function=None,
+                 bounded_window=True):
         self.name = name
         self.description = description
         self.function = function
         self.transitions = transitions
-        self.data = {}
+        self.bounded_window = bounded_window
 
     def run(self, *params):
         """Runs the state function, if defined.
 
         Normally, a State function will do a number of state-specific
-        operations and checks, and update the state `data' with the
+        operations and checks, and return the state `data' with the
         results. In a typical scenario, the State function will end up
         calculating some kind of `done' condition and saving that
         information in its `data' for a transition function to check
         later.
 
+        State functions take the full log together with the `start'
+        and `end' positions to parse, and every position they return
+        (such as `_match_end') is relative to the start of the full
+        log, so that the log is never copied between states.
+
         Parameters:
           - params (any): parameters to be passed to the State function
+            (normally: text, start, end and, when parsing a log in
+            windows, the window descriptor)
 
         Returns:
           The return value of the State function, or None if the State
           doesn't have a function defined
         """
         if self.function:
-            self.data = self.function(*params)
-            return self.data
+            return self.function(*params)
         return None
 
-    def transition(self):
+    def next_transition(self, data):
         """Checks the State transitions, if defined. For every
         transition in the State, it checks if the transition function
-        triggers or not, and then returns the state of the first triggered
-        transition.
+        triggers or not for the state `data' returned by `run()'.
 
         Returns:
-          The target state of the first triggered transition found, or
-          None if no transition triggered or if the State doesn't have
-          any outgoing transitions.
+          The first triggered Transition found, or None if no transition
+          triggered or if the State doesn't have any outgoing
+          transitions.
         """
         if not self.transitions:
             return None
         for t in self.transitions:
-            if t.function(self.data):
-                return t.state
+            if t.function(data):
+                return t
+        return None
+
+    def transition(self, data):
+        """Same as `next_transition()', but returns the target state of
+        the triggered transition, or None if no transition triggered.
+        """
+        t = self.next_transition(data)
+        if t:
+            return t.state
         return None
 
     def __str__(self):
@@ -89,3 +109,31 @@ class State:
             for t in self.transitions:
                 string += f"  - {t}\n"
         return string
+
+
+class Parser:
+    """Models a parser: a FSM made of States connected by Transitions.
+
+    A Parser contains:
+      - a name
+      - the States that make up the parser, indexed by their full names
+      - the start state
+      - (optional) a digest of the contents of the parser definitions
+        file it was loaded from, which identifies the version of the
+        parser (see utils.cache)
+
+    A Parser owns its States, which aren't shared with any other
+    Parser, and it's never modified by a parsing run. The same Parser
+    can then be used to parse many logs concurrently.
+    """
+    def __init__(self, name, states, start_state, defs_digest=None):
+        self.name = name
+        self.states = states
+        self.start_state = start_state
+        self.defs_digest = defs_digest
+
+    def __str__(self):
+        string = f"Parser <{self.name}>\n"
+        for state in self.states.values():
+            string += str(state)
+        return string
@@ -12,12 +12,15 @@ respectively, and these modules are dynamically imported by
 These modules are expected to call the `register_state()' and
 `register_transition_function()' functions in this module when
 imported. All the registered states and transition functions are kept by
-this module.
+this module. The registered states are used as templates: every Parser
+created by `parser_loader()' gets its own copies of them, so loading a
+parser never modifies a parser that was loaded before.
 """
 
+import copy
 import importlib
 import os
-from logspec.parser_classes import Transition
+from logspec.parser_classes import Parser, Transition
 from logspec.version import __version__
 
 
@@ -75,7 +78,8 @@ def parser_loader(parser_defs, name):
           parser_defs
 
     Returns:
-      The start state of the parser.
+      The Parser object. The parser states are copies of the registered
+      states, private to this parser.
 
     Notes:
       Will raise ModuleNotFoundError if any of the specified modules
@@ -100,11 +104,15 @@ def parser_loader(parser_defs, name):
             msg = (f"Module states.{module} not found. "
                    f"Error loading state {state_def['name']}")
             raise ModuleNotFoundError(msg) from None
-    # Load transition function modules and build the parser
+    # Create this parser's copies of the states
+    parser_states = {}
     for state_def in parser['states']:
         if not state_def['name'] in states:
             raise RuntimeError(f"State {state_def['name']} not found.")
-        states[state_def['name']].transitions = []
+        parser_states[state_def['name']] = copy.copy(states[state_def['name']])
+    # Load transition function modules and build the parser
+    for state_def in parser['states']:
+        parser_states[state_def['name']].transitions = []
         if 'transitions' in state_def:
             for transition_def in state_def['transitions']:
                 module, _ = os.path.splitext(transition_def['function'])
@@ -116,13 +124,13 @@ def parser_loader(parser_defs, name):
                     raise ModuleNotFoundError(msg) from None
                 try:
                     function = transition_functions[transition_def['function']]
-                    state = states[transition_def['state']]
+                    state = parser_states[transition_def['state']]
                 except KeyError as err:
                     msg = (f"Error loading transition function "
                            f"{transition_def['function']}. {str(err)} not found.")
                     raise RuntimeError(msg) from None
-                states[state_def['name']].transitions.append(
+                parser_states[state_def['name']].transitions.append(
                     Transition(function, transition_def['function'], state))
-    if parser['start_state'] not in states:
+    if parser['start_state'] not in parser_states:
         raise RuntimeError(f"Start state {parser['start_state']} not found.")
-    return states[parser['start_state']]
+    return Parser(name, parser_states, parser_states[parser['start_state']])
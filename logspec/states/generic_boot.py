@@ -3,52 +3,60 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
 from logspec.parser_classes import State
 from logspec.parser_loader import register_state
 from logspec.utils.defs import LINUX_TIMESTAMP
+from logspec.utils.utils import text_range, window_pending, window_partial_result
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
 
 
 MODULE_NAME = 'generic_boot'
 
+# Patterns (tags) to search for. The regexp will be formed by or'ing
+# them
+BOOTLOADER_END_TAGS = [
+    "Starting kernel ...",
+    "jumping to kernel",
+    "Booting from ROM...",
+    f"{LINUX_TIMESTAMP} Booting Linux",
+]
+BOOTLOADER_END_REGEX = register_pattern(__name__, 'bootloader_end', '|'.join(BOOTLOADER_END_TAGS))
+
 
 # State functions
 
-def detect_bootloader_end(text, start=None, end=None):
+def detect_bootloader_end(text, start=None, end=None, window=None):
     """Detects the end of a bootloader execution in a text log and
     searches for errors during the process.
 
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the parsing starts
+      end (int): position in `text' where the parsing ends
+      window (dict): when parsing a log in windows, the window
+          descriptor (see main.parse_log_stream()). None otherwise
 
     Returns a dict containing the extracted info from the log:
       'bootloader.done': True if the bootloader was detected to boot
           successfuly, False otherwise
       '_match_end': position in `text' where the parsing ended
     """
-    # Patterns (tags) to search for. The regexp will be formed by or'ing
-    # them
-    tags = [
-        "Starting kernel ...",
-        "jumping to kernel",
-        "Booting from ROM...",
-        f"{LINUX_TIMESTAMP} Booting Linux",
-    ]
-    if start or end:
-        text = text[start:end]
+    start, end = text_range(text, start, end)
     data = {
         '_signature_fields': [
             'bootloader.done',
         ],
     }
-    regex = '|'.join(tags)
-    match = re.search(regex, text)
+    match = find_marker(BOOTLOADER_END_REGEX, text, start, end)
+    if not match and window_pending(window):
+        return window_partial_result(max(start, end - window['overlap']))
     if match:
-        data['_match_end'] = match.end() + start if start else match.end()
+        data['_match_end'] = match.end()
         data['bootloader.done'] = True
         data['_summary'] = "Bootloader stage done, jump to kernel"
     else:
-        data['_match_end'] = end if end else len(text)
+        data['_match_end'] = end
         data['bootloader.done'] = False
         data['_summary'] = ("Bootloader stage failed, inconclusive or "
                             "couldn't detect handover to kernel")
@@ -5,19 +5,25 @@
 
 from logspec.parser_classes import State
 from logspec.parser_loader import register_state
-from logspec.errors.kbuild import find_kbuild_error
+from logspec.errors.kbuild import find_kbuild_error, MAKE_ERROR_REGEX, KBUILD_ERROR_CONTEXT
+from logspec.utils.utils import text_range, window_pending, window_partial_result
+from logspec.utils.events import find_marker
 
 MODULE_NAME = 'kbuild'
 
 
 # State functions
 
-def detect_kbuild_start(text, start=None, end=None):
+def detect_kbuild_start(text, start=None, end=None, window=None):
     """Processes a kernel build log output and searches for errors in
     the process.
 
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the parsing starts
+      end (int): position in `text' where the parsing ends
+      window (dict): when parsing a log in windows, the window
+          descriptor (see main.parse_log_stream()). None otherwise
 
     Returns a dict containing the extracted info from the log:
       '_match_end': position in `text' where the parsing ended. If the
@@ -25,16 +31,22 @@ def detect_kbuild_start(text, start=None, end=None):
       'errors': list of errors found, if any.
           See utils.kbuild_errors.find_build_error().
     """
-    if start or end:
-        text = text[start:end]
+    start, end = text_range(text, start, end)
+    if window_pending(window):
+        # The classification of a kbuild error looks at the log text
+        # before the error line (see find_kbuild_error()): keep only
+        # that context until a complete error line is found
+        match = find_marker(MAKE_ERROR_REGEX, text, start, end)
+        if not match or text.find('\n', match.end(), end) == -1:
+            return window_partial_result(max(start, end - KBUILD_ERROR_CONTEXT))
     data = {}
     # TODO: detection of log structure and definition of `done' (if
     # applicable)
 
-    data['_match_end'] = end if end else len(text)
+    data['_match_end'] = end
     # Check for errors
     data['errors'] = []
-    error = find_kbuild_error(text)
+    error = find_kbuild_error(text, start, end)
     if error:
         data['errors'].append(error['error'])
         data['_match_end'] = error['_end']
@@ -3,38 +3,103 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
 from logspec.parser_classes import State
-from logspec.utils.linux_kernel_errors import find_kernel_error
+from logspec.utils.linux_kernel_errors import find_kernel_error, find_first_kernel_errors, \
+    GENERIC_ERROR_END_REGEX
 from logspec.parser_loader import register_state
 from logspec.utils.defs import LINUX_TIMESTAMP
+from logspec.errors.linux_kernel import KernelPanic
+from logspec.utils.utils import text_range, window_pending, window_partial_result, \
+    collect_window_errors
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+from logspec.utils.lines import find_line_end
+from logspec.utils.parallel import collect_errors
+from logspec.utils.verdict import in_verdict_mode
 
 
 MODULE_NAME = 'linux_kernel'
 
+# Done condition. The regexp will be formed by or'ing the tags here
+LINUX_PROMPT_TAGS = [
+    "/ #",
+]
+LINUX_PROMPT_REGEX = register_pattern(__name__, 'linux_prompt', '|'.join(LINUX_PROMPT_TAGS))
+KERNEL_LINE_REGEX = register_pattern(__name__, 'kernel_line', fr'{LINUX_TIMESTAMP} .*')
+KERNEL_VERSION_REGEX = register_pattern(__name__, 'kernel_version', fr'{LINUX_TIMESTAMP} Linux version .*')
+
 
 # Utility functions
-def _detect_kernel_start(text):
+def _detect_kernel_start(text, start=None, end=None):
     """Checks if the first line of text looks like the output of a Linux
     kernel starting. Returns a Match object if it does, None if it
     doesn't.
     """
-    try:
-        first_line_end = text.index('\n')
-    except ValueError:
+    start, end = text_range(text, start, end)
+    first_line_end = find_line_end(text, start, end)
+    if first_line_end == -1:
         # No new line found, so no first line
         return None
-    return re.match(fr'{LINUX_TIMESTAMP} .*',
-                    text[:first_line_end]) or re.search(fr'{LINUX_TIMESTAMP} Linux version .*', text)
+    return (KERNEL_LINE_REGEX.match(text, start, first_line_end)
+            or KERNEL_VERSION_REGEX.search(text, start, end))
+
+
+def _is_complete_report(report, text, end):
+    """Returns True if the end marker of an error report found by
+    find_kernel_error() is found in `text' before `end', or if the error
+    type doesn't have an end marker. Returns False otherwise: a report
+    without an end marker extends up to the next one, which may be
+    found later in the log.
+    """
+    end_marker = getattr(report['error'], '_end_marker', None)
+    if not end_marker:
+        return True
+    return bool(find_marker(end_marker, text, report['_start'], end))
+
+
+def _is_settled_report(report, text, end):
+    """Version of _is_complete_report() used when following a live log
+    (see main.follow_log()), where the errors must be reported as soon
+    as possible: a kernel panic report without an end marker (the
+    machine rebooted) is also considered complete once its block of
+    timestamped lines is followed by a complete line, instead of
+    waiting for an end marker that may be found later in the log.
+    """
+    if _is_complete_report(report, text, end):
+        return True
+    return (isinstance(report['error'], KernelPanic)
+            and text.find('\n', report['_end'] + 1, end) != -1)
+
+
+def _detect_kernel_start_window(text, start, end, window):
+    """Windowed version of _detect_kernel_start() for a window of a log
+    that isn't the last one. The result is kept in
+    `window['kernel_started']' and updated with every new window.
+
+    Returns False if the window doesn't contain the first kernel line
+    yet, True otherwise.
+    """
+    if 'kernel_started' not in window:
+        kernel_first_line_start = find_line_end(text, start, end) + 1
+        if not kernel_first_line_start or find_line_end(text, kernel_first_line_start, end) == -1:
+            return False
+        window['kernel_started'] = bool(_detect_kernel_start(text, kernel_first_line_start, end))
+    elif not window['kernel_started']:
+        window['kernel_started'] = bool(KERNEL_VERSION_REGEX.search(text, start, end))
+    return True
 
 
 # State functions
-def detect_linux_prompt(text, start=None, end=None):
+def detect_linux_prompt(text, start=None, end=None, window=None):
     """Processes a Linux initialization log until a command-line prompt
     is reached (done condition).
 
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the parsing starts
+      end (int): position in `text' where the parsing ends
+      window (dict): when parsing a log in windows, the window
+          descriptor (see main.parse_log_stream()). None otherwise
 
     Returns a dict containing the extracted info from the log:
       'linux.boot.prompt': True if the initialization reached a command-line
@@ -43,50 +108,57 @@ def detect_linux_prompt(text, start=None, end=None):
       'errors': list of errors found, if any (see
           utils.linux_kernel_errors.find_kernel_error()).
     """
-    # Check done condition. The regexp will be formed by or'ing the tags
-    # here
-    tags = [
-        "/ #",
-    ]
-    if start or end:
-        text = text[start:end]
+    start, end = text_range(text, start, end)
     data = {
         '_signature_fields': [
             'linux.boot.prompt',
             'linux.boot.kernel_started',
         ],
     }
-    regex = '|'.join(tags)
-    match = re.search(regex, text)
+    # Check done condition
+    match = find_marker(LINUX_PROMPT_REGEX, text, start, end)
+    if not match and window_pending(window):
+        # Prompt not found yet: collect the errors found so far and
+        # continue in the next window
+        if not _detect_kernel_start_window(text, start, end, window):
+            return window_partial_result(start)
+        is_complete = _is_settled_report if window.get('follow') else _is_complete_report
+        errors, resume = collect_window_errors(find_kernel_error, text, start, end, window,
+                                               is_complete)
+        return window_partial_result(resume, errors)
     if match:
-        data['_match_end'] = match.end() + start if start else match.end()
+        data['_match_end'] = match.end()
         data['linux.boot.kernel_started'] = True
         data['linux.boot.prompt'] = True
         data['_summary'] = "Linux boot prompt found"
     else:
         data['linux.boot.prompt'] = False
-        kernel_first_line_start = text.index('\n') + 1
-        if _detect_kernel_start(text[kernel_first_line_start:]):
+        if window and 'kernel_started' in window:
+            # Kernel start already checked in the previous windows
+            kernel_started = (window['kernel_started']
+                              or KERNEL_VERSION_REGEX.search(text, start, end))
+        else:
+            kernel_first_line_start = text.index('\n', start, end) + 1
+            kernel_started = _detect_kernel_start(text, kernel_first_line_start, end)
+        if kernel_started:
             data['linux.boot.kernel_started'] = True
             data['_summary'] = "Linux boot prompt not found"
         else:
             data['linux.boot.kernel_started'] = False
             data['_summary'] = "Kernel didn't start"
-        data['_match_end'] = end if end else len(text)
+        data['_match_end'] = end
 
     # Check for linux-specific errors in the log. If the `done'
     # condition was found, search only before it. Otherwise search in
     # the full log.
     data['errors'] = []
     if match:
-        text = text[:match.start()]
-    while True:
-        error = find_kernel_error(text)
-        if not error:
-            break
-        text = text[error['_end']:]
-        if error['error']:
-            data['errors'].append(error['error'])
+        end = match.start()
+    if in_verdict_mode():
+        data['errors'] = find_first_kernel_errors(text, start, end)
+        return data
+    data['errors'] = collect_errors(find_kernel_error, text, start, end,
+                                    GENERIC_ERROR_END_REGEX, _is_complete_report)
     return data
 
 
@@ -3,37 +3,49 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
 from logspec.parser_classes import State
 from logspec.utils.test_baseline_errors import find_test_baseline_dmesg_error
 from logspec.parser_loader import register_state
+from logspec.utils.utils import text_range, window_pending, window_partial_result, \
+    collect_window_errors
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+from logspec.utils.budget import budget_exceeded
+from logspec.utils.verdict import in_verdict_mode
 
 MODULE_NAME = 'test_baseline'
 
+START_TAGS = [
+    '/opt/kernelci/dmesg.sh',
+]
+START_REGEX = register_pattern(__name__, 'start', '|'.join(START_TAGS))
+
 
 # State functions
 
-def detect_test_baseline(text, start=None, end=None):
-    start_tags = [
-        '/opt/kernelci/dmesg.sh',
-    ]
-    if start or end:
-        text = text[start:end]
+def detect_test_baseline(text, start=None, end=None, window=None):
+    start, end = text_range(text, start, end)
     data = {
         '_signature_fields': [
             'test.baseline.start',
         ],
     }
-    regex = '|'.join(start_tags)
-
-    # Check for test start
-    match = re.search(regex, text)
-    if not match:
-        data['test.baseline.start'] = False
-        data['_match_end'] = end if end else len(text)
-        data['_summary'] = "Baseline test not detected"
-        return data
-    test_start = match.end()
+    if window and window.get('started'):
+        # Test start already found in a previous window
+        test_start = start
+    else:
+        # Check for test start
+        match = find_marker(START_REGEX, text, start, end)
+        if not match and window_pending(window):
+            return window_partial_result(max(start, end - window['overlap']))
+        if not match:
+            data['test.baseline.start'] = False
+            data['_match_end'] = end
+            data['_summary'] = "Baseline test not detected"
+            return data
+        test_start = match.end()
+        if window:
+            window['started'] = True
     test_end = None
     data['test.baseline.start'] = True
     data['_summary'] = "Baseline test started"
@@ -47,23 +59,29 @@ def detect_test_baseline(text, start=None, end=None):
     #    # NOTE: LAVA-specific
     #    '<LAVA_TEST_RUNNER EXIT>',
     # ]
-    match = re.search(regex, text[test_start:])
+    match = find_marker(START_REGEX, text, test_start, end)
+    if not match and window_pending(window):
+        errors, resume = collect_window_errors(
+            find_test_baseline_dmesg_error, text, test_start, end, window)
+        return window_partial_result(resume, errors)
     if match:
-        test_end = test_start + match.end()
-        data['_match_end'] = test_end + start if start else test_end
+        test_end = match.end()
     else:
-        data['_match_end'] = end if end else len(text)
+        test_end = end
+    data['_match_end'] = test_end
 
     # Check for errors during the test run. If the test end was
     # detected, search between the test beginning and end. Otherwise
     # search in the full log.
     data['errors'] = []
     while True:
-        error = find_test_baseline_dmesg_error(text[test_start:test_end])
+        error = find_test_baseline_dmesg_error(text, test_start, test_end)
         if not error:
             break
         data['errors'].append(error['error'])
-        test_start += error['_end']
+        test_start = error['_end']
+        if in_verdict_mode() or budget_exceeded(len(data['errors'])):
+            break
     return data
 
 
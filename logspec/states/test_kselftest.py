@@ -3,68 +3,122 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Helen Koike <helen.koike@collabora.com>
 
-import re
 from logspec.parser_classes import State
 from logspec.utils.test_kselftest_errors import find_test_kselftest_error
 from logspec.parser_loader import register_state
+from logspec.utils.utils import text_range, window_pending, window_partial_result
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker, find_last_marker
+from logspec.utils.budget import budget_exceeded
+from logspec.utils.verdict import in_verdict_mode
 
 MODULE_NAME = 'test_kselftest'
 
+START_TAGS = [
+    'kselftest.sh',
+]
+START_REGEX = register_pattern(__name__, 'start', '|'.join(START_TAGS))
+END_REGEX = register_pattern(__name__, 'end', r'(?:not )?ok \d+ selftests:')
+
+
+def _collect_window_errors(text, start, end, window):
+    """Collects the kselftest errors found between `start' and `end' in
+    a window of a log that isn't the last one.
+
+    An error is only collected if it ends before the start of the last
+    test end line found in the window (the errors after it could be
+    cut by the test end in the complete log) and, unless a live log is
+    being followed (`window['follow']', see
+    utils.collect_window_errors()), at least `window['overlap']'
+    characters before `end'. Since the report of each error spans from
+    the end of the previous one, the search is resumed right after the
+    last collected error.
+
+    Returns a tuple containing the list of collected errors and the
+    position in `text' from which the search must be resumed in the next
+    window.
+    """
+    match = find_last_marker(END_REGEX, text, start, end)
+    if not match:
+        return [], start
+    safe_end = match.start()
+    if not window.get('follow'):
+        safe_end = min(safe_end, end - window['overlap'])
+    errors = []
+    pos = start
+    while True:
+        error = find_test_kselftest_error(text, pos, end)
+        if not error or error['_end'] > safe_end:
+            break
+        errors.append(error['error'])
+        pos = error['_end']
+        if budget_exceeded(len(errors)):
+            break
+    return errors, pos
+
 
 # State functions
 
-def detect_test_kselftest(text, start=None, end=None):
-    start_tags = [
-        'kselftest.sh',
-    ]
-    if start or end:
-        text = text[start:end]
+def detect_test_kselftest(text, start=None, end=None, window=None):
+    start, end = text_range(text, start, end)
     data = {
         '_signature_fields': [
             'test.kselftest.script_call',
             'test.kselftest.start',
         ],
     }
-    regex = '|'.join(start_tags)
-
-    # Check for test start
-    match = re.search(regex, text)
-    if not match:
-        data['test.kselftest.script_call'] = False
-        data['test.kselftest.start'] = False
-        data['_match_end'] = end if end else len(text)
-        data['_summary'] = "Kselftest not detected"
-        return data
+    if window and window.get('started'):
+        # Test start already found in a previous window
+        test_start = start
+    else:
+        # Check for test start
+        match = find_marker(START_REGEX, text, start, end)
+        if not match and window_pending(window):
+            return window_partial_result(max(start, end - window['overlap']))
+        if not match:
+            data['test.kselftest.script_call'] = False
+            data['test.kselftest.start'] = False
+            data['_match_end'] = end
+            data['_summary'] = "Kselftest not detected"
+            return data
+        test_start = match.end()
+        if window:
+            window['started'] = True
+    if window_pending(window):
+        # The test end can only be found once the complete log has
+        # been read
+        errors, resume = _collect_window_errors(text, test_start, end, window)
+        return window_partial_result(resume, errors)
 
-    test_start = match.end()
     test_end = None
     data['test.kselftest.script_call'] = True
     data['_summary'] = "Kselftest started"
 
     # Check for test end, consider the last line starting with "ok \d+ selftests:"
     # or "not ok \d+ selftests:"
-    regex = r'(?:not )?ok \d+ selftests:'
-    matches = list(re.finditer(regex, text[test_start:]))
-    match = matches[-1] if matches else None
+    match = find_last_marker(END_REGEX, text, test_start, end)
     if match:
         data['test.kselftest.start'] = True
-        test_end = test_start + match.end()
-        data['_match_end'] = test_end + start if start else test_end
+        test_end = match.end()
+        data['_match_end'] = test_end
     else:
         data['test.kselftest.start'] = False
+        test_end = end
         # TODO: check if this is correct
-        data['_match_end'] = end if end else len(text)
+        data['_match_end'] = end
 
     # Check for linux-specific errors in the log. If the `done'
     # condition was found, search only before it. Otherwise search in
     # the full log.
     data['errors'] = []
     while True:
-        error = find_test_kselftest_error(text[test_start:test_end])
+        error = find_test_kselftest_error(text, test_start, test_end)
         if not error:
             break
         data['errors'].append(error['error'])
-        test_start += error['_end']
+        test_start = error['_end']
+        if in_verdict_mode() or budget_exceeded(len(data['errors'])):
+            break
     return data
 
 
@@ -75,5 +129,8 @@ register_state(
     State(
         name="Kselftest test",
         description="Search and process a kseftest test",
-        function=detect_test_kselftest),
+        function=detect_test_kselftest,
+        # The report of an error spans from the end of the previous
+        # one, so the text after the last error is kept
+        bounded_window=False),
     'test_kselftest')
@@ -0,0 +1,93 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Limits of the resources used to parse a log.
+
+A ParseBudget defines the maximum time, the maximum size of the log and
+the maximum number of errors of a parsing. When one of them is reached,
+parse_log() and parse_log_stream() stop and return the data collected
+so far, with a `_truncated' field that contains the reason:
+  'time': the parsing took longer than the maximum time
+  'size': the log is larger than the maximum size, the rest of it
+      wasn't parsed
+  'errors': the log contains more errors than the maximum, only the
+      first ones are returned
+
+The budget of the parsing in progress is made available to the states
+for the duration of the parsing, and the states check it with
+budget_exceeded() after every error found, so that a log with an error
+spew is cut as soon as the budget runs out instead of at the end of the
+state. The time is only checked between errors and between states: a
+single search that takes longer isn't interrupted.
+"""
+
+import contextlib
+import contextvars
+import time
+
+# ParseBudget of the log being parsed in the current context
+_parse_budget = contextvars.ContextVar('parse_budget', default=None)
+
+
+class ParseBudget():
+    """Resource limits of the parsing of a log. A limit set to None
+    means no limit. The time limit is counted from the creation of the
+    budget.
+    """
+    def __init__(self, max_time=None, max_size=None, max_errors=None):
+        self.max_time = max_time
+        self.max_size = max_size
+        self.max_errors = max_errors
+        self.deadline = None if max_time is None else time.monotonic() + max_time
+        # Number of errors already collected by the parser
+        self.errors = 0
+        # Reason of the truncation of the parsing, None if the budget
+        # wasn't exceeded
+        self.truncated = None
+
+    def exceeded(self, pending_errors=0):
+        """Returns True if the time or error limits have been exceeded,
+        considering the errors already collected plus `pending_errors'
+        (errors found by a state and not returned yet). Once the budget
+        is exceeded, the reason is kept in `truncated' and this always
+        returns True.
+        """
+        if self.truncated:
+            return True
+        if self.max_errors is not None and self.errors + pending_errors > self.max_errors:
+            self.truncated = 'errors'
+        elif self.deadline is not None and time.monotonic() >= self.deadline:
+            self.truncated = 'time'
+        return self.truncated is not None
+
+
+@contextlib.contextmanager
+def parse_budget(budget):
+    """Context manager that makes a ParseBudget available to
+    budget_exceeded() in the current context.
+    """
+    token = _parse_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _parse_budget.reset(token)
+
+
+def current_budget():
+    """Returns the ParseBudget of the parsing in progress, or None if
+    there's no budget in the current context.
+    """
+    return _parse_budget.get()
+
+
+def budget_exceeded(pending_errors=0):
+    """Returns True if the budget of the parsing in progress has been
+    exceeded (see ParseBudget.exceeded()), False if it hasn't or if
+    there's no budget in the current context.
+    """
+    budget = _parse_budget.get()
+    if budget is None:
+        return False
+    return budget.exceeded(pending_errors)
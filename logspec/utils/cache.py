@@ -0,0 +1,224 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Persistent, content-addressed cache of parsing results.
+
+The same logs are often parsed many times (retries, re-triage,
+different consumers). A ResultCache keeps the results in a directory,
+indexed by a key that identifies everything the result depends on:
+  - the contents of the log (a hash of its text, as it's parsed)
+  - the parser id and the contents of the parser definitions file it
+    was loaded from (Parser.defs_digest)
+  - the logspec version
+  - the parsing options that change the results
+
+Every result is stored in its own file (pickled), written to a
+temporary file and renamed, so concurrent readers and writers (other
+threads, worker processes or processes sharing the same cache
+directory) never see an incomplete entry. The total size of the cache
+is bounded: when it's exceeded, the least recently used entries (by
+file modification time, which is updated on every hit) are removed.
+The eviction is serialized between processes with a lock file.
+
+NOTE: the cache entries are unpickled when they're read, so the cache
+directory must only be writable by trusted users.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    fcntl = None
+
+import logspec.version
+from logspec.utils.compression import open_log_stream
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+# When the cache is evicted, it's reduced to this fraction of its
+# maximum size, so that the eviction doesn't run on every new entry
+EVICTION_TARGET = 0.9
+# Temporary files older than this (seconds) were left by writers that
+# didn't finish, and are removed by the eviction
+STALE_TMP_AGE = 3600
+_ENTRY_SUFFIX = '.pickle'
+_TMP_SUFFIX = '.tmp'
+_READ_SIZE = 1024 * 1024
+
+
+def _new_hash():
+    return hashlib.blake2b(digest_size=20)
+
+
+def bytes_digest(data):
+    """Returns the digest (hex str) of `data' (bytes)."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def log_file_digest(log_file_path):
+    """Returns the digest (hex str) of the contents of a log file.
+
+    The digest is computed over the text that is parsed, that is, the
+    contents of the file decompressed, decoded and with its newlines
+    translated (see main.parse_log_file()), and not over its bytes, so
+    it's the same as the digest of the text read from the file (see
+    log_text_digest()) and it changes with the decoding.
+    """
+    log_hash = _new_hash()
+    with open(log_file_path, 'rb') as log_file, open_log_stream(log_file) as log_stream:
+        while chunk := log_stream.read(_READ_SIZE):
+            log_hash.update(chunk.encode('utf-8', 'surrogatepass'))
+    return log_hash.hexdigest()
+
+
+def log_text_digest(log):
+    """Returns the digest (hex str) of a log text (str)."""
+    return bytes_digest(log.encode('utf-8', 'surrogatepass'))
+
+
+class ResultCache():
+    """Cache of parsing results stored in the directory `path' (created
+    if it doesn't exist), with a maximum total size of `max_size'
+    bytes.
+    """
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = os.fspath(path)
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+        # Estimated total size of the cache: the size found in the last
+        # eviction check plus the size of the entries written by this
+        # object since then (None: not checked yet)
+        self._size_estimate = None
+
+    def key(self, log_digest, parser, options):
+        """Returns the key of the result of parsing a log whose contents
+        have the digest `log_digest' (see log_file_digest() and
+        log_text_digest()) with `parser' (a Parser loaded with
+        main.load_parser()) and the parsing `options' (dict of the
+        options that change the results). Returns None if the result
+        can't be cached: `parser' isn't a Parser loaded from a parser
+        definitions file.
+        """
+        defs_digest = getattr(parser, 'defs_digest', None)
+        if not defs_digest:
+            return None
+        key_hash = _new_hash()
+        key_hash.update(json.dumps([
+            log_digest,
+            parser.name,
+            defs_digest,
+            logspec.version.__version__,
+            options,
+        ], sort_keys=True).encode('utf-8'))
+        return key_hash.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key[:2], key + _ENTRY_SUFFIX)
+
+    def get(self, key):
+        """Returns the result stored for `key', or None if it isn't in
+        the cache.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as entry:
+                blob = entry.read()
+        except OSError:
+            return None
+        try:
+            data = pickle.loads(blob)
+        except Exception:
+            # Unreadable entry (eg. written by an incompatible version)
+            self._remove(path)
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        """Stores the result `data' for `key'."""
+        path = self._entry_path(key)
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=_TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as entry:
+                entry.write(blob)
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        if self._size_estimate is not None:
+            self._size_estimate += len(blob)
+        if self._size_estimate is None or self._size_estimate > self.max_size:
+            self._evict()
+
+    def clear(self):
+        """Removes all the entries of the cache."""
+        with self._lock():
+            for path, _, _ in self._entries():
+                self._remove(path)
+        self._size_estimate = 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _lock(self):
+        """Returns a context manager that holds the cache lock, which
+        serializes the eviction between processes.
+        """
+        lock_file = open(os.path.join(self.path, 'lock'), 'a')
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        # Closing the file releases the lock
+        return lock_file
+
+    def _entries(self):
+        """Returns a list of (path, size, mtime) tuples with the entries
+        of the cache. Stale temporary files are removed.
+        """
+        entries = []
+        now = time.time()
+        for subdir in os.scandir(self.path):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(_ENTRY_SUFFIX):
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+                elif entry.name.endswith(_TMP_SUFFIX) and now - stat.st_mtime > STALE_TMP_AGE:
+                    self._remove(entry.path)
+        return entries
+
+    def _evict(self):
+        """Removes the least recently used entries if the cache is
+        larger than its maximum size.
+        """
+        with self._lock():
+            entries = self._entries()
+            size = sum(entry_size for _, entry_size, _ in entries)
+            if size > self.max_size:
+                target = self.max_size * EVICTION_TARGET
+                for path, entry_size, _ in sorted(entries, key=lambda e: e[2]):
+                    if size <= target:
+                        break
+                    self._remove(path)
+                    size -= entry_size
+            self._size_estimate = size
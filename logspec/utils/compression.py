@@ -0,0 +1,82 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Detection and transparent decompression of compressed logs.
+
+gzip and xz are supported through the standard library. zstd is
+supported if the `zstandard' module is installed.
+"""
+
+import gzip
+import io
+import lzma
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None
+
+
+def _open_zstd(log_file):
+    if not zstandard:
+        raise RuntimeError("zstd-compressed log found, but the zstandard "
+                           "module is not installed")
+    return zstandard.ZstdDecompressor().stream_reader(log_file, closefd=False)
+
+
+# Supported compression formats.
+# Key: format name, value: dict containing the magic bytes that
+# identify the format and the function that opens a decompressing
+# binary stream over a binary file object
+COMPRESSION_FORMATS = {
+    'gzip': {
+        'magic': b'\x1f\x8b',
+        'open': lambda log_file: gzip.GzipFile(fileobj=log_file, mode='rb'),
+    },
+    'xz': {
+        'magic': b'\xfd7zXZ\x00',
+        'open': lambda log_file: lzma.LZMAFile(log_file, mode='rb'),
+    },
+    'zstd': {
+        'magic': b'\x28\xb5\x2f\xfd',
+        'open': _open_zstd,
+    },
+}
+MAGIC_SIZE = max(len(fmt['magic']) for fmt in COMPRESSION_FORMATS.values())
+
+
+def detect_compression(log_file):
+    """Detects the compression format of a binary file object by
+    checking its magic bytes. The file position isn't changed.
+
+    Returns the name of the format (a key of COMPRESSION_FORMATS) or
+    None if the file isn't compressed in any of the supported formats.
+    """
+    if hasattr(log_file, 'peek'):
+        header = log_file.peek(MAGIC_SIZE)[:MAGIC_SIZE]
+    else:
+        pos = log_file.tell()
+        header = log_file.read(MAGIC_SIZE)
+        log_file.seek(pos)
+    for name, fmt in COMPRESSION_FORMATS.items():
+        if header.startswith(fmt['magic']):
+            return name
+    return None
+
+
+def open_log_stream(log_file, encoding=None, newline=None):
+    """Returns a text stream that reads a log from a binary file object
+    (`log_file'), decompressing it incrementally if it's compressed
+    (see detect_compression()). The `encoding' and `newline' parameters
+    are the same as in open(): by default, the log is decoded using the
+    preferred locale encoding and newlines are translated.
+
+    Closing the returned stream doesn't close `log_file' if it's
+    compressed.
+    """
+    compression = detect_compression(log_file)
+    if compression:
+        log_file = COMPRESSION_FORMATS[compression]['open'](log_file)
+    return io.TextIOWrapper(log_file, encoding=encoding, newline=newline)
@@ -16,8 +16,23 @@ class JsonSerialize(JSONEncoder):
         return o.fields_to_serialize()
 
 
-class JsonSerializeDebug(JSONEncoder):
-    """Default JSON serializer for custom classes. The classes are
-    expected to implement a `fields_to_serialize()' method."""
-    def default(self, o):
-        return o.fields_to_serialize(full=True)
+def output_view(value, full=False):
+    """Returns the view of `value' (the data returned by the parser, or
+    any part of it) that is serialized in the output, built in a single
+    traversal without modifying `value': the objects are replaced by the
+    dict returned by their `fields_to_serialize()' method and, unless
+    `full' is True, the dict fields starting with '_' and the empty
+    ("") fields of the objects are left out.
+    """
+    if isinstance(value, dict):
+        if full:
+            return {k: output_view(v, full) for k, v in value.items()}
+        return {k: output_view(v, full) for k, v in value.items() if not k.startswith('_')}
+    if isinstance(value, (list, tuple)):
+        return [output_view(v, full) for v in value]
+    if hasattr(value, 'fields_to_serialize'):
+        fields = value.fields_to_serialize(full)
+        if full:
+            return fields
+        return {k: v for k, v in fields.items() if v != ""}
+    return value
@@ -0,0 +1,228 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Index of the markers (events) found in a log.
+
+The states and error parsers look for the same markers (bootloader
+tags, prompts, error report start and end markers, etc.) over and over
+as the parsing progresses, many times over the rest of the log (for
+instance, every kernel report without an end marker looks for one up to
+the end of the log). An EventIndex scans the log once per marker,
+incrementally from the first position where it's looked up and only
+as far as needed, and keeps the matches found so that the next lookups
+of the same marker are resolved with a binary search instead of a new
+scan. Lookups in small ranges, such as the markers searched only inside
+an error report, are done with a regular search.
+
+parse_log() creates an EventIndex for the log being parsed and makes it
+available to the states and error parsers for the duration of the
+parsing. These use find_marker() and find_last_marker(), which fall back
+to a regular search if there's no index for the text being parsed (for
+instance, when parsing a log in windows or when calling an error parser
+directly).
+
+The markers must be patterns that don't depend on the end of the
+searched text (no `$' or lookahead assertions), so that a match in the
+full log is also a match in any range that contains it.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import re
+
+# Lookups in ranges up to this size (characters) that can't be resolved
+# with the matches already found are done with a regular search instead
+# of scanning the log further
+PLAIN_SEARCH_RANGE = 64 * 1024
+
+# EventIndex of the log being parsed in the current context
+_event_index = contextvars.ContextVar('event_index', default=None)
+
+
+class _MarkerEvents():
+    """Matches of a marker in a log, found incrementally from position
+    `start' (the first position where the marker was looked up) up to
+    position `end'.
+    """
+    def __init__(self, pattern, text, start, end):
+        self.pattern = pattern
+        self.text = text
+        self.end = end
+        self.restart(start)
+
+    def restart(self, start):
+        """Drops the matches found so far and restarts the scan at
+        `start'.
+        """
+        self._finditer = self.pattern.finditer(self.text, start, self.end)
+        self.start = start
+        self.matches = []
+        self.scanned = False
+
+    @property
+    def frontier(self):
+        """Position up to which the log has been scanned."""
+        if self.scanned:
+            return self.end
+        if self.matches:
+            return self.matches[-1].end()
+        return self.start
+
+    def resolves(self, pos):
+        """Returns True if the first match that starts at or after `pos'
+        is known without scanning the log any further.
+        """
+        return pos >= self.start and (
+            self.scanned or bool(self.matches) and self.matches[-1].start() >= pos)
+
+    def scan_to(self, pos):
+        """Scans the log for new matches until one that starts at or
+        after `pos' is found, or until the end of the scan.
+        """
+        while not self.scanned and (not self.matches or self.matches[-1].start() < pos):
+            match = next(self._finditer, None)
+            if match:
+                self.matches.append(match)
+            else:
+                self.scanned = True
+
+    def first_index(self, pos):
+        """Returns the index of the first match that starts at or after
+        `pos', or None if `pos' falls inside a match (in that case, the
+        next match after `pos' might have been skipped by the scan) or
+        before the start of the scan.
+        """
+        if pos < self.start:
+            return None
+        self.scan_to(pos)
+        index = bisect.bisect_left(self.matches, pos, key=re.Match.start)
+        if index > 0 and self.matches[index - 1].end() > pos:
+            return None
+        return index
+
+
+class EventIndex():
+    """Index of the markers found in a log (`text').
+
+    Markers are compiled regex patterns. Each one is scanned only once,
+    incrementally, starting at the first position where it's looked up.
+    The lookups that can't be resolved with the matches already found
+    are done with a regular search instead of scanning further when
+    their range is small (PLAIN_SEARCH_RANGE) or when they start before
+    the scan of the marker. A lookup that starts far beyond the part of
+    the log already scanned restarts the scan there, so the text in
+    between isn't scanned. If `start' or `end' are set, the log is only
+    scanned between them and the lookups outside of that range are
+    always done with a regular search (for instance, in a worker process
+    that searches only a segment of the log, see utils.parallel).
+    """
+    def __init__(self, text, start=0, end=None):
+        self.text = text
+        self.start = start
+        self.end = len(text) if end is None else end
+        self._markers = {}
+
+    def _events(self, pattern, start, end):
+        """Returns the _MarkerEvents of `pattern' to resolve a lookup
+        between `start' and `end', or None if the lookup must be done
+        with a regular search.
+        """
+        if end > self.end:
+            return None
+        events = self._markers.get(pattern)
+        if events is not None and events.resolves(start):
+            return events
+        if start < self.start or end - start <= PLAIN_SEARCH_RANGE:
+            return None
+        if events is None:
+            events = _MarkerEvents(pattern, self.text, start, self.end)
+            self._markers[pattern] = events
+        elif start < events.start:
+            return None
+        elif start > events.frontier + PLAIN_SEARCH_RANGE:
+            events.restart(start)
+        return events
+
+    def find(self, pattern, start, end):
+        """Equivalent to pattern.search(text, start, end)."""
+        events = self._events(pattern, start, end)
+        if events is None:
+            return pattern.search(self.text, start, end)
+        index = events.first_index(start)
+        if index is None:
+            return pattern.search(self.text, start, end)
+        if index == len(events.matches) or events.matches[index].start() >= end:
+            return None
+        match = events.matches[index]
+        if match.end() > end:
+            # The match in the full log extends past `end', there might
+            # be a shorter one before `end'
+            return pattern.search(self.text, start, end)
+        return match
+
+    def find_last(self, pattern, start, end):
+        """Returns the last match of `pattern' in `text' between `start'
+        and `end', or None if there isn't any. Equivalent to the last
+        element of pattern.finditer(text, start, end).
+        """
+        events = self._events(pattern, start, end)
+        if events is None:
+            return _last_match(pattern, self.text, start, end)
+        first = events.first_index(start)
+        if first is None:
+            return _last_match(pattern, self.text, start, end)
+        events.scan_to(end)
+        last = bisect.bisect_left(events.matches, end, key=re.Match.start)
+        if last > 0 and events.matches[last - 1].end() > end:
+            # The last match in the full log extends past `end', there
+            # might be a shorter one before `end'
+            return _last_match(pattern, self.text, start, end)
+        if last <= first:
+            return None
+        return events.matches[last - 1]
+
+
+def _last_match(pattern, text, start, end):
+    try:
+        *_, match = pattern.finditer(text, start, end)
+    except ValueError:
+        return None
+    return match
+
+
+@contextlib.contextmanager
+def event_index(text, start=0, end=None):
+    """Context manager that makes an EventIndex of `text' (scanned
+    between `start' and `end') available to find_marker() and
+    find_last_marker() in the current context.
+    """
+    token = _event_index.set(EventIndex(text, start, end))
+    try:
+        yield
+    finally:
+        _event_index.reset(token)
+
+
+def find_marker(pattern, text, start, end):
+    """Searches for the first match of a marker (compiled pattern) in
+    `text' between `start' and `end', using the EventIndex of `text', if
+    any. Equivalent to pattern.search(text, start, end).
+    """
+    index = _event_index.get()
+    if index is None or index.text is not text:
+        return pattern.search(text, start, end)
+    return index.find(pattern, start, end)
+
+
+def find_last_marker(pattern, text, start, end):
+    """Searches for the last match of a marker (compiled pattern) in
+    `text' between `start' and `end', using the EventIndex of `text', if
+    any. Returns None if no match was found.
+    """
+    index = _event_index.get()
+    if index is None or index.text is not text:
+        return _last_match(pattern, text, start, end)
+    return index.find_last(pattern, start, end)
@@ -0,0 +1,215 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Reading of a log that is still being written (live tail-follow).
+
+main.follow_log() parses a log incrementally while it grows, such as
+the log of a running LAVA job, and reports the errors as soon as they
+are found. The log is read with a FollowReader, which waits for new
+text when it reaches the end of the log and decides when the log is
+complete.
+
+The progress of the parsing is kept in a checkpoint (dict) that
+contains the position of the reader, the state of the FSM, the parser
+data collected so far and the number of errors reported, but not the
+errors themselves, so its size doesn't grow with the number of errors.
+A checkpoint can be saved with save_checkpoint() and passed to
+main.follow_log() later, even in another process, together with the
+errors reported until then, to resume the parsing where it was left
+without parsing the first part of the log again. The errors can be
+stored incrementally as they're reported with append_errors() and read
+back with load_errors().
+
+NOTE: the checkpoints and the errors are stored pickled, so their files
+must only be writable by trusted users.
+"""
+
+import codecs
+import io
+import locale
+import os
+import pickle
+import stat
+import tempfile
+import time
+
+# Time (seconds) to wait before checking again for new log text
+DEFAULT_POLL_INTERVAL = 1.0
+# Version of the checkpoint format
+CHECKPOINT_VERSION = 2
+
+
+class FollowReader():
+    """Reads a log that may still be growing from `log_file' (a file
+    path or a binary file object).
+
+    The log is read in binary mode and decoded incrementally in the
+    same way as a log file read in text mode (preferred locale
+    encoding, universal newlines). The reader keeps the position of
+    the next byte to read and the state of the decoder (see
+    position()), so a new reader can continue reading the log from the
+    same point (`position').
+
+    When there's no new text in a regular file, the reader waits
+    `poll_interval' seconds and checks again. The log is considered
+    complete when no new text arrives for `idle_timeout' seconds (None:
+    wait forever) or when the `stop' function, called on every check,
+    returns True. In a pipe, the log is complete when the pipe is
+    closed by the writer.
+    """
+    def __init__(self, log_file, position=None, poll_interval=DEFAULT_POLL_INTERVAL,
+                 idle_timeout=None, stop=None):
+        if isinstance(log_file, (str, bytes, os.PathLike)):
+            self.file = open(log_file, 'rb')
+            self._owned = True
+        else:
+            self.file = log_file
+            self._owned = False
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.stop = stop
+        try:
+            self.pipe = not stat.S_ISREG(os.fstat(self.file.fileno()).st_mode)
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            self.pipe = False
+        decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))()
+        self._decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+        # Number of bytes read (and passed to the decoder)
+        self.offset = 0
+        if position:
+            self._restore(position)
+
+    def _restore(self, position):
+        offset, decoder_state = position
+        if self.pipe:
+            # The log can't be seeked: skip the part already read,
+            # assuming that the log is written again from the start
+            while self.offset < offset:
+                chunk = self.file.read(min(offset - self.offset, 1024 * 1024))
+                if not chunk:
+                    raise ValueError("The log is shorter than the checkpoint position")
+                self.offset += len(chunk)
+        else:
+            self.file.seek(offset)
+            self.offset = offset
+        self._decoder.setstate(decoder_state)
+
+    def position(self):
+        """Returns the position of the reader in the log: a tuple
+        containing the offset of the next byte to read and the state of
+        the decoder.
+        """
+        return self.offset, self._decoder.getstate()
+
+    def _read_chunk(self, size):
+        if hasattr(self.file, 'read1'):
+            return self.file.read1(size)
+        return self.file.read(size)
+
+    def read(self, size):
+        """Reads up to `size' characters of new log text, waiting for
+        them if the end of the log was reached. Returns the text read
+        and True if the log is complete (there's no more text to read
+        after it).
+        """
+        last_text_time = time.monotonic()
+        stopping = False
+        while True:
+            chunk = self._read_chunk(size)
+            if chunk:
+                self.offset += len(chunk)
+                text = self._decoder.decode(chunk)
+                if text:
+                    return text, False
+                # Incomplete character
+                continue
+            if self.pipe or stopping:
+                return self._decoder.decode(b'', final=True), True
+            if ((self.stop and self.stop())
+                    or (self.idle_timeout is not None
+                        and time.monotonic() - last_text_time >= self.idle_timeout)):
+                # Read any text written right before the log was
+                # complete
+                stopping = True
+                continue
+            time.sleep(self.poll_interval)
+
+    def close(self):
+        if self._owned:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_checkpoint(checkpoint, path):
+    """Stores a `checkpoint' (see main.follow_log()) in the file
+    `path'. The file is replaced atomically, so it always contains a
+    complete checkpoint.
+    """
+    path = os.fspath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as checkpoint_file:
+            pickle.dump(checkpoint, checkpoint_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(path):
+    """Returns the checkpoint stored in the file `path' with
+    save_checkpoint(), or None if the file doesn't exist.
+    """
+    try:
+        with open(path, 'rb') as checkpoint_file:
+            return pickle.load(checkpoint_file)
+    except FileNotFoundError:
+        return None
+
+
+def append_errors(errors, path):
+    """Appends a list of reported `errors' (the 'errors' of a
+    main.follow_log() record) to the file `path'. Only the new errors
+    are written, so storing all the errors of a log this way takes a
+    time proportional to their number.
+
+    The errors of a record must be appended before its checkpoint is
+    saved, so that the file always contains at least the errors
+    reported up to the saved checkpoint.
+    """
+    if not errors:
+        return
+    with open(path, 'ab') as errors_file:
+        pickle.dump(errors, errors_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_errors(path, count):
+    """Returns the first `count' errors stored in the file `path' with
+    append_errors(), that is, the errors reported up to a checkpoint
+    made after `count' errors. The errors stored after them (appended
+    before a checkpoint that couldn't be saved) are dropped from the
+    file, since they'll be reported again when the parsing is resumed.
+
+    Raises a ValueError if the file contains less than `count' errors.
+    """
+    errors = []
+    try:
+        with open(path, 'r+b') as errors_file:
+            while len(errors) < count:
+                try:
+                    errors.extend(pickle.load(errors_file))
+                except EOFError:
+                    break
+            errors_file.truncate(errors_file.tell())
+    except FileNotFoundError:
+        pass
+    if len(errors) != count:
+        raise ValueError(f"{path} contains {len(errors)} errors, {count} were expected")
+    return errors
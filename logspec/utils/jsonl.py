@@ -0,0 +1,114 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""JSON Lines output of the parsing results.
+
+Every parsing result is written as a single line containing a compact
+JSON object, as soon as it's available, so the results of a batch of
+logs (see main.parse_logs()) can be streamed to a file and processed
+while the batch is still running. The fields are written in the order
+they have in the results (there's no global sorting) and the errors are
+serialized one by one, without building the JSON document of the whole
+result in memory.
+
+As in main.format_data_output(), the fields starting with '_' and the
+empty error fields are left out unless the full output is requested
+(see utils.defs.output_view()). The results themselves aren't
+modified.
+
+The `orjson' module is used to encode the JSON if it's installed,
+otherwise the standard `json' module is used.
+"""
+
+import io
+import json
+
+from logspec.utils.defs import output_view
+
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+
+class JsonLinesWriter():
+    """Writes parsing results as JSON Lines to `stream', a text
+    (io.TextIOBase) or binary file object. If `full' is True, the
+    hidden fields (starting with '_') are written too. The stream is
+    flushed after every line if `flush' is True.
+    """
+    def __init__(self, stream, full=False, flush=True):
+        self.stream = stream
+        self.full = full
+        self.flush = flush
+        self.binary = not isinstance(stream, io.TextIOBase)
+
+    def _encode(self, value):
+        """Returns the compact JSON encoding of `value' (str), which is
+        serialized as in the output (see utils.defs.output_view()).
+        """
+        value = output_view(value, self.full)
+        if orjson:
+            return orjson.dumps(value).decode('utf-8')
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+    def _data_chunks(self, data):
+        """Generates the JSON text of the parser `data' (dict) in
+        chunks: the fields other than the errors, then every error.
+        """
+        fields = {k: v for k, v in data.items() if k != 'errors'}
+        head = self._encode(fields)[:-1]
+        if 'errors' not in data:
+            yield head + '}'
+            return
+        yield head + (',' if head != '{' else '') + '"errors":['
+        for i, error in enumerate(data['errors']):
+            yield (',' if i else '') + self._encode(error)
+        yield ']}'
+
+    def _write_line(self, chunks):
+        for chunk in chunks:
+            self.stream.write(chunk.encode('utf-8') if self.binary else chunk)
+        self.stream.write(b'\n' if self.binary else '\n')
+        if self.flush:
+            self.stream.flush()
+
+    def write(self, data):
+        """Writes the parser `data' (dict, see main.parse_log()) as a
+        line.
+        """
+        self._write_line(self._data_chunks(data))
+
+    def write_error(self, error):
+        """Writes a single error (Error object or dict), such as the
+        errors reported by main.follow_log(), as a line.
+        """
+        self._write_line([self._encode(error)])
+
+    def write_result(self, result):
+        """Writes a result record of main.parse_logs() as a line
+        containing its `index', `log_file' and `error' fields and its
+        parser `data', if any.
+        """
+        def chunks():
+            head = {k: result[k] for k in ('index', 'log_file', 'error')}
+            if result['data'] is None:
+                yield self._encode(head)
+                return
+            yield self._encode(head)[:-1] + ',"data":'
+            yield from self._data_chunks(result['data'])
+            yield '}'
+        self._write_line(chunks())
+
+    def write_results(self, results):
+        """Writes every result record of the `results' iterable (such as
+        the generator returned by main.parse_logs()) as soon as it's
+        available. Returns the number of records written.
+        """
+        count = 0
+        for result in results:
+            self.write_result(result)
+            count += 1
+        return count
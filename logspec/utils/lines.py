@@ -0,0 +1,180 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Index of the lines of a log.
+
+Some states and error parsers need to know where the lines of the log
+start and end, or which lines start with a kernel timestamp, and they
+used to find that out by searching for newlines every time. A LogIndex
+finds the start of every line of a log once, the first time it's
+needed, and resolves the position-to-line and line-to-position lookups
+with a binary search.
+
+parse_log() creates a LogIndex for the log being parsed and makes it
+available to the states and error parsers for the duration of the
+parsing. The helper functions in this module use it if there's one for
+the text being parsed and fall back to searching the text otherwise
+(for instance, when parsing a log in windows or when calling an error
+parser directly), since indexing the complete text for a single lookup
+would be slower than searching it.
+"""
+
+import array
+import bisect
+import contextlib
+import contextvars
+import re
+
+from logspec.utils.defs import LINUX_TIMESTAMP
+from logspec.utils.patterns import register_pattern
+
+TIMESTAMP_REGEX = register_pattern(__name__, 'timestamp', LINUX_TIMESTAMP)
+NEWLINE_REGEX = register_pattern(__name__, 'newline', r'\n')
+TIMESTAMP_LINE_REGEX = register_pattern(__name__, 'timestamp_line', f'^{LINUX_TIMESTAMP}', flags=re.MULTILINE)
+
+# LogIndex of the log being parsed in the current context
+_log_index = contextvars.ContextVar('log_index', default=None)
+
+
+class LogIndex():
+    """Index of the lines of a log (`text').
+
+    Lines are numbered from 0 and separated by '\\n'. The line index and
+    the per-line timestamp flags are built lazily, the first time
+    they're needed.
+    """
+    def __init__(self, text):
+        self.text = text
+        self._line_starts = None
+        self._timestamps = None
+
+    @property
+    def line_starts(self):
+        """Array with the position in `text' where each line starts."""
+        if self._line_starts is None:
+            # The newlines are found in place, without splitting the
+            # text in lines (a copy of the whole log)
+            line_starts = array.array('q', [0])
+            line_starts.extend(match.end() for match in NEWLINE_REGEX.finditer(self.text))
+            self._line_starts = line_starts
+        return self._line_starts
+
+    @property
+    def timestamps(self):
+        """Bytearray with a 1 for every line that starts with a kernel
+        timestamp, and 0 for the rest.
+        """
+        if self._timestamps is None:
+            line_starts = self.line_starts
+            timestamps = bytearray(len(line_starts))
+            line = 0
+            for match in TIMESTAMP_LINE_REGEX.finditer(self.text):
+                line = bisect.bisect_right(line_starts, match.start(), lo=line) - 1
+                timestamps[line] = 1
+            self._timestamps = timestamps
+        return self._timestamps
+
+    @property
+    def num_lines(self):
+        """Number of lines in `text'."""
+        return len(self.line_starts)
+
+    def line_number(self, pos):
+        """Returns the number of the line that contains position `pos'."""
+        return bisect.bisect_right(self.line_starts, pos) - 1
+
+    def line_range(self, line):
+        """Returns a (start, end) tuple with the positions where `line'
+        starts and ends (not including the newline).
+        """
+        start = self.line_starts[line]
+        if line + 1 < len(self.line_starts):
+            return start, self.line_starts[line + 1] - 1
+        return start, len(self.text)
+
+    def find_line_end(self, start, end):
+        """Equivalent to text.find('\\n', start, end)."""
+        line_end = self.line_range(self.line_number(start))[1]
+        if line_end >= end or line_end == len(self.text):
+            return -1
+        return line_end
+
+    def timestamp_block_end(self, start, end):
+        """Returns the position where the block of consecutive lines
+        that start with a kernel timestamp, beginning at `start', ends
+        (not including the last newline), looking only at the text
+        before `end'. Returns `start' if there's no timestamp at
+        `start'.
+        """
+        line = self.line_number(start)
+        last_line = self.line_number(end)
+        block_end = start
+        if line < last_line:
+            # First line: `start' may not be the start of a line
+            if not TIMESTAMP_REGEX.match(self.text, start, self.line_range(line)[1]):
+                return start
+            # Complete lines before the one that contains `end'
+            no_timestamp = self.timestamps.find(0, line + 1, last_line)
+            if no_timestamp != -1:
+                return self.line_starts[no_timestamp] - 1
+            start = self.line_starts[last_line]
+            block_end = start - 1
+        # Last line, up to `end'
+        last_line_end = min(self.line_range(last_line)[1], end)
+        if TIMESTAMP_REGEX.match(self.text, start, last_line_end):
+            return last_line_end
+        return block_end
+
+
+@contextlib.contextmanager
+def log_index(text):
+    """Context manager that makes a LogIndex of `text' available to the
+    functions of this module in the current context.
+    """
+    token = _log_index.set(LogIndex(text))
+    try:
+        yield
+    finally:
+        _log_index.reset(token)
+
+
+def _get_index(text):
+    index = _log_index.get()
+    if index is None or index.text is not text:
+        return None
+    return index
+
+
+def find_line_end(text, start, end):
+    """Returns the position of the first newline in `text' between
+    `start' and `end', or -1 if there isn't any, using the LogIndex of
+    `text', if any. Equivalent to text.find('\\n', start, end).
+    """
+    index = _get_index(text)
+    if index is None:
+        return text.find('\n', start, end)
+    return index.find_line_end(start, end)
+
+
+def timestamp_block_end(text, start, end):
+    """Returns the position where the block of consecutive lines of
+    `text' that start with a kernel timestamp, beginning at `start',
+    ends (see LogIndex.timestamp_block_end()), using the LogIndex of
+    `text', if any.
+    """
+    index = _get_index(text)
+    if index is not None:
+        return index.timestamp_block_end(start, end)
+    block_end = start
+    line_start = start
+    while line_start <= end:
+        line_end = text.find('\n', line_start, end)
+        if line_end == -1:
+            line_end = end
+        if not TIMESTAMP_REGEX.match(text, line_start, line_end):
+            break
+        block_end = line_end
+        line_start = line_end + 1
+    return block_end
@@ -3,13 +3,52 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
-
 from logspec.errors.linux_kernel import NullPointerDereference, KernelBug, \
     UBSANError, KernelPanic, ErrorReturnCode, GenericError
+from logspec.utils.utils import text_range
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+
+
+# Tags to look for. For every tag found, the parsing is delegated to
+# the appropriate object.
+# Key: tag name, value: error class (in logspec/errors/linux_kernel.py)
+ERROR_REPORT_TAGS = {
+    'null_pointer': NullPointerDereference,
+    'bug': KernelBug,
+    'ubsan': UBSANError,
+    'kernel_panic': KernelPanic,
+    'error_return_code': ErrorReturnCode,
+    # 'Oops': {
+    #     'regex': f'{LINUX_TIMESTAMP} Oops:',
+    #     'error_class': KernelOops,
+    # },
+}
+GENERIC_ERROR_REPORT_TAGS = {
+    'generic': GenericError,
+}
+
 
+def _error_report_pattern(tags):
+    return '|'.join([f"(?P<{tag}>{error_class.start_marker_regex})"
+                     for tag, error_class in tags.items()])
 
-def find_error_report(text, include_generic=True):
+
+ERROR_REPORT_REGEX = register_pattern(
+    __name__, 'error_report', _error_report_pattern(ERROR_REPORT_TAGS))
+ERROR_REPORT_REGEX_GENERIC = register_pattern(
+    __name__, 'error_report_generic',
+    _error_report_pattern({**ERROR_REPORT_TAGS, **GENERIC_ERROR_REPORT_TAGS}))
+GENERIC_ERROR_END_REGEX = register_pattern(__name__, 'generic_error_end', GenericError.end_marker_regex)
+# Start markers of each type of error report, searched separately by
+# find_first_kernel_errors()
+ERROR_START_REGEXES = {
+    tag: register_pattern(__name__, f'{tag}_start', error_class.start_marker_regex)
+    for tag, error_class in {**ERROR_REPORT_TAGS, **GENERIC_ERROR_REPORT_TAGS}.items()
+}
+
+
+def find_error_report(text, start=None, end=None, include_generic=True):
     """Finds a kernel error report in a text log.
 
     Current types of error reports supported:
@@ -17,39 +56,29 @@ def find_error_report(text, include_generic=True):
       - NULL pointer dereferences
 
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the search starts
+      end (int): position in `text' where the search ends
+      include_generic (bool): search for generic "cut here" blocks too
 
     Returns:
     If an error report was found, it returns a dict containing:
       'error': specific error object containing the structured error
           info, or None if the parser failed to parse the error block
           completely.
+      '_start': position in the text where the report starts
       'end': position in the text right after the parsed block
     None if no error report was found.
 
     """
-    # Tags to look for. For every tag found, the parsing is delegated to
-    # the appropriate object.
-    # Key: tag name, value: error class (in logspec/errors/linux_kernel.py)
-    tags = {
-        'null_pointer': NullPointerDereference,
-        'bug': KernelBug,
-        'ubsan': UBSANError,
-        'kernel_panic': KernelPanic,
-        'error_return_code': ErrorReturnCode,
-        # 'Oops': {
-        #     'regex': f'{LINUX_TIMESTAMP} Oops:',
-        #     'error_class': KernelOops,
-        # },
-    }
-    generic_tags = {
-        'generic': GenericError,
-    }
+    start, end = text_range(text, start, end)
     if include_generic:
-        tags.update(generic_tags)
-
-    regex = '|'.join([f"(?P<{tag}>{error_class.start_marker_regex})" for tag, error_class in tags.items()])
-    match = re.search(regex, text)
+        tags = {**ERROR_REPORT_TAGS, **GENERIC_ERROR_REPORT_TAGS}
+        regex = ERROR_REPORT_REGEX_GENERIC
+    else:
+        tags = ERROR_REPORT_TAGS
+        regex = ERROR_REPORT_REGEX
+    match = find_marker(regex, text, start, end)
     if match:
         # Detect which of the tags was found and dispatch the parsing to
         # the right function
@@ -59,46 +88,93 @@ def find_error_report(text, include_generic=True):
         if matched_tag == 'generic':
             # Check if a more specific error can be found inside a
             # "cut here" block and parse it
-            end_match = re.search(tags[matched_tag].end_marker_regex, text[match.end():])
+            end_match = find_marker(GENERIC_ERROR_END_REGEX, text, match.end(), end)
             if end_match:
                 start_pos = match.end()
-                end_pos = start_pos + end_match.end()
-                report = find_error_report(text[start_pos:end_pos], include_generic=False)
+                end_pos = end_match.end()
+                report = find_error_report(text, start_pos, end_pos, include_generic=False)
                 if report:
+                    report['_start'] = match.start()
                     report['_end'] = end_pos
                     return report
         # Base case: parse error
         error = tags[matched_tag]()
-        error_parse_end = error.parse(text[match.start():])
+        error_parse_end = error.parse(text, match.start(), end)
         # Skip the error if it failed to parse
-        if not error_parse_end:
+        if error_parse_end is None or error_parse_end == match.start():
             return {
                 'error': None,
+                '_start': match.start(),
                 '_end': match.end()
             }
-        end = match.start() + error_parse_end
         return {
             'error': error,
-            '_end': end,
+            '_start': match.start(),
+            '_end': error_parse_end,
         }
     return None
 
 
-def find_kernel_error(text):
+def find_kernel_error(text, start=None, end=None):
     """Find kernel errors in a text segment.
 
     Currently supported:
       - kernel error reports (find_error_report)
 
     Parameters:
-      text (str): the log or text fragment to parse
+      text (str): the full log
+      start (int): position in `text' where the search starts
+      end (int): position in `text' where the search ends
 
     Returns:
     If an error report was found, it returns a dict containing:
       'error': specific error object containing the structured error
           info. None if no error couldn't be properly parsed
+      '_start': position in the text where the report starts
       'end': position in the text right after the parsed block
     None if no error report was found.
     """
-    report = find_error_report(text)
+    report = find_error_report(text, start, end)
     return report
+
+
+def find_first_kernel_errors(text, start=None, end=None):
+    """Finds the first kernel error report of each type in a text
+    segment (see utils.verdict). Instead of parsing all the reports in
+    order, the start marker of every type of report is searched
+    separately, so the text is only scanned up to the first report of
+    each type, or once for the types that aren't found.
+
+    The report found at every start marker is parsed as in
+    find_error_report(). Since every type is searched on its own, a
+    report nested in another one (for instance, a message matching the
+    error return code marker inside a kernel BUG report) can be
+    returned too.
+
+    Parameters:
+      text (str): the full log
+      start (int): position in `text' where the search starts
+      end (int): position in `text' where the search ends
+
+    Returns:
+      The list of errors found (the first one of each error type), in
+      the order they appear in the log.
+    """
+    start, end = text_range(text, start, end)
+    reports = {}
+    for regex in ERROR_START_REGEXES.values():
+        report = None
+        match = find_marker(regex, text, start, end)
+        while match:
+            report = find_error_report(text, match.start(), end)
+            if report and report['error']:
+                break
+            # Skip the reports that fail to parse
+            report = None
+            match = find_marker(regex, text, match.end(), end)
+        if not report:
+            continue
+        error_type = report['error'].error_type
+        if error_type not in reports or report['_start'] < reports[error_type]['_start']:
+            reports[error_type] = report
+    return [report['error'] for report in sorted(reports.values(), key=lambda r: r['_start'])]
@@ -0,0 +1,288 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Parallel search of the errors of a huge log.
+
+Most of the time spent parsing a huge log (long multi-stage boots,
+error spews) goes to the error loop of the states: an error finder
+function (such as linux_kernel_errors.find_kernel_error()) is called
+over and over, every time from the end of the previous report. Each
+search depends on where the previous one ended, so the loop can't
+simply be split in parts.
+
+Instead, the range searched by the loop is split in segments at line
+boundaries, right after the end marker of a report if there's one close
+to the split point (see split_points()), and a worker process runs the
+error loop on every segment, starting at its beginning. The searches
+of a worker only look at its segment plus a margin of SEGMENT_OVERLAP
+characters after it, so the log is scanned only once in total, and the
+worker only keeps the reports that end in its segment and that are
+complete (the reports that cross the end of the segment are left to
+the main process). Every search made by a worker also tells that no
+report starts between its start position and the report found (or the
+end of the segment, if none was found).
+
+Then the main process runs the sequential loop, using the searches
+made by the workers: the result of a search is taken from the worker
+search that started at the same position or before it, if no report
+starts in between, and only the rest of the searches (the reports that
+cross the segment boundaries or that the workers couldn't complete)
+are done in the main process. This requires the result of the error
+finder to depend only on the first report that starts at or after the
+search position, and the results are the same as those of the
+sequential loop as long as every report, and the text that its parsing
+looks at, fits in the margin (as when parsing a log in windows, see
+main.parse_log_stream()).
+
+parse_log() makes a ParallelSearch available to the states for the
+duration of the parsing if more than one worker is requested, and the
+states use collect_errors() for their error loops. The worker processes
+are only started when a range large enough to be split is searched.
+"""
+
+import contextlib
+import contextvars
+import bisect
+from concurrent.futures import ProcessPoolExecutor
+
+from logspec.utils.budget import ParseBudget, parse_budget, budget_exceeded, current_budget
+from logspec.utils.events import event_index
+from logspec.utils.projection import field_projection, projected_fields
+from logspec.utils.signature import signature_engine, current_signature_version
+
+# Minimum size (characters) of a segment searched by a worker process
+DEFAULT_SEGMENT_SIZE = 1024 * 1024
+# Number of characters after the end of its segment that a worker
+# process can look at to complete a report (same as the default overlap
+# of the windows, see main.parse_log_stream())
+SEGMENT_OVERLAP = 128 * 1024
+# The split points are moved forward to the end of the first report
+# found up to this fraction of the segment size after them
+BOUNDARY_SEARCH_FRACTION = 0.25
+
+# ParallelSearch of the log being parsed in the current context
+_parallel_search = contextvars.ContextVar('parallel_search', default=None)
+
+# Log searched by the worker processes
+_worker_text = None
+
+
+def _init_worker(text):
+    global _worker_text
+    _worker_text = text
+
+
+def _search_segment(find_error, start, stop, end, is_complete, fields, signature_version,
+                    deadline, max_errors):
+    """Runs the error loop of `find_error' in a worker process over the
+    segment between `start' and `stop', looking at the text up to
+    SEGMENT_OVERLAP characters after `stop' (or up to the end of the
+    searched range, `end'). The loop stops at the first report that
+    doesn't start in the segment, that doesn't end in it or that isn't
+    complete according to `is_complete' (see
+    utils.collect_window_errors()).
+
+    The loop also stops early when the `deadline' of the parsing budget
+    (time.monotonic() value) is reached or when more than `max_errors'
+    errors are found (the errors left in the budget of the parsing): in
+    both cases the budget is exceeded before the main process needs the
+    next searches. None means no limit.
+
+    Returns the list of searches made, as (position, next_start,
+    report) tuples, meaning that no report starts between `position'
+    and `next_start' and that the result of a search at `position' is
+    `report' (None if it's unknown).
+    """
+    text = _worker_text
+    bound = min(end, stop + SEGMENT_OVERLAP)
+    # Only the reports that end before the margin are kept
+    safe_end = stop if bound < end else end
+    budget = ParseBudget(max_errors=max_errors)
+    budget.deadline = deadline
+    searches = []
+    errors = 0
+    pos = start
+    with event_index(text, start, bound), field_projection(fields), \
+         signature_engine(signature_version), parse_budget(budget):
+        while pos < stop:
+            report = find_error(text, pos, bound)
+            if not report or report['_start'] >= stop:
+                searches.append((pos, stop, None))
+                break
+            if report['_end'] > safe_end or (is_complete
+                                             and not is_complete(report, text, bound)):
+                searches.append((pos, report['_start'], None))
+                break
+            searches.append((pos, report['_start'], report))
+            pos = report['_end']
+            if report['error']:
+                errors += 1
+            if budget_exceeded(errors):
+                break
+    return searches
+
+
+def split_points(text, start, end, segments, boundary=None):
+    """Returns a list of positions that split the range of `text'
+    between `start' and `end' in (at most) `segments' segments of
+    similar size. The split points are placed at the start of a line:
+    right after the first match of the `boundary' marker (compiled
+    pattern, such as the end marker of the error reports) found close
+    to the ideal split point, if any, or at the next line otherwise.
+    """
+    segment_size = (end - start) // segments
+    points = []
+    for i in range(1, segments):
+        pos = start + i * segment_size
+        if points and pos <= points[-1]:
+            continue
+        if boundary:
+            match = boundary.search(
+                text, pos, min(end, pos + int(segment_size * BOUNDARY_SEARCH_FRACTION)))
+            if match:
+                pos = match.end()
+        line_end = text.find('\n', pos, end)
+        if line_end == -1:
+            break
+        points.append(line_end + 1)
+    return points
+
+
+class ParallelSearch():
+    """Searches the errors of a log (`text') with up to `workers' worker
+    processes, in segments of at least `segment_size' characters.
+    """
+    def __init__(self, text, workers, segment_size=DEFAULT_SEGMENT_SIZE):
+        self.text = text
+        self.workers = workers
+        self.segment_size = segment_size
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # The log is passed to the workers once, when they're
+            # started (with the `fork' start method, it isn't even
+            # copied)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             initializer=_init_worker,
+                                             initargs=(self.text,))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def segments(self, start, end):
+        """Returns the number of segments in which the range between
+        `start' and `end' is split.
+        """
+        return max(1, min(self.workers, (end - start) // self.segment_size))
+
+    def search(self, find_error, start, end, boundary=None, is_complete=None):
+        """Runs the error loop of `find_error' from `start' to `end' in
+        the worker processes (see the module docs and _search_segment()).
+
+        The workers stop searching when the budget of the parsing in
+        progress (see utils.budget) is exceeded.
+
+        Returns the list of searches made by the workers, sorted by
+        position (see _search_segment()).
+        """
+        points = [start] + split_points(self.text, start, end, self.segments(start, end),
+                                        boundary)
+        fields = projected_fields()
+        signature_version = current_signature_version()
+        deadline = max_errors = None
+        budget = current_budget()
+        if budget is not None:
+            deadline = budget.deadline
+            if budget.max_errors is not None:
+                max_errors = budget.max_errors - budget.errors
+        pool = self._get_pool()
+        futures = [pool.submit(_search_segment, find_error, seg_start, seg_stop, end,
+                               is_complete, fields, signature_version, deadline, max_errors)
+                   for seg_start, seg_stop in zip(points, points[1:] + [end])]
+        searches = []
+        for future in futures:
+            searches.extend(future.result())
+        return searches
+
+
+@contextlib.contextmanager
+def parallel_search(text, workers, segment_size=None):
+    """Context manager that makes a ParallelSearch of `text' with
+    `workers' worker processes available to collect_errors() in the
+    current context. Nothing is done if `workers' is less than 2.
+    """
+    if not workers or workers < 2:
+        yield None
+        return
+    search = ParallelSearch(text, workers, segment_size or DEFAULT_SEGMENT_SIZE)
+    token = _parallel_search.set(search)
+    try:
+        yield search
+    finally:
+        _parallel_search.reset(token)
+        search.close()
+
+
+def _known_result(searches, positions, pos):
+    """Returns a (position, report) tuple with the result of the search
+    at `pos' taken from the `searches' made by the workers (see
+    ParallelSearch.search()), whose positions are `positions': the
+    report is the result of the search at `pos', or None if the search
+    at `pos' must be made, and it gives the same result as one at the
+    returned position.
+    """
+    while True:
+        index = bisect.bisect_right(positions, pos) - 1
+        if index < 0:
+            return pos, None
+        _, next_start, report = searches[index]
+        if pos > next_start:
+            return pos, None
+        if report is not None:
+            return pos, report
+        if next_start == pos:
+            # Report not completed by the worker
+            return pos, None
+        # No report in the rest of the segment
+        pos = next_start
+
+
+def collect_errors(find_error, text, start, end, boundary=None, is_complete=None):
+    """Runs an error finder function (such as
+    linux_kernel_errors.find_kernel_error()) repeatedly over the text
+    between `start' and `end', every time from the end of the previous
+    report, and returns the list of errors found. The loop stops early
+    if the parsing budget is exceeded (see utils.budget).
+
+    If there's a ParallelSearch of `text' in the current context and
+    the range is large enough, the searches are done in parallel (see
+    the module docs). `boundary' is the end marker of the reports,
+    used to split the range, if any, and `is_complete' is a function
+    that tells if a report found by a worker is complete (see
+    utils.collect_window_errors()), if any.
+    """
+    search = _parallel_search.get()
+    searches = []
+    if search is not None and search.text is text and search.segments(start, end) > 1:
+        searches = search.search(find_error, start, end, boundary, is_complete)
+    positions = [s[0] for s in searches]
+    errors = []
+    pos = start
+    while True:
+        search_pos, report = _known_result(searches, positions, pos)
+        if report is None:
+            report = find_error(text, search_pos, end)
+        if not report:
+            break
+        pos = report['_end']
+        if report['error']:
+            errors.append(report['error'])
+        if budget_exceeded(len(errors)):
+            break
+    return errors
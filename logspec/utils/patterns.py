@@ -0,0 +1,60 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Registry of the regex patterns used by the states and error parsers.
+
+Every static pattern is compiled once, when the module that uses it
+registers it with `register_pattern()' (normally at import time), and
+it's kept here under a unique name. The modules keep a reference to the
+compiled pattern returned by `register_pattern()', so the patterns are
+never compiled again nor looked up in the `re' module cache during the
+parsing. The registry can be used to inspect all the patterns in one
+place (see `get_pattern()' and `patterns').
+"""
+
+import re
+
+# Registered patterns.
+# Key: pattern name, value: compiled pattern
+patterns = {}
+
+MODULE_PREFIX = 'logspec.'
+
+
+def register_pattern(module, name, pattern, flags=0):
+    """Compiles and registers a regex pattern.
+
+    Parameters:
+      module: name of the module that registers the pattern (normally
+          its __name__, the `logspec.' prefix is removed)
+      name: name of the pattern
+      pattern (str): regex pattern
+      flags: regex flags (see re.compile())
+
+    Returns:
+      The compiled pattern, registered as `<module>.<name>'.
+
+    Notes:
+      Will raise a RuntimeError if a different pattern is already
+      registered with the same name
+    """
+    full_name = f"{module.removeprefix(MODULE_PREFIX)}.{name}"
+    compiled_pattern = re.compile(pattern, flags)
+    if full_name in patterns:
+        if patterns[full_name] != compiled_pattern:
+            raise RuntimeError(f"Pattern <{full_name}> already registered")
+        return patterns[full_name]
+    patterns[full_name] = compiled_pattern
+    return compiled_pattern
+
+
+def get_pattern(name):
+    """Returns the compiled pattern registered as `name' (see
+    register_pattern()).
+
+    Notes:
+      Will raise a KeyError if no pattern is registered with that name
+    """
+    return patterns[name]
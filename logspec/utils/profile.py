@@ -0,0 +1,138 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Per-state profiling of a parsing run.
+
+When profiling is enabled (see main.parse_log()), the FSM loop runs the
+states and selects their transitions through a ParseProfile, which
+keeps a record of every state visited:
+  'state': name of the state
+  'start': position in the log where the state started parsing
+  'end': position in the log where the state ended parsing
+  'chars': number of characters parsed by the state (end - start)
+  'runs': number of times the state function was run (more than one
+      if the log was parsed in windows)
+  'errors': number of errors found by the state
+  'transition': name of the transition taken, None if the parsing
+      ended in this state
+  'next_state': name of the next state, None if the parsing ended in
+      this state
+  'wall_start': time (seconds) from the start of the parsing until the
+      state was entered
+  'wall_time': wall time (seconds) spent in the state function and
+      transitions
+  'cpu_time': CPU time (seconds) of the current thread spent in the
+      state function and transitions
+
+The records are returned by `result()' in the order the states were
+visited, and can be exported in the Chrome trace event format with
+chrome_trace().
+"""
+
+import time
+
+
+class ParseProfile():
+    """Profile of a parsing run (see the module documentation)."""
+    def __init__(self):
+        self.states = []
+        self._current = None
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+    def _measure(self, function, *params):
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        result = function(*params)
+        self._current['wall_time'] += time.perf_counter() - wall
+        self._current['cpu_time'] += time.thread_time() - cpu
+        return result
+
+    def run_state(self, state, pos, *params):
+        """Runs `state' (see State.run()) with `params' and measures
+        it. `pos' is the position in the log where the state starts
+        parsing. If the state was already run and not ended (see
+        end_state()), the new run is added to the same record.
+
+        Returns the data returned by the state.
+        """
+        if self._current is None:
+            self._current = {
+                'state': state.name,
+                'start': pos,
+                'runs': 0,
+                'errors': 0,
+                'transition': None,
+                'next_state': None,
+                'wall_start': time.perf_counter() - self._wall_start,
+                'wall_time': 0.0,
+                'cpu_time': 0.0,
+            }
+        state_data = self._measure(state.run, *params)
+        self._current['runs'] += 1
+        if state_data:
+            self._current['errors'] += len(state_data.get('errors', []))
+        return state_data
+
+    def transition(self, state, state_data):
+        """Selects the next state (see State.transition()) for the data
+        returned by `state' and measures it.
+
+        Returns the next state, or None if no transition triggered.
+        """
+        t = self._measure(state.next_transition, state_data)
+        if not t:
+            return None
+        self._current['transition'] = t.name
+        self._current['next_state'] = t.state.name
+        return t.state
+
+    def end_state(self, pos):
+        """Closes the record of the current state. `pos' is the position
+        in the log where the state ended parsing.
+        """
+        self._current['end'] = pos
+        self._current['chars'] = pos - self._current['start']
+        self.states.append(self._current)
+        self._current = None
+
+    def result(self):
+        """Returns the profile of the parsing run (dict):
+          'wall_time': total wall time (seconds) of the parsing
+          'cpu_time': total CPU time (seconds) of the parsing
+          'states': list of state records (see the module
+              documentation)
+        """
+        return {
+            'wall_time': time.perf_counter() - self._wall_start,
+            'cpu_time': time.thread_time() - self._cpu_start,
+            'states': self.states,
+        }
+
+
+def chrome_trace(profile):
+    """Converts the profile of a parsing run (see ParseProfile.result())
+    into the Chrome trace event format, which can be loaded in
+    chrome://tracing, Perfetto or speedscope.
+
+    Returns the trace (dict), ready to be serialized as JSON.
+    """
+    events = []
+    for record in profile['states']:
+        events.append({
+            'name': record['state'],
+            'cat': 'state',
+            'ph': 'X',
+            'ts': record['wall_start'] * 1e6,
+            'dur': record['wall_time'] * 1e6,
+            'pid': 0,
+            'tid': 0,
+            'args': {k: v for k, v in record.items()
+                     if k not in ('state', 'wall_start', 'wall_time')},
+        })
+    return {
+        'traceEvents': events,
+        'displayTimeUnit': 'ms',
+    }
@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Projection of the error fields in the output.
+
+A caller that only needs some of the fields of the errors (for
+instance, `error_type' and `_signature') can pass the list of fields to
+parse_log(). This is an output projection: the errors are found and
+parsed as usual and, once the parsing is done, the fields not in the
+projection are removed from the errors (see project_errors()), so
+they're not serialized nor sent back by the parse_logs() workers.
+
+The parsing itself barely changes: the only work saved is the
+extraction of the details of the kernel error reports (see
+Error._detail_fields), which is skipped when none of them is in the
+projection nor used for the error signature, and that's a small part
+of the parsing time (most of it goes to finding the reports). The
+details aren't extracted lazily on first access, since the errors
+would have to keep the whole log text alive for that.
+
+The projection is made available to the error parsers for the duration
+of the parsing with field_projection(), and they check it with
+projected_fields().
+"""
+
+import contextlib
+import contextvars
+
+# Fields of the errors needed by the caller of the parsing in progress
+# in the current context, None if all the fields are needed
+_projection = contextvars.ContextVar('projection', default=None)
+
+
+@contextlib.contextmanager
+def field_projection(fields):
+    """Context manager that sets the projection of the error fields
+    (iterable of field names, or None for no projection) in the current
+    context.
+    """
+    token = _projection.set(None if fields is None else frozenset(fields))
+    try:
+        yield
+    finally:
+        _projection.reset(token)
+
+
+def projected_fields():
+    """Returns the set of error fields in the projection of the current
+    context, or None if there's no projection.
+    """
+    return _projection.get()
+
+
+def project_errors(errors, fields):
+    """Removes the fields not in `fields' from every error in `errors'
+    (Error objects or dicts).
+    """
+    for error in errors:
+        if isinstance(error, dict):
+            for key in [k for k in error if k not in fields]:
+                del error[key]
+        else:
+            for key in [k for k in error.fields_to_serialize(full=True) if k not in fields]:
+                delattr(error, key)
@@ -0,0 +1,252 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Opt-in usage statistics of the registered regex patterns.
+
+Inside a collect_regex_stats() context, every reference to a registered
+pattern (see utils.patterns) kept by the logspec modules, either as a
+module global, as a class attribute or as a value of a module global
+dict (such as linux_kernel_errors.ERROR_START_REGEXES), is replaced by
+an instrumented version of it that records, for every pattern and call
+site:
+  'calls': number of searches (search(), match(), fullmatch() and
+      finditer() calls)
+  'matches': number of matches found
+  'chars': number of characters scanned: up to the end of the match
+      for successful searches and up to the end of the searched range
+      for unsuccessful ones
+  'time': cumulative time (seconds) spent in the searches
+
+The call site is the function (`<module>.<function>:<line>') that
+called the pattern, or the one that called utils.events for it.
+
+The statistics are collected for the current context only (thread or
+async task, see contextvars), so concurrent parsings can collect their
+own statistics at the same time. The patterns are instrumented when the
+first context starts and the original patterns are restored when the
+last one ends, so the instrumentation doesn't cost anything outside of
+them. Only the modules already imported when the patterns are
+instrumented are affected, so the parser must be loaded before entering
+the context.
+
+The statistics of many parsing runs (for instance, the ones returned by
+parse_logs()) can be aggregated with merge_regex_stats() and printed
+with format_regex_stats().
+"""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+
+from logspec.utils.patterns import patterns, MODULE_PREFIX
+
+# Statistics being collected in the current context.
+# Key: pattern name, value: dict (key: call site, value: dict of
+# counters)
+_current_stats = contextvars.ContextVar('regex_stats', default=None)
+
+# Number of active collect_regex_stats() contexts and the patterns that
+# were instrumented by the first one, as (pattern, instrumented
+# pattern) tuples, protected by _instrumentation_lock
+_active_contexts = 0
+_instrumented = []
+_instrumentation_lock = threading.Lock()
+
+# Modules whose callers are reported as the call site instead of them
+_SKIPPED_MODULES = {__name__, 'logspec.utils.events', 'logspec.utils.lines'}
+
+
+def _call_site():
+    frame = sys._getframe(1)
+    while frame and frame.f_globals.get('__name__') in _SKIPPED_MODULES:
+        frame = frame.f_back
+    if not frame:
+        return None
+    module = frame.f_globals.get('__name__', '').removeprefix(MODULE_PREFIX)
+    function = getattr(frame.f_code, 'co_qualname', frame.f_code.co_name)
+    return f"{module}.{function}:{frame.f_lineno}"
+
+
+def _record(stats, name, site, matches, chars, elapsed):
+    counters = stats.setdefault(name, {}).setdefault(site, {
+        'calls': 0,
+        'matches': 0,
+        'chars': 0,
+        'time': 0.0,
+    })
+    counters['calls'] += 1
+    counters['matches'] += matches
+    counters['chars'] += chars
+    counters['time'] += elapsed
+
+
+def _search_range(string, pos, endpos):
+    if endpos is None or endpos > len(string):
+        endpos = len(string)
+    return max(pos, 0), max(endpos, 0)
+
+
+class _InstrumentedPattern():
+    """Wrapper of a compiled pattern that records the statistics of its
+    searches. Any other attribute is taken from the wrapped pattern.
+    """
+    def __init__(self, name, pattern):
+        self.name = name
+        self.wrapped_pattern = pattern
+
+    def __getattr__(self, attr):
+        return getattr(self.wrapped_pattern, attr)
+
+    def _run(self, function, string, pos, endpos):
+        stats = _current_stats.get()
+        if stats is None:
+            # Searched out of a collect_regex_stats() context
+            if endpos is None:
+                return function(string, pos)
+            return function(string, pos, endpos)
+        site = _call_site()
+        pos, endpos = _search_range(string, pos, endpos)
+        start = time.perf_counter()
+        match = function(string, pos, endpos)
+        elapsed = time.perf_counter() - start
+        chars = max((match.end() if match else endpos) - pos, 0)
+        _record(stats, self.name, site, 1 if match else 0, chars, elapsed)
+        return match
+
+    def search(self, string, pos=0, endpos=None):
+        return self._run(self.wrapped_pattern.search, string, pos, endpos)
+
+    def match(self, string, pos=0, endpos=None):
+        return self._run(self.wrapped_pattern.match, string, pos, endpos)
+
+    def fullmatch(self, string, pos=0, endpos=None):
+        return self._run(self.wrapped_pattern.fullmatch, string, pos, endpos)
+
+    def finditer(self, string, pos=0, endpos=None):
+        stats = _current_stats.get()
+        if stats is None:
+            if endpos is None:
+                yield from self.wrapped_pattern.finditer(string, pos)
+            else:
+                yield from self.wrapped_pattern.finditer(string, pos, endpos)
+            return
+        site = _call_site()
+        matches = 0
+        elapsed = 0.0
+        match = None
+        pos, endpos = _search_range(string, pos, endpos)
+        iterator = self.wrapped_pattern.finditer(string, pos, endpos)
+        try:
+            while True:
+                start = time.perf_counter()
+                match = next(iterator, None)
+                elapsed += time.perf_counter() - start
+                if not match:
+                    break
+                matches += 1
+                yield match
+        finally:
+            chars = max((endpos if match is None else match.end()) - pos, 0)
+            _record(stats, self.name, site, matches, chars, elapsed)
+
+
+def _pattern_holders():
+    """Returns the namespaces (dicts) of the loaded logspec modules and
+    of the classes defined in them, and the global dicts of the modules,
+    where the references to the registered patterns are kept. Each one
+    is returned as an (owner, namespace) tuple, where `owner' is the
+    module or class, or None for a dict.
+    """
+    holders = []
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not (module_name == 'logspec' or module_name.startswith(MODULE_PREFIX)):
+            continue
+        if module_name == __name__:
+            continue
+        holders.append((module, vars(module)))
+        for value in list(vars(module).values()):
+            if isinstance(value, type) and value.__module__ == module_name:
+                holders.append((value, value.__dict__))
+            elif isinstance(value, dict) and value is not patterns:
+                # The registry itself must keep the original patterns
+                holders.append((None, value))
+    return holders
+
+
+def _replace_patterns(replacements):
+    for owner, namespace in _pattern_holders():
+        for key, value in list(namespace.items()):
+            replacement = replacements.get(id(value))
+            if replacement is None or value is not replacement[0]:
+                continue
+            if owner is None:
+                namespace[key] = replacement[1]
+            else:
+                setattr(owner, key, replacement[1])
+
+
+@contextlib.contextmanager
+def collect_regex_stats(stats=None):
+    """Context manager that instruments the registered patterns and
+    collects their statistics (see the module documentation) in
+    `stats' (dict, a new one if not specified), which is returned by
+    the context manager. Only the searches run in the current context
+    are recorded: the ones run in other threads aren't, unless they
+    run in a copy of the context (see contextvars.copy_context()).
+    When nested, the statistics are also added to the ones of the
+    enclosing context at the end.
+    """
+    global _active_contexts, _instrumented
+    if stats is None:
+        stats = {}
+    previous_stats = _current_stats.get()
+    with _instrumentation_lock:
+        if not _active_contexts:
+            _instrumented = [(pattern, _InstrumentedPattern(name, pattern))
+                             for name, pattern in patterns.items()]
+            _replace_patterns({id(pattern): (pattern, wrapper)
+                               for pattern, wrapper in _instrumented})
+        _active_contexts += 1
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+        with _instrumentation_lock:
+            _active_contexts -= 1
+            if not _active_contexts:
+                _replace_patterns({id(wrapper): (wrapper, pattern)
+                                   for pattern, wrapper in _instrumented})
+                _instrumented = []
+        if previous_stats is not None:
+            merge_regex_stats(previous_stats, stats)
+
+
+def merge_regex_stats(dest, stats):
+    """Adds the regex statistics in `stats' to `dest'. Returns `dest'."""
+    for name, sites in stats.items():
+        dest_sites = dest.setdefault(name, {})
+        for site, counters in sites.items():
+            dest_counters = dest_sites.setdefault(site, dict.fromkeys(counters, 0))
+            for key, value in counters.items():
+                dest_counters[key] += value
+    return dest
+
+
+def format_regex_stats(stats, top=20):
+    """Returns a report (str) of the `top' pattern and call site
+    combinations of `stats' that took the longest time.
+    """
+    rows = [(counters, name, site)
+            for name, sites in stats.items()
+            for site, counters in sites.items()]
+    rows.sort(key=lambda row: row[0]['time'], reverse=True)
+    lines = [f"{'time (s)':>10} {'calls':>8} {'matches':>8} {'chars':>12}  pattern @ call site"]
+    for counters, name, site in rows[:top]:
+        lines.append(f"{counters['time']:>10.6f} {counters['calls']:>8} "
+                     f"{counters['matches']:>8} {counters['chars']:>12}  {name} @ {site}")
+    return '\n'.join(lines)
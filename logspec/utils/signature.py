@@ -0,0 +1,140 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Versioned signature engine.
+
+The signatures of the errors and of the parser results are hashes of a
+set of their fields (see Error._signature_fields). Two versions of the
+engine are available:
+
+  1: SHA-1 of the JSON serialization of the fields, with the keys
+     sorted (see utils.generate_signature()). This is the engine used
+     by the older logspec versions, kept for compatibility with the
+     signatures already stored.
+  2 (default): keyed BLAKE2b of the field names and values, fed to the
+     hash in the order of the signature fields and joined with ASCII
+     separator characters instead of serialized as JSON. The digest has
+     the same length as the version 1 one (40 hex characters).
+
+The version used by the parsing in progress is set for its duration
+with signature_engine(), and the signatures are computed with
+SignatureHasher, which hashes the fields incrementally: a hasher can be
+copied to get the signature of a subset of the fields (the first ones
+fed to it) without hashing them again.
+"""
+
+import contextlib
+import contextvars
+import hashlib
+import json
+
+from logspec.utils.utils import generate_signature
+
+SIGNATURE_VERSIONS = (1, 2)
+DEFAULT_SIGNATURE_VERSION = 2
+
+# Key of the version 2 hash, it keeps these signatures apart from
+# plain hashes of the same fields
+SIGNATURE_KEY = b'logspec-signature-v2'
+# Separators of the fields and of the items of a list in the version 2
+# hash input. These characters don't show up in the text of the logs.
+FIELD_SEPARATOR = '\x1f'
+ITEM_SEPARATOR = '\x1e'
+_V2_HASH = hashlib.blake2b(digest_size=20, key=SIGNATURE_KEY)
+
+# Signature version used by the parsing in progress in the current
+# context
+_version = contextvars.ContextVar('signature_version', default=DEFAULT_SIGNATURE_VERSION)
+
+
+@contextlib.contextmanager
+def signature_engine(version=None):
+    """Context manager that sets the signature engine version used in
+    the current context (DEFAULT_SIGNATURE_VERSION if `version' is
+    None).
+    """
+    if version is None:
+        version = DEFAULT_SIGNATURE_VERSION
+    if version not in SIGNATURE_VERSIONS:
+        raise ValueError(f"Unknown signature version: {version}")
+    token = _version.set(version)
+    try:
+        yield
+    finally:
+        _version.reset(token)
+
+
+def current_signature_version():
+    """Returns the signature engine version used in the current
+    context.
+    """
+    return _version.get()
+
+
+def _encode_value(value):
+    """Returns the text fed to the version 2 hash for a field value."""
+    if value.__class__ is str:
+        return value
+    if value.__class__ is list:
+        try:
+            return ITEM_SEPARATOR + ITEM_SEPARATOR.join(value)
+        except TypeError:
+            pass
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+class SignatureHasher():
+    """Incremental signature of a set of fields.
+
+    Fields are fed with update() and the signature is returned by
+    hexdigest(). copy() returns an independent hasher with the fields
+    fed so far.
+    """
+    __slots__ = ('version', '_fields', '_hash')
+
+    def __init__(self, version=None):
+        self.version = version if version is not None else current_signature_version()
+        if self.version == 1:
+            self._fields = {}
+            self._hash = None
+        else:
+            self._fields = None
+            self._hash = _V2_HASH.copy()
+
+    def update(self, field, value):
+        """Adds the field `field' with value `value' to the
+        signature.
+        """
+        if self._hash is None:
+            self._fields[field] = value
+        else:
+            self._hash.update(f'{field}{FIELD_SEPARATOR}{_encode_value(value)}{FIELD_SEPARATOR}'.encode('utf-8'))
+
+    def copy(self):
+        """Returns a copy of the hasher."""
+        hasher = SignatureHasher.__new__(SignatureHasher)
+        hasher.version = self.version
+        hasher._fields = None if self._fields is None else dict(self._fields)
+        hasher._hash = None if self._hash is None else self._hash.copy()
+        return hasher
+
+    def hexdigest(self):
+        """Returns the signature of the fields fed so far as a string
+        of hex digits.
+        """
+        if self._hash is None:
+            return generate_signature(self._fields)
+        return self._hash.hexdigest()
+
+
+def fields_signature(fields, version=None):
+    """Returns the signature of the (field, value) items of the dict
+    `fields' using the signature engine `version' (the one of the
+    current context by default).
+    """
+    hasher = SignatureHasher(version)
+    for field, value in fields.items():
+        hasher.update(field, value)
+    return hasher.hexdigest()
@@ -3,13 +3,17 @@
 # Copyright (C) 2024 Collabora Limited
 # Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
 
-import re
-
 from logspec.errors.test import TestError
+from logspec.utils.utils import text_range
+from logspec.utils.patterns import register_pattern
+from logspec.utils.events import find_marker
+
+DMESG_ERROR_REGEX = register_pattern(__name__, 'dmesg_error', r'kern  :(?P<message>.*)')
 
 
-def find_test_baseline_dmesg_error(text):
-    match = re.search(r'kern  :(?P<message>.*)', text)
+def find_test_baseline_dmesg_error(text, start=None, end=None):
+    start, end = text_range(text, start, end)
+    match = find_marker(DMESG_ERROR_REGEX, text, start, end)
     if not match:
         return None
     error = TestError()
@@ -17,8 +21,9 @@ def find_test_baseline_dmesg_error(text):
     error.error_summary = match.group('message')
     # Parsing on a generic TestError object simply generates a
     # signature, we already did the parsing above
-    error.parse(text)
+    error.parse(text, start, end)
     return {
         'error': error,
+        '_start': match.start(),
         '_end': match.end(),
     }
@@ -6,11 +6,11 @@
 from logspec.errors.test import KselftestError
 
 
-def find_test_kselftest_error(text):
+def find_test_kselftest_error(text, start=None, end=None):
     error = KselftestError()
     # Parsing on a generic TestError object simply generates a
     # signature, we already did the parsing above
-    report_end = error.parse(text)
+    report_end = error.parse(text, start, end)
     if not report_end:
         return None
     return {
@@ -6,6 +6,8 @@
 import hashlib
 import json
 
+from logspec.utils.budget import budget_exceeded
+
 
 def update_dict(dest_dict, new_data):
     """Updates dest_dict in place with the contents of dict
@@ -23,6 +25,103 @@ def update_dict(dest_dict, new_data):
             dest_dict[k] = v
 
 
+def text_range(text, start=None, end=None):
+    """Normalizes an optional (start, end) parsing range over `text'.
+
+    Returns a (start, end) tuple of absolute positions in `text', where
+    a missing start means the beginning of the text and a missing end
+    means the end of the text.
+    """
+    if start is None:
+        start = 0
+    if end is None:
+        end = len(text)
+    return start, end
+
+
+def window_pending(window):
+    """Returns True if `window' (the window descriptor passed to the
+    state functions by main.parse_log_stream()) is not the last window
+    of the log, ie. if more log text may follow the end of the text
+    passed to the state function. Returns False when parsing a complete
+    log in memory (`window' is None).
+    """
+    return window is not None and not window['eof']
+
+
+def window_partial_result(resume, errors=None):
+    """Returns the data of a state function that couldn't finish its
+    work in the current window of the log (see window_pending()). The
+    state function will be run again on the next window, starting at
+    `resume' (position in the current text). `errors' is the list of
+    complete errors found so far, if any.
+    """
+    return {
+        '_partial': True,
+        '_match_end': resume,
+        'errors': errors if errors else [],
+    }
+
+
+def _is_settled(error, text, end, window):
+    """Returns True if an error found by collect_window_errors() that
+    ends in the overlap of a followed log may be collected already (if
+    `is_complete' confirms it): its report was parsed and the line
+    where it ends is complete.
+    """
+    return bool(window.get('follow') and error['error']
+                and text.find('\n', error['_end'], end) != -1)
+
+
+def collect_window_errors(find_error, text, start, end, window, is_complete=None):
+    """Runs an error finder function (such as
+    linux_kernel_errors.find_kernel_error()) repeatedly over the text
+    between `start' and `end' in a window of a log that isn't the last
+    one (see window_pending()).
+
+    Only the errors that end at least `window['overlap']' characters
+    before `end' are collected, the ones after them may be incomplete in
+    this window. If an `is_complete' function is provided, it's called
+    with the result of `find_error', `text' and `end' and an error is
+    collected only if it returns True.
+
+    When following a live log (`window['follow']'), the errors are
+    reported as soon as they're collected, so waiting for `overlap'
+    characters after them would delay them until the log is complete in
+    most cases. In that mode, an error that ends in the overlap is
+    collected too if the line where it ends is complete and
+    `is_complete', if provided, confirms that its report can't change
+    with the text that follows (for instance, because its end marker was
+    found). Without `is_complete', the errors are assumed to be single
+    lines.
+
+    Returns a tuple containing the list of collected errors and the
+    position in `text' from which the search must be resumed in the next
+    window.
+    """
+    safe_end = end - window['overlap']
+    errors = []
+    pos = start
+    while True:
+        error = find_error(text, pos, end)
+        if not error:
+            break
+        if error['_end'] > safe_end and not _is_settled(error, text, end, window):
+            break
+        if is_complete and not is_complete(error, text, end):
+            break
+        pos = error['_end']
+        if error['error']:
+            errors.append(error['error'])
+        if budget_exceeded(len(errors)):
+            # The parsing stops here (see utils.budget)
+            return errors, pos
+    resume = max(pos, safe_end)
+    if error:
+        resume = min(resume, error['_start'])
+    return errors, resume
+
+
 def generate_signature(data_dict):
     """Generates a hash string of the data_dict contents"""
     signature_json = json.dumps(data_dict, sort_keys=True, ensure_ascii=False)
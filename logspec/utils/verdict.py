@@ -0,0 +1,67 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+"""Quick-verdict mode of the parsing.
+
+When only the outcome of a log is needed (did it reach the prompt? are
+there any errors?), parse_log() can run in verdict mode. The states and
+their transitions are evaluated as usual, but:
+  - the states look only for the first error of each type, so the
+    ones that find a single type of errors (the test states) stop at
+    the first error found
+  - the error parsers skip the extraction of the details of the
+    reports (call traces, lists of modules, hardware names)
+
+The result is a verdict record (see make_verdict()): the parser data
+with a compact list of errors, one per error type.
+
+The mode is enabled for the duration of the parsing with
+verdict_mode(), and the states and error parsers check it with
+in_verdict_mode().
+"""
+
+import contextlib
+import contextvars
+
+# True if the log being parsed in the current context is parsed in
+# verdict mode
+_verdict_mode = contextvars.ContextVar('verdict_mode', default=False)
+
+
+@contextlib.contextmanager
+def verdict_mode(enabled=True):
+    """Context manager that enables (or disables, if `enabled' is
+    False) the verdict mode in the current context.
+    """
+    token = _verdict_mode.set(enabled)
+    try:
+        yield
+    finally:
+        _verdict_mode.reset(token)
+
+
+def in_verdict_mode():
+    """Returns True if the verdict mode is enabled in the current
+    context.
+    """
+    return _verdict_mode.get()
+
+
+def make_verdict(data):
+    """Returns the verdict record of the parser `data': the same data
+    with the list of errors replaced by a list with the first error of
+    each type, each one a dict containing its `error_type' and
+    `error_summary'.
+    """
+    verdict = dict(data)
+    errors = {}
+    for error in data['errors']:
+        if error.error_type not in errors:
+            errors[error.error_type] = {
+                'error_type': error.error_type,
+                'error_summary': error.error_summary,
+            }
+    verdict['errors'] = list(errors.values())
+    return verdict
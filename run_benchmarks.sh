@@ -0,0 +1,12 @@
+#!/bin/bash
+
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+# Compares the results against benchmarks/baseline.json, which depends
+# on the machine and isn't part of the repository. To generate it on a
+# new machine (or to refresh it), run with `--update-baseline' first.
+
+python3 -m benchmarks.throughput "$@"
@@ -0,0 +1,57 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import json
+
+import tests.setup
+from benchmarks.throughput import compare_results, percentile, run_benchmarks, main
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+
+
+def test_compare_results():
+    baseline = {
+        'kbuild': {'mb_per_s': 10.0, 'p99_latency': 1.0, 'peak_rss': 1000},
+    }
+    results = {
+        'kbuild': {'mb_per_s': 7.0, 'p99_latency': 1.1, 'peak_rss': 2000},
+        'test_baseline': {'mb_per_s': 1.0},
+    }
+    regressions = compare_results(results, baseline, tolerance=0.25)
+    assert [(r['parser'], r['metric']) for r in regressions] == [
+        ('kbuild', 'mb_per_s'),
+        ('kbuild', 'peak_rss'),
+    ]
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(tests.setup.PARSER_DEFS_FILE, repeat=1,
+                             parser_ids=['test_kselftest'])
+    assert list(results) == ['test_kselftest']
+    assert results['test_kselftest']['logs'] == 1
+    assert results['test_kselftest']['mb_per_s'] > 0
+
+
+def test_baseline_machine(tmp_path):
+    # The baseline must be generated on the machine where the results
+    # are compared
+    baseline_file = tmp_path / 'baseline.json'
+    args = ['-d', tests.setup.PARSER_DEFS_FILE, '-p', 'test_kselftest', '-r', '1',
+            '-b', str(baseline_file), '-t', '100']
+    assert main(args) == 2
+    assert main(args + ['--update-baseline']) == 0
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    assert list(baseline['results']) == ['test_kselftest']
+    assert main(args) == 0
+    baseline['machine']['node'] = 'other'
+    with open(baseline_file, 'w') as f:
+        json.dump(baseline, f)
+    assert main(args) == 2
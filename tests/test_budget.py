@@ -0,0 +1,61 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import io
+
+import pytest
+
+import tests.setup
+from benchmarks.synthetic import KINDS, generate_log
+from logspec.main import load_parser, parse_log, parse_log_stream, format_data_output
+
+
+def _parse(log, parser, window_size, **limits):
+    if window_size:
+        return parse_log_stream(io.StringIO(log), parser, window_size, 4096, **limits)
+    return parse_log(log, parser, **limits)
+
+
+def _serialized_errors(data):
+    return [error.fields_to_serialize() for error in data['errors']]
+
+
+@pytest.mark.parametrize('kind', ['boot', 'baseline', 'kselftest'])
+@pytest.mark.parametrize('window_size', [None, 65536])
+def test_max_errors(kind, window_size):
+    log, expected = generate_log(kind, 256 * 1024, 20)
+    parser = load_parser(KINDS[kind], tests.setup.PARSER_DEFS_FILE)
+    data = _parse(log, parser, window_size, max_errors=5)
+    assert data['_truncated'] == 'errors'
+    assert _serialized_errors(data) == expected[:5]
+    # Reaching the maximum doesn't truncate the results
+    data = _parse(log, parser, window_size, max_errors=20)
+    assert '_truncated' not in data
+    assert _serialized_errors(data) == expected
+
+
+@pytest.mark.parametrize('window_size', [None, 65536])
+def test_max_size(window_size):
+    log, _ = generate_log('boot', 256 * 1024, 20)
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    max_size = len(log) // 2
+    data = _parse(log, parser, window_size, max_size=max_size)
+    assert data.pop('_truncated') == 'size'
+    # Same results as the parsing of the beginning of the log
+    expected = parse_log(log[:max_size], parser)
+    assert format_data_output(data, full=True) == format_data_output(expected, full=True)
+    data = _parse(log, parser, window_size, max_size=len(log))
+    assert '_truncated' not in data
+
+
+def test_max_time():
+    log, _ = generate_log('boot', 256 * 1024, 20)
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    data = parse_log(log, parser, max_time=0)
+    assert data['_truncated'] == 'time'
+    assert data['errors'] == []
+    data = parse_log(log, parser, max_time=60)
+    assert '_truncated' not in data
+    assert len(data['errors']) == 20
@@ -0,0 +1,171 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import os
+import pathlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import tests.setup
+import logspec.main
+from logspec.main import load_parser, parse_log_file, parse_logs, format_data_output
+from logspec.utils.cache import ResultCache
+
+LOG_DIR = 'tests/logs/linux_boot'
+
+
+def _entries(cache):
+    return sorted(glob.glob(os.path.join(cache.path, '*', '*.pickle')))
+
+
+def test_cache_parse_log_file(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / 'cache')
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    log_file = f'{LOG_DIR}/linux_boot_005.log'
+    expected = format_data_output(parse_log_file(log_file, parser), full=True)
+    assert format_data_output(parse_log_file(log_file, parser, cache=cache), full=True) == expected
+    assert len(_entries(cache)) == 1
+    # Same log in another file: found in the cache
+    other_log_file = tmp_path / 'copy.log'
+    shutil.copy(log_file, other_log_file)
+    with monkeypatch.context() as m:
+        m.setattr(logspec.main, '_parse_log_file', None)
+        data = parse_log_file(other_log_file, parser, cache=cache)
+    assert format_data_output(data, full=True) == expected
+    # Different options: different result
+    data = parse_log_file(log_file, parser, cache=cache, verdict=True)
+    assert len(_entries(cache)) == 2
+    assert format_data_output(data, full=True) != expected
+
+
+def test_cache_parser_defs(tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    log_file = f'{LOG_DIR}/linux_boot_005.log'
+    parse_log_file(log_file, load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE),
+                   cache=cache)
+    # A change in the parser definitions invalidates the results
+    parser_defs_file = tmp_path / 'parser_defs.yaml'
+    parser_defs_file.write_text(pathlib.Path(tests.setup.PARSER_DEFS_FILE).read_text() + '\n')
+    parse_log_file(log_file, load_parser('generic_linux_boot', parser_defs_file), cache=cache)
+    assert len(_entries(cache)) == 2
+
+
+def test_cache_time_limit(tmp_path):
+    cache = ResultCache(tmp_path / 'cache')
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    data = parse_log_file(f'{LOG_DIR}/linux_boot_005.log', parser, max_time=0, cache=cache)
+    assert data['_truncated'] == 'time'
+    # Results truncated by the time limit aren't cached
+    assert not _entries(cache)
+
+
+def test_cache_eviction(tmp_path):
+    cache = ResultCache(tmp_path / 'cache', max_size=10000)
+    keys = [f'{i:02x}' * 20 for i in range(20)]
+    for i, key in enumerate(keys):
+        cache.put(key, {'blob': 'x' * 1000})
+        # The first entry is the most recently used
+        assert cache.get(keys[0])
+        os.utime(cache._entry_path(key), (i, i))
+    entries = _entries(cache)
+    assert sum(os.path.getsize(path) for path in entries) <= cache.max_size
+    assert cache.get(keys[0]) and cache.get(keys[-1])
+    assert not cache.get(keys[1])
+    cache.clear()
+    assert not _entries(cache)
+
+
+def _put_and_get(path, key, value):
+    cache = ResultCache(path, max_size=50000)
+    for _ in range(20):
+        cache.put(key, value)
+        data = cache.get(key)
+        assert data is None or data == value
+    return True
+
+
+def test_cache_concurrent(tmp_path):
+    keys = [f'{i:02x}' * 20 for i in range(8)]
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(_put_and_get, tmp_path, key, {'key': key, 'blob': 'x' * 5000})
+                   for key in keys for _ in range(2)]
+        assert all(future.result() for future in futures)
+    assert not glob.glob(os.path.join(tmp_path, '*', '*.tmp'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_cache_parse_logs(tmp_path, monkeypatch, workers):
+    cache = ResultCache(tmp_path / 'cache')
+    parsed = []
+
+    class CountingPool(ProcessPoolExecutor):
+        def submit(self, fn, index, *args, **kwargs):
+            parsed.append(index)
+            return super().submit(fn, index, *args, **kwargs)
+
+    def parse_batch_item(parser, index, *args, **kwargs):
+        parsed.append(index)
+        return parse_batch_item_orig(parser, index, *args, **kwargs)
+
+    parse_batch_item_orig = logspec.main._parse_batch_item
+    monkeypatch.setattr(logspec.main, 'ProcessPoolExecutor', CountingPool)
+    monkeypatch.setattr(logspec.main, '_parse_batch_item', parse_batch_item)
+    log_files = [f'{LOG_DIR}/linux_boot_001.log', f'{LOG_DIR}/linux_boot_005.log']
+    with open(log_files[0], 'r') as log_file:
+        log_text = log_file.read()
+    # Identical logs (same file twice, same log as a text)
+    logs = [log_files[0], log_files[1], log_files[0], log_text]
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = [format_data_output(parse_log_file(log, parser), full=True) for log in log_files]
+    results = sorted(parse_logs(logs, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE,
+                                workers=workers, cache=cache),
+                     key=lambda result: result['index'])
+    assert [result['index'] for result in results] == list(range(len(logs)))
+    assert [result['log_file'] for result in results] == logs[:3] + [None]
+    assert [format_data_output(result['data'], full=True) for result in results] == \
+        [expected[0], expected[1], expected[0], expected[0]]
+    assert results[0]['data'] is not results[2]['data']
+    # Identical logs parsed only once
+    assert sorted(parsed) == [0, 1]
+    assert len(_entries(cache)) == 2
+
+
+def test_cache_parse_logs_crlf(tmp_path):
+    # The same CRLF log as a file, as its text and as a text with the
+    # newlines already translated: the file is parsed with its newlines
+    # translated, so it gets the same result as the translated text
+    log_file = tmp_path / 'crlf.log'
+    with open(f'{LOG_DIR}/linux_boot_005.log', 'rb') as f:
+        log_file.write_bytes(f.read().replace(b'\n', b'\r\n'))
+    raw_text = log_file.read_bytes().decode('utf-8')
+    logs = [str(log_file), raw_text, raw_text.replace('\r\n', '\n')]
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = [format_data_output(result['data'], full=True)
+                for result in parse_logs(logs, 'generic_linux_boot',
+                                         tests.setup.PARSER_DEFS_FILE, workers=1)]
+    assert expected[0] != expected[1]
+    assert expected[0] == expected[2]
+    cache = ResultCache(tmp_path / 'cache')
+    for _ in range(2):
+        results = parse_logs(logs, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE,
+                             workers=1, cache=cache)
+        assert [format_data_output(result['data'], full=True) for result in results] == expected
+    assert len(_entries(cache)) == 2
+
+
+def test_cache_parse_logs_hit(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / 'cache')
+    log_file = f'{LOG_DIR}/linux_boot_001.log'
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = format_data_output(parse_log_file(log_file, parser, cache=cache), full=True)
+    # Found in the cache, not parsed
+    monkeypatch.setattr(logspec.main, '_parse_log_file', None)
+    results = list(parse_logs([log_file, pathlib.Path(log_file)], 'generic_linux_boot',
+                              tests.setup.PARSER_DEFS_FILE, workers=1, cache=cache))
+    assert [result['error'] for result in results] == [None, None]
+    assert [format_data_output(result['data'], full=True) for result in results] == [expected] * 2
@@ -0,0 +1,31 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import pytest
+
+import tests.setup
+from benchmarks.complexity import check_complexity, growth_exponent
+
+
+def test_growth_exponent():
+    xs = [1000, 2000, 4000, 8000]
+    assert growth_exponent(xs, [3 * x for x in xs]) == pytest.approx(1.0)
+    assert growth_exponent(xs, [x * x for x in xs]) == pytest.approx(2.0)
+    assert growth_exponent(xs, [5.0] * len(xs)) == pytest.approx(0.0)
+
+
+def test_check_complexity():
+    # Small logs, so the timings are noisy: only a clearly superlinear
+    # growth is reported
+    results = check_complexity(parser_defs_file=tests.setup.PARSER_DEFS_FILE,
+                               max_exponent=1.6, base_size=64 * 1024, steps=4)
+    assert [(r['kind'], r['series']) for r in results] == [
+        (kind, series)
+        for kind in ('boot', 'baseline', 'kselftest', 'kbuild')
+        for series in ('size', 'errors')
+    ]
+    for r in results:
+        assert len(r['points']) == 4
+        assert not r['superlinear'], r
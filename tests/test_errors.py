@@ -0,0 +1,49 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import pickle
+import sys
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file
+from logspec.errors.kbuild import KbuildCompilerError
+from logspec.errors.linux_kernel import GenericError
+
+
+def test_error_slots():
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    data = parse_log_file('tests/logs/linux_boot/linux_boot_005.log', parser)
+    errors = data['errors']
+    assert errors
+    for error in errors:
+        assert not hasattr(error, '__dict__')
+        # Call trace frames and hardware names are shared between the
+        # errors that have them
+        for frame in getattr(error, 'call_trace', []):
+            assert sys.intern(frame) is frame
+        if getattr(error, 'hardware', None):
+            assert sys.intern(error.hardware) is error.hardware
+    # Slotted errors survive the transfer from the parse_logs() workers
+    copies = pickle.loads(pickle.dumps(errors))
+    assert [e.fields_to_serialize(full=True) for e in copies] == \
+        [e.fields_to_serialize(full=True) for e in errors]
+
+
+def test_error_fields_to_serialize():
+    error = GenericError()
+    assert error.fields_to_serialize() == {
+        'error_type': 'linux.kernel',
+        'error_summary': '',
+        'hardware': None,
+        'location': None,
+        'call_trace': [],
+        'modules': [],
+    }
+    # Fields not set are left out
+    assert '_signature_loc' not in error.fields_to_serialize(full=True)
+    error = KbuildCompilerError(script='scripts/Makefile.build:244', target='foo.o')
+    error.parse('foo.c:12:3: error: bar\n')
+    fields = error.fields_to_serialize(full=True)
+    assert fields['_signature'] and fields['_signature_loc']
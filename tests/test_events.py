@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import re
+
+import pytest
+
+import logspec.utils.events
+from logspec.utils.events import EventIndex, _last_match
+
+TEXT = "aa.ab.aaa.b.aa\nab..aaaa\n"
+
+
+@pytest.mark.parametrize('pattern', [r'a+', r'ab', r'a.*', r'b\.a+'])
+@pytest.mark.parametrize('index_start,index_end', [(0, None), (4, None), (8, None),
+                                                   (0, 13), (4, 20)])
+@pytest.mark.parametrize('plain_search_range', [0, 3, logspec.utils.events.PLAIN_SEARCH_RANGE])
+def test_event_index(monkeypatch, pattern, index_start, index_end, plain_search_range):
+    # The lookups in an EventIndex must give the same results as
+    # searching the text, for any range and in any order, whatever the
+    # range of the log scanned by the index
+    monkeypatch.setattr(logspec.utils.events, 'PLAIN_SEARCH_RANGE', plain_search_range)
+    pattern = re.compile(pattern)
+    index = EventIndex(TEXT, index_start, index_end)
+    for start in reversed(range(len(TEXT) + 1)):
+        for end in range(start, len(TEXT) + 1):
+            match = index.find(pattern, start, end)
+            expected = pattern.search(TEXT, start, end)
+            assert (match and match.span()) == (expected and expected.span())
+            match = index.find_last(pattern, start, end)
+            expected = _last_match(pattern, TEXT, start, end)
+            assert (match and match.span()) == (expected and expected.span())
+
+
+class CountingPattern():
+    """Pattern that counts the characters scanned by its searches."""
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+        self.scanned = 0
+
+    def search(self, text, pos, endpos):
+        match = self.pattern.search(text, pos, endpos)
+        self.scanned += (match.end() if match else endpos) - pos
+        return match
+
+    def finditer(self, text, pos=0, endpos=None):
+        endpos = len(text) if endpos is None else endpos
+        for match in self.pattern.finditer(text, pos, endpos):
+            self.scanned += match.end() - pos
+            pos = match.end()
+            yield match
+        self.scanned += endpos - pos
+
+
+def test_event_index_late_lookups():
+    gap = 100000
+    text = "line\n" * 1000000 + "MARK\n" + "line\n" * gap + "MARK\n"
+    mark = text.index("MARK")
+    last_mark = text.rindex("MARK")
+    pattern = CountingPattern(r'MARK')
+    index = EventIndex(text)
+    # A bounded lookup late in the log only scans its range
+    assert index.find(pattern, mark - 100, mark + 100).start() == mark
+    assert pattern.scanned <= 200
+    # An unbounded one starts scanning where it's looked up, and the
+    # text is scanned only once
+    pattern.scanned = 0
+    assert index.find(pattern, mark - 1000, len(text)).start() == mark
+    assert index.find(pattern, mark + 4, len(text)).start() == last_mark
+    assert index.find(pattern, mark + 5, len(text)).start() == last_mark
+    assert index.find_last(pattern, mark - 1000, len(text)).start() == last_mark
+    assert pattern.scanned <= len(text) - mark + 1000
@@ -0,0 +1,177 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import os
+import threading
+
+import pytest
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file, follow_log, format_data_output
+from logspec.utils.follow import save_checkpoint, load_checkpoint, append_errors, \
+    load_errors
+
+LOG_PARSERS = {
+    'linux_boot': 'generic_linux_boot',
+    'test_baseline': 'test_baseline',
+    'test_kselftest': 'test_kselftest',
+}
+CHUNK_SIZE = 5000
+WINDOW_OPTIONS = {'window_size': 16384, 'overlap': 4096}
+
+
+class GrowingLog():
+    """Log file written in chunks: a new chunk is appended every time
+    the reader runs out of text (`stop'), and the log is complete after
+    the last one.
+    """
+    def __init__(self, path, log_file):
+        self.path = path
+        with open(log_file, 'rb') as f:
+            self.contents = f.read()
+        self.written = 0
+        open(path, 'wb').close()
+
+    def write(self, size=CHUNK_SIZE):
+        with open(self.path, 'ab') as f:
+            f.write(self.contents[self.written:self.written + size])
+        self.written = min(self.written + size, len(self.contents))
+
+    def stop(self):
+        if self.written == len(self.contents):
+            return True
+        self.write()
+        return False
+
+
+def _follow(log, parser, checkpoint=None, options=WINDOW_OPTIONS, **kwargs):
+    return follow_log(log.path, parser, checkpoint, poll_interval=0, stop=log.stop,
+                      **options, **kwargs)
+
+
+@pytest.mark.parametrize('options', [WINDOW_OPTIONS, {}])
+@pytest.mark.parametrize('log_file,parser_id', [
+    (log_file, parser_id)
+    for log_dir, parser_id in LOG_PARSERS.items()
+    for log_file in sorted(glob.glob(f'tests/logs/{log_dir}/*.log'))])
+def test_follow_log(tmp_path, log_file, parser_id, options):
+    # Following a growing log must give the same results as parsing
+    # the complete log, and every error is reported once
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    expected = parse_log_file(log_file, parser)
+    log = GrowingLog(tmp_path / 'log', log_file)
+    records = list(_follow(log, parser, options=options))
+    assert [r['data'] is not None for r in records] == [False] * (len(records) - 1) + [True]
+    data = records[-1]['data']
+    assert format_data_output(data, full=True) == format_data_output(expected, full=True)
+    reported = [error for record in records for error in record['errors']]
+    assert format_data_output(reported, full=True) == \
+        format_data_output(expected['errors'], full=True)
+
+
+@pytest.mark.parametrize('log_file,early_errors', [
+    ('tests/logs/linux_boot/linux_boot_005.log', 10),
+    ('tests/logs/linux_boot/linux_boot_006.log', 2),
+])
+def test_follow_log_early_errors(tmp_path, log_file, early_errors):
+    # With the default options, the errors are reported as soon as
+    # their reports are complete, not once the overlap or the complete
+    # log has been read. Only the errors in the last chunk of these
+    # logs are reported at the end
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = parse_log_file(log_file, parser)['errors']
+    log = GrowingLog(tmp_path / 'log', log_file)
+    reported = []
+    for record in follow_log(log.path, parser, poll_interval=0, stop=log.stop):
+        if record['data'] is None:
+            assert log.written < len(log.contents)
+            reported.extend(record['errors'])
+    assert len(reported) == early_errors
+    assert format_data_output(reported, full=True) == \
+        format_data_output(expected[:early_errors], full=True)
+
+
+def test_follow_log_checkpoint(tmp_path):
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    log_file = 'tests/logs/linux_boot/linux_boot_005.log'
+    expected = parse_log_file(log_file, parser, fields=['error_type', '_signature'])
+    log = GrowingLog(tmp_path / 'log', log_file)
+    checkpoint_file = tmp_path / 'checkpoint'
+    errors_file = tmp_path / 'errors'
+    assert load_checkpoint(checkpoint_file) is None
+    assert load_errors(errors_file, 0) == []
+    reported = []
+    # Stop following the log after the first half
+    for record in _follow(log, parser, fields=['error_type', '_signature']):
+        reported.extend(record['errors'])
+        append_errors(record['errors'], errors_file)
+        save_checkpoint(record['checkpoint'], checkpoint_file)
+        if log.written > len(log.contents) // 2:
+            break
+    checkpoint = load_checkpoint(checkpoint_file)
+    assert checkpoint['position'][0] == log.written
+    # The checkpoint doesn't keep the errors
+    assert 'errors' not in checkpoint
+    assert checkpoint['error_count'] == len(reported) > 0
+    # Errors appended after the checkpoint (not saved) are dropped
+    errors_size = errors_file.stat().st_size
+    append_errors(['unsaved'], errors_file)
+    previous_errors = load_errors(errors_file, checkpoint['error_count'])
+    assert format_data_output(previous_errors, full=True) == \
+        format_data_output(reported, full=True)
+    assert errors_file.stat().st_size == errors_size
+    with pytest.raises(ValueError):
+        load_errors(errors_file, checkpoint['error_count'] + 1)
+    # The errors reported before the checkpoint are needed to resume
+    with pytest.raises(ValueError):
+        next(_follow(log, parser, checkpoint, fields=['error_type', '_signature']))
+    # Resume: the first part of the log isn't read again
+    records = list(_follow(log, parser, checkpoint, fields=['error_type', '_signature'],
+                           reported_errors=previous_errors))
+    reported.extend(error for record in records for error in record['errors'])
+    data = records[-1]['data']
+    assert format_data_output(data, full=True) == format_data_output(expected, full=True)
+    assert format_data_output(reported, full=True) == \
+        format_data_output(expected['errors'], full=True)
+    # A complete parsing only returns its results
+    records = list(_follow(log, parser, records[-1]['checkpoint'],
+                           fields=['error_type', '_signature']))
+    assert len(records) == 1
+    assert format_data_output(records[0]['data']) == format_data_output(expected)
+    # The options must be the same
+    with pytest.raises(ValueError):
+        next(_follow(log, parser, checkpoint, reported_errors=previous_errors))
+
+
+def test_follow_log_pipe():
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    log_file = 'tests/logs/linux_boot/linux_boot_005.log'
+    expected = parse_log_file(log_file, parser)
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with open(log_file, 'rb') as f, os.fdopen(write_fd, 'wb') as pipe:
+            while chunk := f.read(CHUNK_SIZE):
+                pipe.write(chunk)
+                pipe.flush()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    with os.fdopen(read_fd, 'rb') as pipe:
+        records = list(follow_log(pipe, parser, **WINDOW_OPTIONS))
+    thread.join()
+    assert format_data_output(records[-1]['data'], full=True) == \
+        format_data_output(expected, full=True)
+
+
+def test_follow_log_max_errors(tmp_path):
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    log_file = 'tests/logs/linux_boot/linux_boot_005.log'
+    log = GrowingLog(tmp_path / 'log', log_file)
+    records = list(_follow(log, parser, max_errors=1))
+    assert sum(len(record['errors']) for record in records) == 1
+    assert records[-1]['data']['_truncated'] == 'errors'
+    assert len(records[-1]['data']['errors']) == 1
@@ -0,0 +1,64 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import io
+import json
+import pathlib
+
+import pytest
+
+import tests.setup
+import logspec.utils.jsonl
+from logspec.main import load_parser, parse_log_file, parse_logs, format_data_output
+from logspec.utils.jsonl import JsonLinesWriter
+
+CORPUS = {
+    'kbuild': 'kbuild',
+    'generic_linux_boot': 'linux_boot',
+    'test_baseline': 'test_baseline',
+}
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def encoder(request, monkeypatch):
+    if request.param == 'orjson':
+        if not logspec.utils.jsonl.orjson:
+            pytest.skip("orjson not installed")
+    else:
+        monkeypatch.setattr(logspec.utils.jsonl, 'orjson', None)
+
+
+@pytest.mark.parametrize('parser_id', list(CORPUS))
+@pytest.mark.parametrize('full', [False, True])
+def test_jsonl(encoder, parser_id, full):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    for log_file in sorted(glob.glob(f'tests/logs/{CORPUS[parser_id]}/*.log')):
+        data = parse_log_file(log_file, parser)
+        stream = io.StringIO()
+        JsonLinesWriter(stream, full=full).write(data)
+        line = stream.getvalue()
+        assert line.endswith('\n') and line.count('\n') == 1
+        # Same contents as the JSON output. The data isn't modified.
+        assert json.loads(line) == json.loads(format_data_output(data, full=full)), log_file
+
+
+def test_jsonl_results(encoder):
+    log_files = sorted(glob.glob('tests/logs/linux_boot/*.log'))[:3]
+    logs = log_files + [pathlib.Path('tests/logs/linux_boot/missing.log')]
+    stream = io.BytesIO()
+    count = JsonLinesWriter(stream).write_results(
+        parse_logs(logs, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE, workers=1))
+    lines = stream.getvalue().decode('utf-8').splitlines()
+    assert count == len(lines) == len(logs)
+    records = [json.loads(line) for line in lines]
+    assert [r['index'] for r in records] == list(range(len(logs)))
+    assert [r['log_file'] for r in records[:3]] == log_files
+    for record in records[:3]:
+        assert record['error'] is None
+        assert 'errors' in record['data']
+        assert not [k for k in record['data'] if k.startswith('_')]
+    assert records[3]['error'].startswith('FileNotFoundError')
+    assert 'data' not in records[3]
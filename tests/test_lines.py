@@ -0,0 +1,47 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import tracemalloc
+
+import pytest
+
+from logspec.utils import lines
+from logspec.utils.lines import LogIndex
+
+
+@pytest.mark.parametrize('text', [
+    "",
+    "\n\n",
+    "[    0.1] a\n[    0.2] b\nc\n[    0.3] d",
+    "x [ 1.0] a\n[ 2.0] b\n[ 3.0]\n\n[ 4.0] c\n",
+])
+def test_log_index(text):
+    # The lookups in a LogIndex must give the same results as searching
+    # the text, for any range
+    index = LogIndex(text)
+    assert index.num_lines == text.count('\n') + 1
+    for start in range(len(text) + 1):
+        line_start, line_end = index.line_range(index.line_number(start))
+        assert line_start <= start <= line_end
+        assert '\n' not in text[line_start:line_end]
+        for end in range(start, len(text) + 1):
+            assert index.find_line_end(start, end) == text.find('\n', start, end)
+            assert (index.timestamp_block_end(start, end)
+                    == lines.timestamp_block_end(text, start, end))
+
+
+def test_log_index_memory():
+    # Indexing the lines must not copy the log: the memory used is
+    # that of the index itself (8 bytes per line)
+    text = "[    0.100000] a kernel log line\n" * 30000
+    index = LogIndex(text)
+    tracemalloc.start()
+    try:
+        index.timestamps
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert index.num_lines == 30001
+    assert peak < len(text) / 2
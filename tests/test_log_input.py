@@ -0,0 +1,50 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import gzip
+import lzma
+import os
+
+import pytest
+
+import tests.setup
+from logspec.main import _read_log_file, load_parser, parse_log_file, format_data_output
+from logspec.utils.compression import detect_compression
+
+
+@pytest.mark.parametrize('contents', [
+    b'',
+    b'line 1\nline 2\n',
+    b'line 1\r\nline 2\rline 3\r\n\xc3\xa1\n',
+])
+def test_read_log_file(tmp_path, contents):
+    # The memory-mapped log must be the same as the log read in text
+    # mode
+    log_file_path = os.path.join(tmp_path, 'test.log')
+    with open(log_file_path, 'wb') as log_file:
+        log_file.write(contents)
+    with open(log_file_path, 'r') as log_file:
+        expected = log_file.read()
+    assert _read_log_file(log_file_path) == expected
+
+
+@pytest.mark.parametrize('compression,compress', [
+    ('gzip', gzip.compress),
+    ('xz', lzma.compress),
+])
+def test_parse_compressed_log_file(tmp_path, compression, compress):
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    log_file_path = 'tests/logs/linux_boot/linux_boot_005.log'
+    compressed_log_file_path = os.path.join(tmp_path, f'linux_boot_005.log.{compression}')
+    with open(log_file_path, 'rb') as log_file:
+        contents = log_file.read()
+    with open(compressed_log_file_path, 'wb') as log_file:
+        log_file.write(compress(contents))
+    with open(compressed_log_file_path, 'rb') as log_file:
+        assert detect_compression(log_file) == compression
+        assert log_file.tell() == 0
+    expected = format_data_output(parse_log_file(log_file_path, parser), full=True)
+    data = parse_log_file(compressed_log_file_path, parser)
+    assert format_data_output(data, full=True) == expected
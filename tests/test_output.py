@@ -0,0 +1,37 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import json
+
+import pytest
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file, format_data_output
+
+CORPUS = {
+    'kbuild': 'kbuild',
+    'generic_linux_boot': 'linux_boot',
+    'test_baseline': 'test_baseline',
+    'test_kselftest': 'test_kselftest',
+}
+
+
+@pytest.mark.parametrize('parser_id', list(CORPUS))
+def test_format_data_output(parser_id):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    for log_file in sorted(glob.glob(f'tests/logs/{CORPUS[parser_id]}/*.log')):
+        # Public and full outputs from a single parse, in any order
+        data = parse_log_file(log_file, parser)
+        full = format_data_output(data, full=True)
+        public = format_data_output(data)
+        assert format_data_output(data, full=True) == full, log_file
+        assert format_data_output(data) == public, log_file
+        assert format_data_output(parse_log_file(log_file, parser)) == public
+        public_data = json.loads(public)
+        assert not [k for k in public_data if k.startswith('_')]
+        for error in public_data.get('errors', []):
+            assert not [k for k, v in error.items() if k.startswith('_') or v == ""]
+        assert '_signature' in json.loads(full)
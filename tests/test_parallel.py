@@ -0,0 +1,145 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import re
+
+import pytest
+
+import tests.setup
+import logspec.utils.parallel
+from benchmarks.synthetic import generate_log
+from logspec.main import load_parser, parse_log, parse_log_file, format_data_output
+from logspec.utils.budget import ParseBudget, parse_budget
+from logspec.utils.parallel import collect_errors, parallel_search, split_points
+
+LOG_PARSERS = {
+    'linux_boot': 'generic_linux_boot',
+    'test_baseline': 'test_baseline',
+}
+REPORT_REGEX = re.compile(r'^START (\d+)$', re.MULTILINE)
+REPORT_END_REGEX = re.compile(r'^END$', re.MULTILINE)
+
+# Searches made by find_report() in this process
+searches = []
+
+
+def find_report(text, start, end):
+    searches.append(start)
+    match = REPORT_REGEX.search(text, start, end)
+    if not match:
+        return None
+    report_end = REPORT_END_REGEX.search(text, match.end(), end)
+    return {
+        'error': match.group(1) if int(match.group(1)) % 3 else None,
+        '_start': match.start(),
+        '_end': report_end.end() if report_end else match.end(),
+    }
+
+
+def _reports_log(num_reports):
+    # Some reports don't have an end marker and extend to the end of
+    # the next one
+    return ''.join(f"START {i}\n" + "line\n" * (i % 7) + ("END\n" if i % 5 else "")
+                   for i in range(num_reports))
+
+
+def test_split_points():
+    text = _reports_log(100)
+    points = split_points(text, 0, len(text), 4)
+    assert len(points) == 3
+    assert all(text[point - 1] == '\n' for point in points)
+    points = split_points(text, 0, len(text), 4, REPORT_END_REGEX)
+    assert all(text[:point].endswith("END\n") for point in points)
+
+
+def is_complete_report(report, text, end):
+    return text.endswith("END\n", 0, report['_end'])
+
+
+@pytest.mark.parametrize('segment_size', [10, 100, 1000, 100000])
+@pytest.mark.parametrize('segment_overlap', [200, logspec.utils.parallel.SEGMENT_OVERLAP])
+def test_collect_errors(monkeypatch, segment_size, segment_overlap):
+    # The reports fit in the overlap (200 characters)
+    monkeypatch.setattr(logspec.utils.parallel, 'SEGMENT_OVERLAP', segment_overlap)
+    text = _reports_log(500)
+    ranges = [(0, len(text)), (3, len(text) - 3), (1000, 2000), (len(text) // 3, len(text))]
+    expected = [collect_errors(find_report, text, start, end) for start, end in ranges]
+    assert len(expected[0]) == 266
+    with parallel_search(text, 3, segment_size) as search:
+        assert collect_errors(find_report, text, 0, len(text), REPORT_END_REGEX,
+                              is_complete_report) == expected[0]
+        searches.clear()
+        assert collect_errors(find_report, text, 0, len(text), REPORT_END_REGEX) == expected[0]
+        if search.segments(0, len(text)) > 1:
+            # The searches were made by the workers
+            assert len(searches) < 3
+        # Ranges not split at report boundaries
+        for (start, end), errors in zip(ranges, expected):
+            assert collect_errors(find_report, text, start, end) == errors
+
+
+def test_collect_errors_sparse(monkeypatch):
+    # Log with a few reports far apart: every worker only searches its
+    # own segment plus the overlap, and the main process doesn't search
+    # the gaps between the reports again
+    monkeypatch.setattr(logspec.utils.parallel, 'SEGMENT_OVERLAP', 1000)
+    text = ("line\n" * 20000).join(["", "START 1\nEND\n", "START 2\nEND\n", ""])
+    expected = collect_errors(find_report, text, 0, len(text))
+    assert expected == ['1', '2']
+    with parallel_search(text, 4, 10000) as search:
+        searches.clear()
+        segment_searches = search.search(find_report, 0, len(text))
+        # One search without a report per segment, plus the reports
+        assert len(segment_searches) == 6
+        assert [next_start for _, next_start, report in segment_searches if report] == \
+            [text.index("START 1"), text.index("START 2")]
+        assert collect_errors(find_report, text, 0, len(text)) == expected
+        # The last search, at the end of the range
+        assert searches == [len(text)]
+
+
+def test_parallel_search_budget():
+    # The workers stop searching once the budget is exceeded
+    text = _reports_log(5000)
+    with parallel_search(text, 3, 1000) as search:
+        segments = search.segments(0, len(text))
+        assert len(search.search(find_report, 0, len(text))) > 4000
+        budget = ParseBudget(max_errors=20)
+        budget.errors = 10
+        with parse_budget(budget):
+            # Every worker stops after finding 11 errors (10 + 11 > 20)
+            assert len(search.search(find_report, 0, len(text))) <= segments * 20
+            assert len(collect_errors(find_report, text, 0, len(text))) == 11
+        with parse_budget(ParseBudget(max_time=0)):
+            assert len(search.search(find_report, 0, len(text))) == segments
+
+
+@pytest.mark.parametrize('log_file,parser_id', [
+    (log_file, parser_id)
+    for log_dir, parser_id in LOG_PARSERS.items()
+    for log_file in sorted(glob.glob(f'tests/logs/{log_dir}/*.log'))])
+def test_parse_log_workers(monkeypatch, log_file, parser_id):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    expected = format_data_output(parse_log_file(log_file, parser), full=True)
+    monkeypatch.setattr(logspec.utils.parallel, 'DEFAULT_SEGMENT_SIZE', 4096)
+    data = parse_log_file(log_file, parser, workers=3)
+    assert format_data_output(data, full=True) == expected
+
+
+def test_parse_log_workers_spew(monkeypatch):
+    # Error spew: the results must be the same as those of a
+    # sequential parsing, with and without a projection
+    log, _ = generate_log('boot', 1024 * 1024, 2000, seed=1)
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    monkeypatch.setattr(logspec.utils.parallel, 'DEFAULT_SEGMENT_SIZE', 64 * 1024)
+    for fields in (None, ['error_type', '_signature']):
+        expected = format_data_output(parse_log(log, parser, fields=fields), full=True)
+        data = parse_log(log, parser, fields=fields, workers=4)
+        assert format_data_output(data, full=True) == expected
+    data = parse_log(log, parser, max_errors=10, workers=4)
+    assert data['_truncated'] == 'errors'
+    assert format_data_output(data, full=True) == \
+        format_data_output(parse_log(log, parser, max_errors=10), full=True)
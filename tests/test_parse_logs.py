@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import pathlib
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file, parse_logs, format_data_output
+
+
+LOG_DIR = 'tests/logs/linux_boot'
+
+
+def test_parse_logs():
+    log_files = sorted(glob.glob(f'{LOG_DIR}/*.log'))
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = [format_data_output(parse_log_file(log_file, parser), full=True)
+                for log_file in log_files]
+    with open(log_files[0], 'r') as log_file:
+        log_text = log_file.read()
+    logs = log_files + [log_text]
+    results = list(parse_logs(logs, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE,
+                              workers=2, max_in_flight=3))
+    assert sorted(result['index'] for result in results) == list(range(len(logs)))
+    for result in results:
+        assert result['error'] is None
+        if result['index'] < len(log_files):
+            assert result['log_file'] == log_files[result['index']]
+            assert format_data_output(result['data'], full=True) == expected[result['index']]
+        else:
+            assert result['log_file'] is None
+            assert format_data_output(result['data'], full=True) == expected[0]
+
+
+def test_parse_logs_error():
+    # A failure in a log must be reported in its result and must not
+    # abort the batch
+    logs = [
+        f'{LOG_DIR}/linux_boot_001.log',
+        pathlib.Path(f'{LOG_DIR}/missing.log'),
+        f'{LOG_DIR}/linux_boot_004.log',
+    ]
+    results = sorted(parse_logs(logs, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE,
+                                workers=2),
+                     key=lambda result: result['index'])
+    assert [result['error'] is None for result in results] == [True, False, True]
+    assert results[1]['error'].startswith('FileNotFoundError')
+    assert results[1]['data'] is None
+    assert results[2]['data']['linux.boot.prompt']
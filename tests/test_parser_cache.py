@@ -0,0 +1,33 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import os
+import shutil
+
+import tests.setup
+from logspec.main import load_parser, clear_parser_cache
+
+
+def test_parser_cache_hit():
+    clear_parser_cache()
+    parser = load_parser('test_baseline', tests.setup.PARSER_DEFS_FILE)
+    assert load_parser('test_baseline', tests.setup.PARSER_DEFS_FILE) is parser
+    assert load_parser('test_baseline', tests.setup.PARSER_DEFS_FILE,
+                       use_cache=False) is not parser
+
+
+def test_parser_cache_invalidation(tmp_path):
+    parser_defs_file = os.path.join(tmp_path, 'parser_defs.yaml')
+    shutil.copy(tests.setup.PARSER_DEFS_FILE, parser_defs_file)
+    parser = load_parser('kbuild', parser_defs_file)
+    # Explicit invalidation
+    clear_parser_cache(parser_defs_file)
+    new_parser = load_parser('kbuild', parser_defs_file)
+    assert new_parser is not parser
+    # Modified definitions file
+    with open(parser_defs_file, 'a') as parser_file:
+        parser_file.write("\n")
+    assert load_parser('kbuild', parser_defs_file) is not new_parser
+
@@ -0,0 +1,40 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file, format_data_output
+
+
+def test_parser_isolation():
+    # Loading a parser that shares states with another one must not
+    # modify the other parser
+    baseline = load_parser('test_baseline', tests.setup.PARSER_DEFS_FILE, use_cache=False)
+    linux_boot = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE, use_cache=False)
+    kernel_load = baseline.start_state.transitions[0].state
+    assert kernel_load is not linux_boot.start_state.transitions[0].state
+    assert kernel_load.transitions[0].state.name == "Baseline test"
+    assert not linux_boot.start_state.transitions[0].state.transitions
+
+
+def test_concurrent_parsing():
+    jobs = [
+        (os.path.join('tests/logs/kbuild', 'kbuild_001.log'), 'kbuild'),
+        (os.path.join('tests/logs/linux_boot', 'linux_boot_005.log'), 'generic_linux_boot'),
+        (os.path.join('tests/logs/test_baseline', 'test_baseline_001.log'), 'test_baseline'),
+        (os.path.join('tests/logs/test_kselftest', 'test_kselftest_001.log'), 'test_kselftest'),
+    ] * 4
+    parsers = {parser_id: load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+               for _, parser_id in jobs}
+
+    def parse(job):
+        log_file, parser_id = job
+        return format_data_output(parse_log_file(log_file, parsers[parser_id]), full=True)
+
+    expected = [parse(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert list(executor.map(parse, jobs)) == expected
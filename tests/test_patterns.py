@@ -0,0 +1,23 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import pytest
+
+from logspec.errors.linux_kernel import KernelBug
+from logspec.states.generic_boot import BOOTLOADER_END_REGEX
+from logspec.utils.patterns import register_pattern, get_pattern
+
+
+def test_registered_patterns():
+    assert get_pattern('states.generic_boot.bootloader_end') is BOOTLOADER_END_REGEX
+    assert get_pattern('errors.linux_kernel.kernel_bug.end_marker') is KernelBug._end_marker
+
+
+def test_register_pattern():
+    pattern = register_pattern('tests', 'pattern', r'\d+')
+    # Registering the same pattern again returns the registered one
+    assert register_pattern('tests', 'pattern', r'\d+') is pattern
+    with pytest.raises(RuntimeError):
+        register_pattern('tests', 'pattern', r'\w+')
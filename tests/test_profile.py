@@ -0,0 +1,30 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file, format_data_output
+from logspec.utils.profile import chrome_trace
+
+LOG_FILE = 'tests/logs/test_baseline/test_baseline_001.log'
+
+
+def test_profile():
+    parser = load_parser('test_baseline', tests.setup.PARSER_DEFS_FILE)
+    expected = parse_log_file(LOG_FILE, parser)
+    for window_size in (None, 16384):
+        data = parse_log_file(LOG_FILE, parser, window_size, overlap=4096, profile=True)
+        profile = data.pop('_profile')
+        # Profiling doesn't change the results
+        assert format_data_output(data, full=True) == format_data_output(expected, full=True)
+        states = profile['states']
+        assert states[0]['state'] == parser.start_state.name
+        assert states[-1]['next_state'] is None
+        assert sum(s['errors'] for s in states) == len(expected['errors'])
+        for state, next_state in zip(states, states[1:]):
+            assert state['next_state'] == next_state['state']
+            assert state['end'] == next_state['start']
+        assert states[-1]['end'] == expected['_match_end']
+        trace = chrome_trace(profile)
+        assert [e['name'] for e in trace['traceEvents']] == [s['state'] for s in states]
@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+
+import pytest
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file
+from logspec.utils.regex_stats import collect_regex_stats
+
+CORPUS = {
+    'kbuild': 'kbuild',
+    'generic_linux_boot': 'linux_boot',
+    'test_baseline': 'test_baseline',
+}
+DETAIL_PATTERNS = {
+    'errors.linux_kernel.hardware',
+    'errors.linux_kernel.call_trace',
+    'errors.linux_kernel.generic_error.modules',
+}
+
+
+@pytest.mark.parametrize('parser_id', list(CORPUS))
+@pytest.mark.parametrize('fields', [
+    ['error_type', '_signature'],
+    ['error_type', 'error_summary', 'call_trace'],
+])
+def test_projection(parser_id, fields):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    for log_file in sorted(glob.glob(f'tests/logs/{CORPUS[parser_id]}/*.log')):
+        data = parse_log_file(log_file, parser)
+        projected = parse_log_file(log_file, parser, fields=fields)
+        assert projected['_signature'] == data['_signature']
+        expected = [{k: v for k, v in e.fields_to_serialize(full=True).items() if k in fields}
+                    for e in data['errors']]
+        assert [e.fields_to_serialize(full=True) for e in projected['errors']] == expected, log_file
+
+
+def test_projection_skips_details():
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    # Generic "cut here" reports, whose signature doesn't use any detail
+    log_file = 'tests/logs/linux_boot/linux_boot_005.log'
+    with collect_regex_stats() as stats:
+        parse_log_file(log_file, parser, fields=['error_type', '_signature'])
+    assert not DETAIL_PATTERNS & set(stats)
+    with collect_regex_stats() as stats:
+        parse_log_file(log_file, parser)
+    assert DETAIL_PATTERNS <= set(stats)
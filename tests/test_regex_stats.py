@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import threading
+
+import tests.setup
+import logspec.states.generic_boot
+from logspec.main import load_parser, parse_log_file, parse_logs, format_data_output
+from logspec.states.generic_boot import BOOTLOADER_END_REGEX
+from logspec.utils.linux_kernel_errors import ERROR_START_REGEXES
+from logspec.utils.patterns import get_pattern
+from logspec.utils.regex_stats import collect_regex_stats, merge_regex_stats, \
+    format_regex_stats
+
+LOG_DIR = 'tests/logs/linux_boot'
+
+
+def test_regex_stats():
+    log_file = f'{LOG_DIR}/linux_boot_002.log'
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = format_data_output(parse_log_file(log_file, parser), full=True)
+    with collect_regex_stats() as stats:
+        data = parse_log_file(log_file, parser)
+    # The instrumentation doesn't change the results and it's removed
+    # after the collection
+    assert format_data_output(data, full=True) == expected
+    assert get_pattern('states.generic_boot.bootloader_end') is BOOTLOADER_END_REGEX
+    sites = stats['states.generic_boot.bootloader_end']
+    assert len(sites) == 1
+    site, counters = next(iter(sites.items()))
+    assert site.startswith('states.generic_boot.detect_bootloader_end:')
+    assert counters['calls'] == 1
+    assert counters['matches'] == 1
+    assert 'states.generic_boot.bootloader_end' in format_regex_stats(stats)
+
+
+def test_regex_stats_verdict():
+    # The verdict mode searches the start markers of the error reports
+    # kept in a dict
+    log_file = f'{LOG_DIR}/linux_boot_005.log'
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    expected = format_data_output(parse_log_file(log_file, parser, verdict=True), full=True)
+    with collect_regex_stats() as stats:
+        data = parse_log_file(log_file, parser, verdict=True)
+    assert format_data_output(data, full=True) == expected
+    assert get_pattern('utils.linux_kernel_errors.bug_start') is ERROR_START_REGEXES['bug']
+    for tag in ERROR_START_REGEXES:
+        sites = stats[f'utils.linux_kernel_errors.{tag}_start']
+        assert all(site.startswith('utils.linux_kernel_errors.find_first_kernel_errors:')
+                   for site in sites)
+        assert sum(counters['calls'] for counters in sites.values()) >= 1
+    assert sum(counters['matches']
+               for counters in stats['utils.linux_kernel_errors.bug_start'].values()) >= 1
+
+
+def test_parse_logs_regex_stats():
+    log_files = sorted(glob.glob(f'{LOG_DIR}/*.log'))
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    with collect_regex_stats() as expected:
+        for log_file in log_files:
+            parse_log_file(log_file, parser)
+    stats = {}
+    for result in parse_logs(log_files, 'generic_linux_boot', tests.setup.PARSER_DEFS_FILE,
+                             workers=2, regex_stats=True):
+        merge_regex_stats(stats, result['regex_stats'])
+    assert stats.keys() == expected.keys()
+    for name, sites in stats.items():
+        for site, counters in sites.items():
+            assert counters['calls'] == expected[name][site]['calls']
+            assert counters['matches'] == expected[name][site]['matches']
+
+
+def test_regex_stats_threads():
+    # Overlapping contexts in two threads: each one collects the
+    # statistics of its own searches, and the patterns are restored when
+    # the last one ends, whatever the order
+    first_started = threading.Event()
+    second_started = threading.Event()
+    first_done = threading.Event()
+    results = {}
+
+    def first():
+        with collect_regex_stats() as stats:
+            first_started.set()
+            second_started.wait()
+            logspec.states.generic_boot.BOOTLOADER_END_REGEX.search("U-Boot")
+        first_done.set()
+        results['first'] = stats
+
+    def second():
+        first_started.wait()
+        with collect_regex_stats() as stats:
+            second_started.set()
+            first_done.wait()
+            # Still instrumented after the first context ended
+            results['instrumented'] = \
+                logspec.states.generic_boot.BOOTLOADER_END_REGEX is not BOOTLOADER_END_REGEX
+            logspec.states.generic_boot.BOOTLOADER_END_REGEX.search("U-Boot")
+            logspec.states.generic_boot.BOOTLOADER_END_REGEX.search("U-Boot")
+        results['second'] = stats
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert logspec.states.generic_boot.BOOTLOADER_END_REGEX is BOOTLOADER_END_REGEX
+    name = 'states.generic_boot.bootloader_end'
+    assert results['instrumented']
+    assert sum(c['calls'] for c in results['first'][name].values()) == 1
+    assert sum(c['calls'] for c in results['second'][name].values()) == 2
+    # A later context instruments the patterns again
+    with collect_regex_stats() as stats:
+        logspec.states.generic_boot.BOOTLOADER_END_REGEX.search("U-Boot")
+    assert sum(c['calls'] for c in stats[name].values()) == 1
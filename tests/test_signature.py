@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+
+import pytest
+
+import tests.setup
+from benchmarks.signature import compare_signature_versions
+from logspec.errors.kbuild import KbuildCompilerError
+from logspec.main import load_parser, parse_log_file
+from logspec.utils.signature import fields_signature, signature_engine
+from logspec.utils.utils import generate_signature
+
+
+def _legacy_signature(error, exclude=()):
+    """Signature of an error as generated by the older logspec
+    versions.
+    """
+    fields = {f: getattr(error, f, None) for f in error._signature_fields if f not in exclude}
+    return generate_signature({k: v for k, v in fields.items() if v})
+
+
+@pytest.mark.parametrize('parser_id,log_dir', [
+    ('kbuild', 'kbuild'),
+    ('generic_linux_boot', 'linux_boot'),
+    ('test_baseline', 'test_baseline'),
+])
+def test_signature_versions(parser_id, log_dir):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    for log_file in sorted(glob.glob(f'tests/logs/{log_dir}/*.log')):
+        v1 = parse_log_file(log_file, parser, signature_version=1)
+        v2 = parse_log_file(log_file, parser)
+        assert v1['_signature_version'] == 1
+        assert v2['_signature_version'] == 2
+        for e1, e2 in zip(v1['errors'], v2['errors']):
+            if not e1._signature:
+                # Error not parsed (no signature generated)
+                continue
+            assert e1._signature == _legacy_signature(e1), log_file
+            if e1._add_signature_loc:
+                assert e1._signature_loc == _legacy_signature(e1, ('error_summary', 'position'))
+            assert len(e2._signature) == len(e1._signature)
+            assert e2._signature != e1._signature
+
+
+def test_signature_loc():
+    errors = []
+    with signature_engine(2):
+        for message in ('expected identifier', 'expected expression'):
+            error = KbuildCompilerError(script='scripts/Makefile.build:244', target='foo.o')
+            error.parse(f'foo.c:12:3: error: {message}\n')
+            errors.append(error)
+    assert errors[0]._signature != errors[1]._signature
+    assert errors[0]._signature_loc == errors[1]._signature_loc
+
+
+def test_fields_signature():
+    fields = {'linux.boot.prompt': True, 'linux.boot.kernel_started': False}
+    assert fields_signature(fields, 1) == generate_signature(fields)
+    assert fields_signature(fields, 2) == fields_signature(dict(fields), 2)
+    assert fields_signature(fields, 2) != fields_signature({'linux.boot.prompt': True}, 2)
+    # Lists and strings with the same text are different values
+    assert fields_signature({'a': ['x']}, 2) != fields_signature({'a': 'x'}, 2)
+    with pytest.raises(ValueError):
+        with signature_engine(3):
+            pass
+
+
+def test_compare_signature_versions():
+    results = compare_signature_versions(['boot'], tests.setup.PARSER_DEFS_FILE,
+                                         size=256 * 1024, num_errors=20, repeat=1)
+    assert len(results) == 1
+    assert results[0]['errors'] > 0
+    assert set(results[0]['times']) == {1, 2}
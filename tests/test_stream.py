@@ -0,0 +1,75 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+import logging
+
+import pytest
+
+import tests.setup
+import logspec.errors.kbuild
+import logspec.states.kbuild
+from logspec.main import load_parser, parse_log_file, format_data_output
+
+LOG_PARSERS = {
+    'kbuild': 'kbuild',
+    'linux_boot': 'generic_linux_boot',
+    'test_baseline': 'test_baseline',
+    'test_kselftest': 'test_kselftest',
+}
+
+
+@pytest.mark.parametrize('log_file,parser_id', [
+    (log_file, parser_id)
+    for log_dir, parser_id in LOG_PARSERS.items()
+    for log_file in sorted(glob.glob(f'tests/logs/{log_dir}/*.log'))])
+def test_parse_log_stream(log_file, parser_id):
+    # Parsing a log in small windows must give the same results as
+    # parsing the complete log
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    expected = format_data_output(parse_log_file(log_file, parser), full=True)
+    data = parse_log_file(log_file, parser, window_size=16384, overlap=4096)
+    assert format_data_output(data, full=True) == expected
+
+
+@pytest.mark.parametrize('log_file', sorted(glob.glob('tests/logs/kbuild/*.log')))
+def test_parse_log_stream_kbuild_context(monkeypatch, log_file):
+    # The kbuild state only keeps the context of the errors, and the
+    # results are the same as those of parsing the complete log with
+    # the same context
+    context = 32768
+    window_size = 16384
+    monkeypatch.setattr(logspec.errors.kbuild, 'KBUILD_ERROR_CONTEXT', context)
+    monkeypatch.setattr(logspec.states.kbuild, 'KBUILD_ERROR_CONTEXT', context)
+    parser = load_parser('kbuild', tests.setup.PARSER_DEFS_FILE)
+    state = parser.states['kbuild.kbuild_start']
+    expected = format_data_output(parse_log_file(log_file, parser), full=True)
+    max_text = 0
+
+    def detect_kbuild_start(text, start=None, end=None, window=None):
+        nonlocal max_text
+        max_text = max(max_text, len(text))
+        return function(text, start, end, window)
+
+    function = state.function
+    monkeypatch.setattr(state, 'function', detect_kbuild_start)
+    data = parse_log_file(log_file, parser, window_size=window_size, overlap=4096)
+    assert format_data_output(data, full=True) == expected
+    # The window grows up to twice the text kept (see
+    # parse_log_stream())
+    assert max_text <= 2 * max(context, window_size)
+
+
+@pytest.mark.parametrize('log_file,parser_id,warning', [
+    ('tests/logs/test_kselftest/test_kselftest_001.log', 'test_kselftest', True),
+    ('tests/logs/kbuild/kbuild_001.log', 'kbuild', False),
+    ('tests/logs/linux_boot/linux_boot_001.log', 'generic_linux_boot', False),
+])
+def test_parse_log_stream_unbounded_warning(caplog, log_file, parser_id, warning):
+    # A warning is logged when the memory can't be bounded
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    parse_log_file(log_file, parser, window_size=16384, overlap=4096)
+    messages = [r.getMessage() for r in caplog.records if r.levelno == logging.WARNING]
+    assert any("can't bound the memory" in m for m in messages) == warning
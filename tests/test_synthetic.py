@@ -0,0 +1,24 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import pytest
+
+import tests.setup
+from benchmarks.synthetic import KINDS, generate_log
+from logspec.main import load_parser, parse_log
+
+
+@pytest.mark.parametrize('kind', list(KINDS))
+@pytest.mark.parametrize('num_errors', [0, 1, 25])
+def test_generate_log(kind, num_errors):
+    log, expected = generate_log(kind, 256 * 1024, num_errors, seed=1)
+    # The generation is deterministic
+    assert generate_log(kind, 256 * 1024, num_errors, seed=1) == (log, expected)
+    assert len(log) >= 256 * 1024
+    parser = load_parser(KINDS[kind], tests.setup.PARSER_DEFS_FILE)
+    data = parse_log(log, parser)
+    assert [error.fields_to_serialize() for error in data['errors']] == expected
+    if kind != 'kbuild':
+        assert len(expected) == num_errors
@@ -0,0 +1,37 @@
+# SPDX-License-Identifier: LGPL-2.1-or-later
+#
+# Copyright (C) 2024 Collabora Limited
+# Author: Ricardo Cañuelo <ricardo.canuelo@collabora.com>
+
+import glob
+
+import pytest
+
+import tests.setup
+from logspec.main import load_parser, parse_log_file
+from logspec.utils.verdict import make_verdict
+
+CORPUS = {
+    'kbuild': 'kbuild',
+    'generic_linux_boot': 'linux_boot',
+    'test_baseline': 'test_baseline',
+    'test_kselftest': 'test_kselftest',
+}
+
+
+@pytest.mark.parametrize('parser_id', list(CORPUS))
+def test_verdict(parser_id):
+    parser = load_parser(parser_id, tests.setup.PARSER_DEFS_FILE)
+    for log_file in sorted(glob.glob(f'tests/logs/{CORPUS[parser_id]}/*.log')):
+        data = parse_log_file(log_file, parser)
+        verdict = parse_log_file(log_file, parser, verdict=True)
+        # Same outcome and first error of each type as the full parsing
+        assert verdict == make_verdict(data), log_file
+
+
+def test_verdict_window():
+    log_file = 'tests/logs/linux_boot/linux_boot_005.log'
+    parser = load_parser('generic_linux_boot', tests.setup.PARSER_DEFS_FILE)
+    data = parse_log_file(log_file, parser)
+    verdict = parse_log_file(log_file, parser, 16384, overlap=4096, verdict=True)
+    assert verdict == make_verdict(data)